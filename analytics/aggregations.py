@@ -0,0 +1,167 @@
+"""KPIs, IBairro e agregações por bairro, rua, tipo e data.
+
+Todas as funções recebem DataFrames já tipados (ver ``analytics.ingest``) e
+retornam valores ou DataFrames numéricos; formatação fica com o dashboard.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def compute_kpis(df: pd.DataFrame) -> dict:
+    """Indicadores dos cards do topo do dashboard."""
+    if df.empty:
+        return {
+            "imoveis": 0, "imoveis_unicos": 0, "preco_medio": 0, "preco_mediano": None,
+            "pm2_medio": 0, "area_media": 0, "condominio_medio": 0,
+        }
+    return {
+        "imoveis": len(df),
+        "imoveis_unicos": int(df['ID Imóvel'].nunique()),
+        "preco_medio": float(df['Preço'].mean()),
+        "preco_mediano": float(df['Preço'].median()),
+        "pm2_medio": float(df['Preço/m²'].mean()),
+        "area_media": float(df['Área (m²)'].mean()),
+        "condominio_medio": float(df['Condomínio'].mean()),
+    }
+
+
+def bairro_pm2_reference(df: pd.DataFrame, col_bairro='Bairro') -> pd.Series:
+    """Preço/m² médio por bairro, usado como denominador do IBairro."""
+    return df.groupby(col_bairro)['Preço/m²'].mean()
+
+
+def compute_ibairro(df: pd.DataFrame, reference: pd.Series, col_bairro='Bairro') -> pd.Series:
+    """IBairro = Preço/m² do imóvel / Preço/m² médio do bairro (0 sem referência)."""
+    ref = df[col_bairro].map(reference)
+    ibairro = df['Preço/m²'] / ref
+    return ibairro.where(ref > 0, 0).fillna(0)
+
+
+def pm2_by_bairro(df: pd.DataFrame, col_bairro='Bairro') -> pd.DataFrame:
+    """Preço/m² médio por bairro, ordenado para o gráfico de barras horizontais."""
+    return df.groupby(col_bairro)['Preço/m²'].mean().reset_index().sort_values('Preço/m²', ascending=True)
+
+
+def type_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Quantidade de imóveis por tipo."""
+    counts = df['Tipo'].value_counts().reset_index()
+    counts.columns = ['Tipo', 'Quantidade']
+    return counts
+
+
+def daily_mean_price(df: pd.DataFrame) -> pd.DataFrame:
+    """Preço médio por dia de captura (colunas 'Data' e 'Preço')."""
+    dates = pd.to_datetime(df['Data e Hora da Extração']).dt.date
+    return df['Preço'].groupby(dates.rename('Data')).mean().reset_index()
+
+
+def daily_mean_price_ffill(df: pd.DataFrame, last_seen: pd.Series = None, capture_days=None) -> pd.DataFrame:
+    """Preço médio diário lendo ``df`` como log de mudanças esparso.
+
+    Cada linha vale do dia da captura até a próxima mudança do mesmo imóvel
+    (exclusive) ou até ``last_seen[ID]`` (inclusive; padrão: a última captura).
+    Médias calculadas nos ``capture_days`` (padrão: dias presentes no log).
+    Com histórico denso (todo imóvel ativo recapturado a cada coleta) o
+    resultado é igual ao de ``daily_mean_price``.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['Data', 'Preço'])
+    log = pd.DataFrame({
+        'id': df['ID Imóvel'].to_numpy(),
+        'dia': pd.to_datetime(df['Data e Hora da Extração']).dt.normalize().to_numpy(),
+        'preco': df['Preço'].to_numpy(dtype=float),
+        'ordem': np.arange(len(df)),
+    })
+    # Um valor por imóvel e dia: a última captura do dia
+    log = log.sort_values(['id', 'dia', 'ordem'], kind='stable').drop_duplicates(['id', 'dia'], keep='last')
+    proximo = log.groupby('id')['dia'].shift(-1)
+    if last_seen is not None:
+        fim = log['id'].map(pd.to_datetime(last_seen).dt.normalize())
+        fim = fim.fillna(log.groupby('id')['dia'].transform('max'))
+    else:
+        fim = log.groupby('id')['dia'].transform('max')
+    fim = fim.where(fim > log['dia'], log['dia'])
+
+    if capture_days is None:
+        capture_days = log['dia']
+    days = np.sort(pd.to_datetime(pd.Series(capture_days)).dt.normalize().unique())
+    start = np.searchsorted(days, log['dia'].to_numpy(), side='left')
+    stop = np.where(
+        proximo.notna().to_numpy(),
+        np.searchsorted(days, proximo.fillna(log['dia']).to_numpy(), side='left'),
+        np.searchsorted(days, fim.to_numpy(), side='right'),
+    )
+    # Somas de intervalos via vetor de diferenças + soma acumulada
+    soma = np.zeros(len(days) + 1)
+    qtd = np.zeros(len(days) + 1)
+    np.add.at(soma, start, log['preco'].to_numpy())
+    np.add.at(soma, stop, -log['preco'].to_numpy())
+    np.add.at(qtd, start, 1)
+    np.add.at(qtd, stop, -1)
+    soma, qtd = np.cumsum(soma)[:-1], np.cumsum(qtd)[:-1]
+    ativo = qtd > 0
+    return pd.DataFrame({
+        'Data': pd.Series(days[ativo]).dt.date,
+        'Preço': soma[ativo] / qtd[ativo],
+    })
+
+
+def map_aggregates(df: pd.DataFrame, col_bairro='Bairro') -> pd.DataFrame:
+    """Médias e contagem por bairro usadas pelas bolhas do mapa de calor."""
+    return (
+        df.groupby(col_bairro)
+        .agg(
+            preco_medio=("Preço", "mean"),
+            pm2_medio=("Preço/m²", "mean"),
+            area_media=("Área (m²)", "mean"),
+            qtd=("Preço", "count"),
+        )
+        .reset_index()
+    )
+
+
+def bairro_stats(df: pd.DataFrame, col_bairro='Bairro') -> pd.DataFrame:
+    """Estatísticas por bairro (tabela da aba Mapa de Calor)."""
+    return (
+        df.groupby(col_bairro)
+        .agg(
+            Imóveis=("ID Imóvel", "nunique"),
+            **{
+                "Preço Min": ("Preço", "min"),
+                "Preço Max": ("Preço", "max"),
+                "Preço Médio": ("Preço", "mean"),
+                "Preço/m² Médio": ("Preço/m²", "mean"),
+                "Área Média": ("Área (m²)", "mean"),
+            },
+        )
+        .round(2)
+        .reset_index()
+        .sort_values("Preço Médio", ascending=False)
+    )
+
+
+def extract_street(enderecos: pd.Series) -> pd.Series:
+    """Nome da rua: tudo antes da primeira vírgula ou de ' - ' no endereço."""
+    ruas = enderecos.astype("string").str.split(',', n=1).str[0].str.split(' - ', n=1).str[0].str.strip()
+    return ruas.fillna("N/A").astype(object)
+
+
+def rua_stats(df: pd.DataFrame, top=20) -> pd.DataFrame:
+    """Estatísticas por rua, limitadas às ``top`` ruas com mais imóveis."""
+    stats = (
+        df.assign(Rua=extract_street(df['Endereço']))
+        .groupby("Rua")
+        .agg(
+            Imóveis=("ID Imóvel", "nunique"),
+            **{
+                "Preço Médio": ("Preço", "mean"),
+                "Preço/m² Médio": ("Preço/m²", "mean"),
+                "Área Média": ("Área (m²)", "mean"),
+            },
+        )
+        .round(2)
+        .reset_index()
+        .sort_values("Imóveis", ascending=False)
+    )
+    return stats.head(top)
@@ -0,0 +1,247 @@
+"""API HTTP pública (somente leitura) sobre o servidor do dataset (``analytics.server``).
+
+Os mesmos filtros da sidebar, como parâmetros de URL (repetidos ou separados
+por vírgula); ausente = todas as opções / faixa completa:
+
+    cidade, bairro, tipo, quartos, preco_min, preco_max, area_min, area_max,
+    visao=todos (histórico completo em vez da captura mais recente),
+    sinalizados=incluir (mantém as linhas sinalizadas por ``analytics.quality``,
+    excluídas por padrão, como no dashboard)
+
+Rotas (``GET``):
+
+- ``/api/v1/filtros``: opções e faixas disponíveis.
+- ``/api/v1/kpis``: cards do topo.
+- ``/api/v1/bairros`` e ``/api/v1/ruas``: tabelas da aba Mapa de Calor
+  (``criar_tabela_bairros``/``criar_tabela_ruas``); como lá, ignoram preço e área.
+- ``/api/v1/tipos`` e ``/api/v1/pm2-bairros``: gráficos por tipo e por bairro.
+- ``/api/v1/qualidade``: anúncios por sinalização de qualidade na visão.
+- ``/api/v1/cobertura``: anúncios com coordenada no mapa, por método de resolução
+  (``analytics.geo``); ``/api/v1/cobertura/sem-coordenada`` lista os bairros que faltam.
+- ``/api/v1/temporal/preco-diario``: preço médio diário de todo o histórico.
+- ``/api/v1/temporal/pm2?freq=W``: R$/m² mediano por bairro e período (só ``bairro`` filtra).
+- ``/api/v1/export?format=parquet``: as linhas filtradas em Parquet, Arrow ou CSV
+  (``analytics.export``), geradas em blocos e enviadas com chunked encoding.
+
+Os resultados saem do ``ResultCache`` do servidor (e, nos temporais, de um
+artefato por versão). A ``ETag`` é derivada da versão dos dados e da URL, então
+``If-None-Match`` responde 304 sem calcular nada. ``format=arrow`` (ou
+``Accept: application/vnd.apache.arrow.stream``) devolve Arrow IPC, ``format=csv``
+devolve CSV e o padrão é JSON; com ``Accept-Encoding: gzip`` o corpo vai comprimido.
+
+    curl --compressed 'http://127.0.0.1:8765/api/v1/bairros?tipo=Apartamento&quartos=2,3'
+"""
+
+import gzip
+import hashlib
+import math
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+import pandas as pd
+
+from analytics.export import EXPORT_FORMATS, iter_export, to_arrow
+from analytics.filters import FilterState
+from analytics.quality import ALL_FLAGS
+from analytics.server import ARROW_MIME, JSON_MIME, VERSION_HEADER, dumps, frame_to_arrow
+from analytics.timeseries import FREQS, bairro_pm2_index
+
+API_PREFIX = "/api/v1/"
+CSV_MIME = "text/csv; charset=utf-8"
+GZIP_MIN_BYTES = 1024
+LIST_PARAMS = {"cidade": "cidades", "bairro": "bairros", "tipo": "tipos", "quartos": "quartos"}
+RANGE_PARAMS = {"preco_min": ("price", 0), "preco_max": ("price", 1), "area_min": ("area", 0), "area_max": ("area", 1)}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _values(params, name):
+    """Valores de um parâmetro repetido e/ou separado por vírgulas."""
+    return [v.strip() for raw in params.get(name, []) for v in raw.split(",") if v.strip()]
+
+
+def _int(name, value):
+    try:
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(value)
+        return int(number)
+    except (ValueError, OverflowError):
+        raise BadRequest(f"{name}: número inválido: {value!r}") from None
+
+
+def parse_filters(dataset, params: dict):
+    """``FilterState`` e ``show_all`` a partir dos parâmetros (``{nome: [valores]}``)."""
+    show_all = _values(params, "visao") == ["todos"]
+    state = dataset.default_filters(show_all)
+    changes = {"exclude_flags": 0 if _values(params, "sinalizados") == ["incluir"] else ALL_FLAGS}
+    for name, field_name in LIST_PARAMS.items():
+        values = _values(params, name)
+        if values:
+            changes[field_name] = [_int(name, v) for v in values] if name == "quartos" else values
+    for name, (field_name, pos) in RANGE_PARAMS.items():
+        values = _values(params, name)
+        if values:
+            bounds = list(changes.get(field_name, getattr(state, field_name)))
+            bounds[pos] = _int(name, values[-1])
+            changes[field_name] = bounds
+    return state.with_selection(**changes), show_all
+
+
+def _state_payload(state: FilterState) -> dict:
+    return {
+        "cidades": state.cidades, "bairros": state.bairros, "tipos": state.tipos, "quartos": state.quartos,
+        "preco": state.price, "area": state.area,
+    }
+
+
+def _query_part(part):
+    def endpoint(service, snapshot, params):
+        state, show_all = parse_filters(snapshot.dataset, params)
+        return service.query(state, show_all, part, snapshot=snapshot)[0]
+    return endpoint
+
+
+def _filtros(service, snapshot, params):
+    state, _ = parse_filters(snapshot.dataset, {"visao": params.get("visao", [])})
+    return _state_payload(state)
+
+
+def _qualidade(service, snapshot, params):
+    show_all = _values(params, "visao") == ["todos"]
+    return service.artifact(f"qualidade:{int(show_all)}", lambda ds: ds.quality_report(show_all), snapshot)
+
+
+def _cobertura(service, snapshot, params):
+    show_all = _values(params, "visao") == ["todos"]
+    return service.artifact(f"cobertura:{int(show_all)}", lambda ds: ds.map_coverage(show_all), snapshot)
+
+
+def _sem_coordenada(service, snapshot, params):
+    show_all = _values(params, "visao") == ["todos"]
+    return service.artifact(f"sem_coordenada:{int(show_all)}", lambda ds: ds.unmapped_bairros(show_all), snapshot)
+
+
+def _preco_diario(service, snapshot, params):
+    return service.artifact("preco_diario", lambda ds: ds.daily_mean_price(), snapshot)
+
+
+def _temporal_pm2(service, snapshot, params):
+    freq = (_values(params, "freq") or ["W"])[-1]
+    if freq not in FREQS:
+        raise BadRequest(f"freq: use {', '.join(FREQS)}")
+    index = service.artifact(f"pm2_index:{freq}", lambda ds: bairro_pm2_index(ds.raw, freq, ds.col_bairro), snapshot)
+    bairros = _values(params, "bairro")
+    if bairros:
+        index = index[index[snapshot.dataset.col_bairro].isin(bairros)]
+    return index.reset_index(drop=True)
+
+
+ENDPOINTS = {
+    "filtros": _filtros,
+    "kpis": _query_part("kpis"),
+    "bairros": _query_part("bairro_stats"),
+    "ruas": _query_part("rua_stats"),
+    "tipos": _query_part("type_counts"),
+    "pm2-bairros": _query_part("pm2_by_bairro"),
+    "qualidade": _qualidade,
+    "cobertura": _cobertura,
+    "cobertura/sem-coordenada": _sem_coordenada,
+    "temporal/preco-diario": _preco_diario,
+    "temporal/pm2": _temporal_pm2,
+}
+
+
+def _export(service, snapshot, params, headers):
+    fmt = (_values(params, "format") or ["parquet"])[-1]
+    if fmt not in EXPORT_FORMATS:
+        raise BadRequest(f"format: use {', '.join(EXPORT_FORMATS)}")
+    content_type, extension = EXPORT_FORMATS[fmt]
+    out = {"ETag": etag(snapshot.version, "export", params, fmt), "Cache-Control": "no-cache",
+           VERSION_HEADER: snapshot.version}
+    if out["ETag"] in _if_none_match(headers):
+        return HTTPStatus.NOT_MODIFIED, b"", out
+    state, show_all = parse_filters(snapshot.dataset, params)
+    view = "raw" if show_all else "latest"
+    table = service.artifact(f"arrow:{view}", lambda ds: to_arrow(ds.view(show_all)), snapshot)
+    positions = service.positions(state, show_all, snapshot)
+    out["Content-Type"] = content_type
+    out["Content-Disposition"] = f'attachment; filename="imoveis-{snapshot.version[-8:]}.{extension}"'
+    return HTTPStatus.OK, iter_export(table, positions, fmt), out
+
+
+def _if_none_match(headers):
+    return [t.strip() for t in headers.get("If-None-Match", "").split(",")]
+
+
+def etag(version, route, params: dict, fmt) -> str:
+    """ETag fraca: mesma versão + rota + parâmetros (em qualquer ordem) + formato = mesmo conteúdo."""
+    canonical = repr((version, route, fmt, sorted((k, sorted(_values(params, k))) for k in params)))
+    return 'W/"' + hashlib.sha1(canonical.encode()).hexdigest()[:20] + '"'
+
+
+def _format(params, headers) -> str:
+    fmt = (_values(params, "format") or [None])[-1]
+    if fmt is None:
+        fmt = "arrow" if ARROW_MIME in headers.get("Accept", "") else "json"
+    if fmt not in ("json", "arrow", "csv"):
+        raise BadRequest("format: use json, arrow ou csv")
+    return fmt
+
+
+def encode(value, fmt, version):
+    """Corpo e Content-Type; dicts só saem em JSON."""
+    if isinstance(value, pd.DataFrame):
+        if fmt == "arrow":
+            return frame_to_arrow(value), ARROW_MIME
+        if fmt == "csv":
+            return value.to_csv(index=False).encode("utf-8"), CSV_MIME
+        data = value.to_json(orient="records", date_format="iso", force_ascii=False).encode("utf-8")
+        return b'{"version": ' + dumps(version) + b', "rows": ' + dumps(len(value)) + b', "data": ' + data + b"}", JSON_MIME
+    if fmt != "json":
+        raise BadRequest("esta rota só responde em JSON")
+    return dumps({"version": version, "data": value}), JSON_MIME
+
+
+# Rotas que montam a própria resposta (formato, ETag e corpo em blocos)
+DOWNLOADS = {"export": _export}
+
+
+def _accepts_gzip(headers) -> bool:
+    return any(part.split(";")[0].strip() == "gzip" for part in headers.get("Accept-Encoding", "").split(","))
+
+
+def handle(service, path, query, headers):
+    """Responde ``GET path?query``: (status, corpo, cabeçalhos)."""
+    route = path[len(API_PREFIX):].strip("/")
+    endpoint = ENDPOINTS.get(route)
+    if endpoint is None and route not in DOWNLOADS:
+        return HTTPStatus.NOT_FOUND, dumps({"error": f"rota desconhecida: {path}", "rotas": sorted([*ENDPOINTS, *DOWNLOADS])}), \
+            {"Content-Type": JSON_MIME}
+    snapshot = service.snapshot
+    if snapshot is None:
+        return HTTPStatus.SERVICE_UNAVAILABLE, dumps({"error": "sem dados carregados"}), {"Content-Type": JSON_MIME}
+
+    params = {}
+    for key, value in parse_qsl(query, keep_blank_values=False):
+        params.setdefault(key, []).append(value)
+    try:
+        if route in DOWNLOADS:
+            return DOWNLOADS[route](service, snapshot, params, headers)
+        fmt = _format(params, headers)
+        tag = etag(snapshot.version, route, params, fmt)
+        out = {"ETag": tag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding",
+               VERSION_HEADER: snapshot.version}
+        if tag in _if_none_match(headers):
+            return HTTPStatus.NOT_MODIFIED, b"", out
+        body, content_type = encode(endpoint(service, snapshot, params), fmt, snapshot.version)
+    except BadRequest as exc:
+        return HTTPStatus.BAD_REQUEST, dumps({"error": str(exc)}), {"Content-Type": JSON_MIME}
+
+    out["Content-Type"] = content_type
+    if len(body) >= GZIP_MIN_BYTES and _accepts_gzip(headers):
+        body = gzip.compress(body, compresslevel=6)
+        out["Content-Encoding"] = "gzip"
+    return HTTPStatus.OK, body, out
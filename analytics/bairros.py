@@ -0,0 +1,36 @@
+"""Normalização de nomes de bairro e associação a zonas.
+
+As tabelas (``BAIRROS_NORMALIZATION`` e ``BAIRROS_ZONAS_MAPPING``) vivem em
+``scripts/utils/bairros_zonas.py`` e são passadas como parâmetro.
+"""
+
+import pandas as pd
+
+
+def normalize_bairro(bairro, normalization):
+    """Normaliza um nome de bairro (remove variações de acento/caixa conhecidas)."""
+    if not bairro or pd.isna(bairro):
+        return "N/A"
+    key = str(bairro).strip().lower()
+    return normalization.get(key, str(bairro).strip())
+
+
+def normalize_bairros(bairros: pd.Series, normalization) -> pd.Series:
+    """Versão vetorizada: normaliza cada nome distinto uma única vez."""
+    uniques = pd.Series(bairros.dropna().unique())
+    lookup = dict(zip(uniques, (normalize_bairro(b, normalization) for b in uniques)))
+    return bairros.map(lookup).fillna("N/A")
+
+
+def zone_lookup(zone_mapping):
+    """Dicionário bairro -> zona (a primeira zona que lista o bairro vence)."""
+    lookup = {}
+    for zone, bairros_list in zone_mapping.items():
+        for b in bairros_list:
+            lookup.setdefault(b, zone)
+    return lookup
+
+
+def zones_for(bairros_normalizados: pd.Series, zone_mapping) -> pd.Series:
+    """Zona de cada bairro já normalizado ("Sem zona" quando não mapeado)."""
+    return bairros_normalizados.map(zone_lookup(zone_mapping)).fillna("Sem zona")
@@ -0,0 +1,122 @@
+"""Detecção de mudanças entre capturas (histórico como log de mudanças esparso).
+
+Cada imóvel tem um hash de Preço, Condomínio, Área e Título. A cada coleta,
+só vão para o histórico os imóveis novos ou cujo hash mudou; os demais só
+atualizam ``last_seen`` no estado do rastreador::
+
+    tracker = ChangeTracker.load(state_dir("base/partitions"))
+    mudancas = tracker.diff(coerce_types(coleta))
+    write_partitions(mudancas, "base/partitions")
+    tracker.save(state_dir("base/partitions"))
+
+As visões temporais leem esse log com forward-fill
+(``aggregations.daily_mean_price_ffill``).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics.partitions import write_frame_atomic
+
+HASH_FIELDS = ['Preço', 'Condomínio', 'Área (m²)', 'Título/Descrição']
+DATE_COL = 'Data e Hora da Extração'
+STATE_FILE = "listings.parquet"
+RUNS_FILE = "runs.parquet"
+
+
+def state_dir(partitions_root):
+    """Diretório do estado do rastreador dentro da raiz das partições."""
+    return os.path.join(partitions_root, "_state")
+
+
+def listing_hash(df: pd.DataFrame) -> pd.Series:
+    """Hash (uint64) dos campos de ``HASH_FIELDS`` de cada linha (``df`` tipado)."""
+    fields = df.reindex(columns=HASH_FIELDS)
+    fields['Título/Descrição'] = fields['Título/Descrição'].fillna("").astype(str).str.strip()
+    return pd.util.hash_pandas_object(fields, index=False)
+
+
+class ChangeTracker:
+    """Último hash, primeira e última vez vista de cada ``ID Imóvel``, e as coletas já feitas."""
+
+    def __init__(self, state: pd.DataFrame = None, runs=()):
+        if state is None:
+            state = pd.DataFrame({
+                "hash": pd.Series(dtype="uint64"),
+                "first_seen": pd.Series(dtype=object),
+                "last_seen": pd.Series(dtype=object),
+            }, index=pd.Index([], name='ID Imóvel', dtype=object))
+        self.state = state
+        self.runs = sorted(set(runs))
+
+    @classmethod
+    def load(cls, directory):
+        """Lê o estado salvo (vazio se ``directory`` ainda não existir)."""
+        path = os.path.join(directory, STATE_FILE)
+        if not os.path.exists(path):
+            return cls()
+        runs_path = os.path.join(directory, RUNS_FILE)
+        runs = pd.read_parquet(runs_path)["ts"].tolist() if os.path.exists(runs_path) else ()
+        return cls(pd.read_parquet(path).set_index('ID Imóvel'), runs)
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame):
+        """Reconstrói o estado a partir de um histórico denso já existente."""
+        if df is None or df.empty:
+            return cls()
+        ordered = df.sort_values(DATE_COL, kind='stable')
+        ids = ordered['ID Imóvel']
+        dates = ordered[DATE_COL]
+        state = pd.DataFrame({
+            "hash": listing_hash(ordered).to_numpy(),
+            "first_seen": dates.groupby(ids).transform('min').to_numpy(),
+            "last_seen": dates.groupby(ids).transform('max').to_numpy(),
+        }, index=pd.Index(ids.to_numpy(), name='ID Imóvel'))
+        state = state[~state.index.duplicated(keep='last')]
+        return cls(state, dates.unique().tolist())
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        write_frame_atomic(self.state.reset_index(), os.path.join(directory, STATE_FILE))
+        write_frame_atomic(pd.DataFrame({"ts": self.runs}), os.path.join(directory, RUNS_FILE))
+
+    def diff(self, df: pd.DataFrame, seen_at=None) -> pd.DataFrame:
+        """Retorna só as linhas novas ou alteradas de uma coleta e atualiza o estado.
+
+        ``seen_at`` é o instante da coleta (padrão: maior data/hora de ``df``).
+        """
+        if df.empty:
+            return df.copy()
+        if seen_at is None:
+            seen_at = df[DATE_COL].max() if DATE_COL in df.columns else ""
+        df = df.drop_duplicates(subset=['ID Imóvel'], keep='last')
+        ids = df['ID Imóvel'].to_numpy()
+        hashes = listing_hash(df).to_numpy()
+
+        is_new = ~pd.Index(ids).isin(self.state.index)
+        # Sem reindex: NaN converteria os hashes uint64 para float e perderia bits
+        changed = is_new.copy()
+        changed[~is_new] = self.state['hash'].loc[ids[~is_new]].to_numpy() != hashes[~is_new]
+
+        first_seen = np.full(len(ids), seen_at, dtype=object)
+        first_seen[~is_new] = self.state['first_seen'].loc[ids[~is_new]].to_numpy()
+        known = self.state.index.isin(ids)
+        updated = pd.DataFrame(
+            {"hash": hashes.astype("uint64"), "first_seen": first_seen, "last_seen": seen_at},
+            index=pd.Index(ids, name='ID Imóvel'),
+        )
+        self.state = pd.concat([self.state[~known], updated])
+        self.runs = sorted(set(self.runs) | {seen_at})
+        return df[changed].copy()
+
+    @property
+    def last_seen(self) -> pd.Series:
+        """Última coleta em que cada imóvel apareceu (indexado por ``ID Imóvel``)."""
+        return self.state['last_seen']
+
+    @property
+    def capture_days(self) -> pd.Series:
+        """Dias em que houve coleta (inclusive os que não registraram mudanças)."""
+        return pd.Series(pd.to_datetime(pd.Series(self.runs, dtype=object)).dt.normalize().unique())
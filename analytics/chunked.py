@@ -0,0 +1,190 @@
+"""Processamento out-of-core: uma passada pelas partições (``analytics.partitions``).
+
+Cada acumulador recebe um arquivo de partição por vez e guarda apenas estado
+agregado, então o pico de memória depende do número de imóveis distintos e
+de bairros/dias, não do tamanho do histórico:
+
+- ``LatestAccumulator``: captura mais recente de cada imóvel (= ``latest_snapshot``);
+- ``BairroAccumulator``: somas/contagens/mín/máx por bairro (= ``bairro_stats``
+  e ``map_aggregates``);
+- ``DailyAccumulator``: soma e contagem de preço por dia (= ``daily_mean_price``).
+
+    python -m analytics.chunked base/partitions
+"""
+
+import sys
+from dataclasses import dataclass
+
+import pandas as pd
+
+from analytics.ingest import latest_snapshot
+from analytics.partitions import PARTITIONS_DIR, iter_chunks
+from analytics.schema import detect_columns
+
+DATE_COL = 'Data e Hora da Extração'
+
+
+def iter_frames(df: pd.DataFrame, chunk_size=50_000):
+    """Fatia um DataFrame em memória para alimentar os acumuladores."""
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+class LatestAccumulator:
+    """Mantém a captura mais recente por ID entre partições.
+
+    Empates de data/hora ficam com a linha da partição lida por último, a
+    mesma regra de ``latest_snapshot`` (ordenação estável, ``keep='last'``).
+    """
+
+    def __init__(self):
+        self._latest = None
+
+    def update(self, chunk: pd.DataFrame):
+        combined = chunk if self._latest is None else pd.concat([self._latest, chunk], ignore_index=True)
+        self._latest = latest_snapshot(combined)
+
+    def result(self) -> pd.DataFrame:
+        return self._latest if self._latest is not None else pd.DataFrame()
+
+
+class BairroAccumulator:
+    """Parciais combináveis por bairro; ``nunique`` de IDs via pares (bairro, ID) distintos."""
+
+    def __init__(self, col_bairro='Bairro'):
+        self.col_bairro = col_bairro
+        self._parts = None
+        self._ids = None
+
+    def update(self, chunk: pd.DataFrame):
+        g = chunk.groupby(self.col_bairro)
+        part = pd.DataFrame({
+            "n": g['Preço'].count(),
+            "soma_preco": g['Preço'].sum(),
+            "min_preco": g['Preço'].min(),
+            "max_preco": g['Preço'].max(),
+            "soma_pm2": g['Preço/m²'].sum(),
+            "n_pm2": g['Preço/m²'].count(),
+            "soma_area": g['Área (m²)'].sum(),
+            "n_area": g['Área (m²)'].count(),
+        })
+        ids = chunk[[self.col_bairro, 'ID Imóvel']].drop_duplicates()
+        if self._parts is None:
+            self._parts, self._ids = part, ids
+            return
+        combined = pd.concat([self._parts, part]).groupby(level=0)
+        self._parts = combined.sum().assign(
+            min_preco=combined['min_preco'].min(),
+            max_preco=combined['max_preco'].max(),
+        )
+        self._ids = pd.concat([self._ids, ids], ignore_index=True).drop_duplicates()
+
+    def _means(self) -> pd.DataFrame:
+        p = self._parts
+        means = pd.DataFrame({
+            "preco_medio": p["soma_preco"] / p["n"],
+            "pm2_medio": p["soma_pm2"] / p["n_pm2"],
+            "area_media": p["soma_area"] / p["n_area"],
+        })
+        means.index.name = self.col_bairro
+        return means
+
+    def map_aggregates(self) -> pd.DataFrame:
+        """Mesmo formato de ``aggregations.map_aggregates``."""
+        if self._parts is None:
+            return pd.DataFrame(columns=[self.col_bairro, "preco_medio", "pm2_medio", "area_media", "qtd"])
+        return self._means().assign(qtd=self._parts["n"]).reset_index()
+
+    def bairro_stats(self) -> pd.DataFrame:
+        """Mesmo formato de ``aggregations.bairro_stats``."""
+        if self._parts is None:
+            return pd.DataFrame(columns=[self.col_bairro, "Imóveis", "Preço Min", "Preço Max", "Preço Médio", "Preço/m² Médio", "Área Média"])
+        means = self._means()
+        stats = pd.DataFrame({
+            "Imóveis": self._ids.groupby(self.col_bairro)['ID Imóvel'].count(),
+            "Preço Min": self._parts["min_preco"],
+            "Preço Max": self._parts["max_preco"],
+            "Preço Médio": means["preco_medio"],
+            "Preço/m² Médio": means["pm2_medio"],
+            "Área Média": means["area_media"],
+        })
+        stats.index.name = self.col_bairro
+        return stats.round(2).reset_index().sort_values("Preço Médio", ascending=False)
+
+
+class DailyAccumulator:
+    """Soma e contagem de preço por dia de captura."""
+
+    def __init__(self):
+        self._sums = None
+
+    def update(self, chunk: pd.DataFrame):
+        dias = pd.to_datetime(chunk[DATE_COL]).dt.date.rename('Data')
+        part = chunk['Preço'].groupby(dias).agg(['sum', 'count'])
+        self._sums = part if self._sums is None else pd.concat([self._sums, part]).groupby(level=0).sum()
+
+    def daily_mean_price(self) -> pd.DataFrame:
+        """Mesmo formato de ``aggregations.daily_mean_price``."""
+        if self._sums is None:
+            return pd.DataFrame(columns=['Data', 'Preço'])
+        sums = self._sums.sort_index()
+        return (sums['sum'] / sums['count']).rename('Preço').reset_index()
+
+
+@dataclass
+class ChunkedResult:
+    """Saídas do modo out-of-core (mesmos formatos do caminho em memória)."""
+
+    latest: pd.DataFrame
+    bairro_stats: pd.DataFrame
+    map_aggregates: pd.DataFrame
+    daily_mean_price: pd.DataFrame
+    col_bairro: str = 'Bairro'
+    col_cidade: str = 'Cidade'
+    registros: int = 0
+    chunks: int = 0
+
+
+def process_chunks(chunks, col_bairro=None) -> ChunkedResult:
+    """Uma passada pelos ``chunks``: snapshot e série diária em streaming;
+    agregados por bairro sobre o snapshot final (como na aba Mapa de Calor)."""
+    latest_acc, daily_acc = LatestAccumulator(), DailyAccumulator()
+    registros = n_chunks = 0
+    col_cidade = 'Cidade'
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if n_chunks == 0:
+            detected_bairro, col_cidade = detect_columns(chunk)
+            col_bairro = col_bairro or detected_bairro
+        latest_acc.update(chunk)
+        if DATE_COL in chunk.columns:
+            daily_acc.update(chunk)
+        registros += len(chunk)
+        n_chunks += 1
+
+    latest = latest_acc.result()
+    bairro_acc = BairroAccumulator(col_bairro or 'Bairro')
+    for frame in iter_frames(latest):
+        bairro_acc.update(frame)
+    return ChunkedResult(
+        latest=latest,
+        bairro_stats=bairro_acc.bairro_stats(),
+        map_aggregates=bairro_acc.map_aggregates(),
+        daily_mean_price=daily_acc.daily_mean_price(),
+        col_bairro=col_bairro or 'Bairro',
+        col_cidade=col_cidade,
+        registros=registros,
+        chunks=n_chunks,
+    )
+
+
+def process_partitions(root=PARTITIONS_DIR, cidades=None, meses=None) -> ChunkedResult:
+    """``process_chunks`` sobre os arquivos de ``root`` (opcionalmente só algumas cidades/meses)."""
+    return process_chunks(iter_chunks(root, cidades=cidades, meses=meses))
+
+
+if __name__ == "__main__":
+    result = process_partitions(sys.argv[1] if len(sys.argv) > 1 else PARTITIONS_DIR)
+    print(f"{result.chunks} partições, {result.registros} registros, {len(result.latest)} imóveis únicos")
+    print(result.bairro_stats.head(10).to_string(index=False))
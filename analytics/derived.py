@@ -0,0 +1,109 @@
+"""Colunas derivadas, declaradas uma vez e calculadas na montagem do ``Dataset``.
+
+Cada coluna registrada com ``@derived`` tem nome, tipo, colunas de entrada e
+uma expressão vetorizada ``fn(df, history, col_bairro)``. ``history`` é o
+histórico sem linhas sinalizadas (``analytics.quality``), para colunas
+relativas ao bairro, como o IBairro.
+``add_derived`` avalia o registro inteiro uma vez por versão dos dados (em
+``Dataset.from_frame``). Dashboard, filtros, API e exportação leem as colunas
+pelo nome, sem recalcular a cada rerun.
+
+Uma coluna cujas entradas não existem na base é pulada. Assim, 'Custo Mensal
+(R$)' passa a existir quando o scraper começar a capturar o IPTU.
+
+    @derived('Preço/Vaga', 'float64', requires=('Preço', 'Vagas'))
+    def _preco_por_vaga(df, history, col_bairro):
+        return ratio(df['Preço'], df['Vagas'])
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from analytics.aggregations import bairro_pm2_reference, compute_ibairro
+
+AREA_BINS = [1, 40, 60, 80, 120, 200, np.inf]
+AREA_LABELS = ['até 40 m²', '40–60 m²', '60–80 m²', '80–120 m²', '120–200 m²', '200+ m²']
+AREA_DTYPE = pd.CategoricalDtype(AREA_LABELS, ordered=True)
+
+
+@dataclass(frozen=True)
+class DerivedColumn:
+    name: str
+    dtype: object
+    requires: tuple
+    fn: Callable
+    description: str = ""
+
+
+DERIVED_COLUMNS = {}
+
+
+def derived(name, dtype, requires=(), description=""):
+    """Registra ``fn`` como a expressão da coluna ``name`` (a ordem de registro é a das colunas)."""
+    def decorator(fn):
+        DERIVED_COLUMNS[name] = DerivedColumn(name, dtype, tuple(requires), fn, description or (fn.__doc__ or ""))
+        return fn
+    return decorator
+
+
+def ratio(num: pd.Series, den: pd.Series) -> np.ndarray:
+    """``num / den`` em float, NaN onde o denominador não é positivo."""
+    den = den.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den > 0, num.to_numpy(dtype=float) / den, np.nan)
+
+
+@derived('Condomínio/Preço (%)', 'float64', requires=('Condomínio', 'Preço'))
+def _condominio_preco(df, history, col_bairro):
+    """Condomínio mensal como % do preço de venda."""
+    return np.round(ratio(df['Condomínio'], df['Preço']) * 100, 3)
+
+
+@derived('Condomínio/m²', 'float64', requires=('Condomínio', 'Área (m²)'))
+def _condominio_m2(df, history, col_bairro):
+    """Condomínio mensal por m²."""
+    return np.round(ratio(df['Condomínio'], df['Área (m²)']), 2)
+
+
+@derived('Preço/Quarto', 'float64', requires=('Preço', 'Quartos'))
+def _preco_quarto(df, history, col_bairro):
+    """Preço dividido pelo número de quartos (vazio sem quartos)."""
+    return np.round(ratio(df['Preço'], df['Quartos']), 0)
+
+
+@derived('Faixa de Área', AREA_DTYPE, requires=('Área (m²)',))
+def _faixa_area(df, history, col_bairro):
+    """Faixa de área útil (vazia sem área)."""
+    return pd.cut(df['Área (m²)'], AREA_BINS, labels=AREA_LABELS, right=False)
+
+
+@derived('Custo Mensal (R$)', 'float64', requires=('Condomínio', 'IPTU'))
+def _custo_mensal(df, history, col_bairro):
+    """Condomínio + IPTU mensal (só quando a base tem IPTU)."""
+    return df['Condomínio'].to_numpy(dtype=float) + df['IPTU'].to_numpy(dtype=float)
+
+
+@derived('IBairro', 'float64', requires=('Preço/m²',))
+def _ibairro(df, history, col_bairro):
+    """Preço/m² do imóvel / Preço/m² médio do bairro no histórico sem linhas sinalizadas."""
+    return compute_ibairro(df, bairro_pm2_reference(history, col_bairro), col_bairro)
+
+
+def add_derived(df: pd.DataFrame, history: pd.DataFrame = None, col_bairro='Bairro') -> pd.DataFrame:
+    """Cópia de ``df`` com as colunas registradas cujas entradas existem (``history`` padrão: ``df``)."""
+    history = df if history is None else history
+    columns = {}
+    for column in DERIVED_COLUMNS.values():
+        if not all(c in df.columns for c in column.requires):
+            continue
+        values = column.fn(df, history, col_bairro)
+        columns[column.name] = pd.Series(values, index=df.index).astype(column.dtype)
+    return df.assign(**columns)
+
+
+def derived_names(df: pd.DataFrame) -> list:
+    """Colunas derivadas presentes em ``df``, na ordem do registro."""
+    return [name for name in DERIVED_COLUMNS if name in df.columns]
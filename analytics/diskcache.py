@@ -0,0 +1,140 @@
+"""Cache em disco de artefatos derivados, que sobrevive a reinícios do servidor.
+
+Cada artefato fica em ``<raiz>/<nome>/<chave>.pkl``. A chave é o hash dos
+argumentos (entre eles a versão dos dados, ``analytics.version``) mais a
+versão do código: o hash de ``CODE_INPUTS``, os fontes de ``analytics/`` e as
+tabelas de fora dele que os artefatos usam (coordenadas, normalização de
+bairros, ``utils/`` e o gazetteer). Mudar a base ou qualquer um desses
+arquivos gera uma chave nova; a versão do código é lida uma vez por processo. Gravação atômica
+(temporário + rename); arquivo ilegível conta como ausente.
+
+    @st.cache_data
+    @persist("price_events")
+    def get_price_events(_df_raw, col_bairro, data_version): ...
+
+Desligado com ``QA_DISK_CACHE=0``; a raiz vem de ``QA_CACHE_DIR`` (padrão ``base/.cache``).
+"""
+
+import functools
+import glob
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+
+CACHE_DIR = os.environ.get("QA_CACHE_DIR", os.path.join("base", ".cache"))
+KEEP_PER_ARTIFACT = 8
+_ANALYTICS_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_DIR = os.path.dirname(_ANALYTICS_DIR)
+# Relativos à raiz do repositório
+CODE_INPUTS = (
+    "analytics/*.py",
+    "utils/*.py",
+    "bairro_coordinates.py",
+    "scripts/utils/bairros_zonas.py",
+    "base/gazetteer_bairros.csv",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(root=_REPO_DIR) -> str:
+    """Hash de ``CODE_INPUTS`` (qualquer mudança neles invalida o cache)."""
+    h = hashlib.sha1()
+    for pattern in CODE_INPUTS:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            h.update(os.path.relpath(path, root).replace(os.sep, "/").encode())
+            with open(path, "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def _key(params: dict) -> str:
+    payload = repr(sorted((k, repr(v)) for k, v in params.items())).encode()
+    return f"{code_version()}-{hashlib.sha1(payload).hexdigest()[:16]}"
+
+
+class DiskCache:
+    def __init__(self, root=CACHE_DIR, keep=KEEP_PER_ARTIFACT):
+        self.root = root
+        self.keep = keep
+        self.hits = self.misses = 0
+
+    def path(self, name, params: dict) -> str:
+        return os.path.join(self.root, name, _key(params) + ".pkl")
+
+    def get_or_compute(self, name, params: dict, compute):
+        path = self.path(name, params)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            self.hits += 1
+            return value
+        except Exception:
+            pass
+        self.misses += 1
+        value = compute()
+        try:
+            self._write(path, value)
+            self._prune(os.path.dirname(path))
+        except Exception:
+            pass  # disco cheio/somente leitura: segue só com o valor em memória
+        return value
+
+    def _write(self, path, value):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _prune(self, directory):
+        """Mantém só os ``keep`` artefatos mais recentes de cada nome."""
+        files = sorted(glob.glob(os.path.join(directory, "*.pkl")), key=os.path.getmtime, reverse=True)
+        for old in files[self.keep:]:
+            os.remove(old)
+
+
+_default = None
+
+
+def default_cache():
+    """Cache do processo (None com ``QA_DISK_CACHE=0``)."""
+    global _default
+    if os.environ.get("QA_DISK_CACHE", "1") == "0":
+        return None
+    if _default is None:
+        _default = DiskCache()
+    return _default
+
+
+def persist(name, cache=None):
+    """Decorador: guarda o resultado em disco, chaveado pelos argumentos sem ``_`` (como o Streamlit)."""
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        # O corpo da função decorada também entra na chave (ela pode estar fora de analytics/)
+        try:
+            source = hashlib.sha1(inspect.getsource(fn).encode()).hexdigest()[:12]
+        except (OSError, TypeError):
+            source = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            store = cache or default_cache()
+            if store is None:
+                return fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if not k.startswith("_")}
+            params["__source__"] = source
+            return store.get_or_compute(name, params, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+"""Distribuições de R$/m² por bairro pré-calculadas (histograma + estatísticas de box).
+
+``BairroDistributions.build`` percorre as linhas uma vez por versão dos dados;
+depois disso, comparar bairros só recorta tabelas pequenas (bairros × bins e
+bairros × quantis), sem voltar às linhas a cada mudança de seleção.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+N_BINS = 40
+BOX_COLUMNS = ['Anúncios', 'Média', 'Mín', 'P05', 'P25', 'Mediana', 'P75', 'P95', 'Máx', 'Cerca Inf', 'Cerca Sup']
+
+
+@dataclass
+class BairroDistributions:
+    edges: np.ndarray        # N_BINS + 1 limites (escala log), comuns a todos os bairros
+    counts: pd.DataFrame     # bairro × bin
+    box: pd.DataFrame        # bairro × BOX_COLUMNS
+    value: str = 'Preço/m²'
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, col_bairro='Bairro', value='Preço/m²', bins=N_BINS):
+        data = df.loc[df[value] > 0, [col_bairro, value]].dropna()
+        v = data[value].to_numpy(dtype=float)
+        if len(v) == 0:
+            empty = pd.DataFrame(columns=BOX_COLUMNS)
+            return cls(np.array([0.0, 1.0]), pd.DataFrame(), empty, value)
+
+        # Extremos fora de P0,5–P99,5 caem nos bins das pontas
+        lo, hi = np.quantile(v, [0.005, 0.995])
+        edges = np.geomspace(lo, max(hi, lo * 1.01), bins + 1)
+        bin_idx = np.clip(np.searchsorted(edges, v, side='right') - 1, 0, bins - 1)
+        counts = (
+            pd.Series(1, index=pd.MultiIndex.from_arrays([data[col_bairro].to_numpy(), bin_idx]))
+            .groupby(level=[0, 1]).sum()
+            .unstack(fill_value=0)
+            .reindex(columns=range(bins), fill_value=0)
+        )
+
+        g = data.groupby(col_bairro)[value]
+        q = g.quantile([0.05, 0.25, 0.5, 0.75, 0.95]).unstack()
+        q.columns = ['P05', 'P25', 'Mediana', 'P75', 'P95']
+        box = pd.concat([g.size().rename('Anúncios'), g.mean().rename('Média'),
+                         g.min().rename('Mín'), q, g.max().rename('Máx')], axis=1)
+        # Bigodes de Tukey: valores extremos dentro de 1,5 × IQR
+        iqr = box['P75'] - box['P25']
+        fence_lo = data[col_bairro].map(box['P25'] - 1.5 * iqr)
+        fence_hi = data[col_bairro].map(box['P75'] + 1.5 * iqr)
+        inside = data[value].between(fence_lo, fence_hi)
+        box['Cerca Inf'] = data.loc[inside, value].groupby(data.loc[inside, col_bairro]).min()
+        box['Cerca Sup'] = data.loc[inside, value].groupby(data.loc[inside, col_bairro]).max()
+        box.index.name = col_bairro
+        return cls(edges, counts, box[BOX_COLUMNS], value)
+
+    @property
+    def centers(self) -> np.ndarray:
+        """Centro geométrico de cada bin."""
+        return np.sqrt(self.edges[:-1] * self.edges[1:])
+
+    def box_stats(self, bairros) -> pd.DataFrame:
+        """Estatísticas de box dos bairros pedidos (na ordem pedida, só os conhecidos)."""
+        return self.box.reindex([b for b in bairros if b in self.box.index])
+
+    def density(self, bairros) -> pd.DataFrame:
+        """Histograma normalizado (fração dos anúncios por bin) dos bairros pedidos, formato longo."""
+        counts = self.counts.reindex([b for b in bairros if b in self.counts.index])
+        share = counts.div(counts.sum(axis=1), axis=0)
+        share.columns = self.centers
+        out = share.stack().rename('Fração').reset_index()
+        out.columns = [self.box.index.name or 'Bairro', self.value, 'Fração']
+        return out
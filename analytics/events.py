@@ -0,0 +1,74 @@
+"""Eventos de mudança de preço entre capturas consecutivas do mesmo imóvel.
+
+A tabela é calculada uma vez por versão dos dados (shift vetorizado dentro de
+grupos de ``ID Imóvel`` ordenados por data) e fica indexada por
+(Data, Bairro), então recortes por período/bairro não varrem o histórico.
+Funciona tanto com histórico denso quanto com log de mudanças esparso.
+"""
+
+import pandas as pd
+
+DATE_COL = 'Data e Hora da Extração'
+EVENT_COLUMNS = [
+    'ID Imóvel', 'Cidade', 'Tipo', 'Título/Descrição', 'Preço Anterior', 'Preço',
+    'Variação (R$)', 'Variação (%)', 'Data Anterior', 'Dias', 'Link',
+]
+
+
+def price_events(df: pd.DataFrame, col_bairro='Bairro') -> pd.DataFrame:
+    """Uma linha por mudança de preço; índice (Data, ``col_bairro``) ordenado.
+
+    Capturas com preço 0 (sem preço na origem) não geram eventos.
+    """
+    cols = [c for c in ['ID Imóvel', col_bairro, 'Cidade', 'Tipo', 'Título/Descrição', 'Preço', DATE_COL, 'Link'] if c in df.columns]
+    hist = df.loc[df['Preço'] > 0, cols].copy()
+    hist['_ts'] = pd.to_datetime(hist[DATE_COL], errors='coerce')
+    hist = hist.dropna(subset=['_ts']).sort_values(['ID Imóvel', '_ts'], kind='stable')
+
+    by_id = hist.groupby('ID Imóvel', sort=False)
+    prev_price = by_id['Preço'].shift(1)
+    prev_ts = by_id['_ts'].shift(1)
+    changed = prev_price.notna() & (hist['Preço'] != prev_price)
+
+    events = hist[changed].assign(
+        **{
+            'Preço Anterior': prev_price[changed].astype('int64'),
+            'Data Anterior': prev_ts[changed],
+            'Data': hist.loc[changed, '_ts'].dt.normalize(),
+        }
+    )
+    events['Variação (R$)'] = events['Preço'] - events['Preço Anterior']
+    events['Variação (%)'] = (events['Variação (R$)'] / events['Preço Anterior'] * 100).round(2)
+    events['Dias'] = (events['_ts'] - events['Data Anterior']).dt.days
+    keep = [c for c in EVENT_COLUMNS if c in events.columns]
+    return events.set_index(['Data', col_bairro])[keep].sort_index()
+
+
+def recent_drops(events: pd.DataFrame, days=30, bairros=None, tipos=None, cidades=None, min_pct=0.0, until=None) -> pd.DataFrame:
+    """Reduções de preço dos últimos ``days`` dias (até ``until``, padrão: último evento), maiores primeiro.
+
+    ``days=None`` considera todo o histórico; ``min_pct`` é o tamanho mínimo da queda em %.
+    """
+    if events.empty:
+        return events.reset_index()
+    dates = events.index.get_level_values(0)
+    until = pd.Timestamp(until).normalize() if until is not None else dates.max()
+    window = events.loc[:until] if days is None else events.loc[until - pd.Timedelta(days=days - 1):until]
+    drops = window[window['Variação (%)'] <= -abs(min_pct)] if min_pct else window[window['Variação (R$)'] < 0]
+    if bairros is not None:
+        drops = drops[drops.index.get_level_values(1).isin(list(bairros))]
+    if tipos is not None and 'Tipo' in drops.columns:
+        drops = drops[drops['Tipo'].isin(list(tipos))]
+    if cidades and 'Cidade' in drops.columns:
+        drops = drops[drops['Cidade'].isin(list(cidades))]
+    return drops.reset_index().sort_values('Variação (%)', kind='stable')
+
+
+def drops_by_bairro(drops: pd.DataFrame, col_bairro='Bairro') -> pd.DataFrame:
+    """Quantidade de quedas e queda mediana (%) por bairro."""
+    return (
+        drops.groupby(col_bairro)
+        .agg(Quedas=('ID Imóvel', 'count'), **{'Queda Mediana (%)': ('Variação (%)', 'median')})
+        .reset_index()
+        .sort_values('Quedas', ascending=False)
+    )
@@ -0,0 +1,113 @@
+"""Exportação da seleção filtrada em Parquet, Arrow IPC ou CSV, gerada em blocos.
+
+A visão (histórico ou captura mais recente) é convertida para uma tabela
+Arrow uma vez por versão dos dados (``to_arrow``). Cada exportação percorre as
+posições filtradas em blocos de ``chunk_rows``: trechos contíguos viram
+``Table.slice`` (sem cópia), os demais ``Table.take`` só do bloco. O writer
+emite bytes a cada bloco, então a memória extra é de um bloco, não da seleção
+inteira, e o arquivo pode ir sendo enviado enquanto é gerado.
+
+    table = to_arrow(dataset.latest)
+    for chunk in iter_export(table, positions, "parquet"):
+        response.write(chunk)
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 65536
+# formato -> (Content-Type, extensão)
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+
+def to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Tabela Arrow da visão, sem o índice (feita uma vez por versão e compartilhada)."""
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def positions_of(view: pd.DataFrame, rows: pd.DataFrame) -> np.ndarray:
+    """Posições (iloc) em ``view`` das linhas de ``rows``, na ordem de ``rows``."""
+    return view.index.get_indexer(rows.index)
+
+
+class _ChunkSink:
+    """Destino de escrita que acumula os bytes do bloco atual até serem drenados."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _writer(fmt, sink, schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    if fmt == "csv":
+        return pa_csv.CSVWriter(sink, schema)
+    raise ValueError(f"formato desconhecido: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+
+
+def _blocks(table: pa.Table, positions, chunk_rows):
+    if positions is None:
+        for start in range(0, table.num_rows, chunk_rows):
+            yield table.slice(start, chunk_rows)
+        return
+    positions = np.asarray(positions, dtype=np.int64)
+    for start in range(0, len(positions), chunk_rows):
+        block = positions[start:start + chunk_rows]
+        if (np.diff(block) == 1).all():
+            yield table.slice(int(block[0]), len(block))
+        else:
+            yield table.take(pa.array(block))
+
+
+def iter_export(table: pa.Table, positions=None, fmt="parquet", chunk_rows=CHUNK_ROWS):
+    """Bytes do arquivo ``fmt`` com as linhas ``positions`` de ``table`` (todas se None), em blocos."""
+    sink = _ChunkSink()
+    writer = _writer(fmt, sink, table.schema)
+    try:
+        for block in _blocks(table, positions, chunk_rows):
+            writer.write_table(block)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def export_bytes(table: pa.Table, positions=None, fmt="parquet", chunk_rows=CHUNK_ROWS) -> bytes:
+    """O arquivo inteiro (para quem precisa de ``bytes``, como o botão de download)."""
+    return b"".join(iter_export(table, positions, fmt, chunk_rows))
@@ -0,0 +1,74 @@
+"""Estado dos filtros da sidebar e sua aplicação sobre um DataFrame de imóveis."""
+
+from dataclasses import dataclass, replace
+
+import pandas as pd
+
+from analytics.quality import QUALITY_COLUMN
+
+
+@dataclass(frozen=True)
+class FilterState:
+    """Seleção da sidebar. Listas vazias de cidade significam "todas", como no dashboard."""
+
+    col_bairro: str = 'Bairro'
+    col_cidade: str = 'Cidade'
+    cidades: tuple = ()
+    bairros: tuple = ()
+    tipos: tuple = ()
+    price: tuple = (0, 0)
+    area: tuple = (0, 0)
+    quartos: tuple = ()
+    # Bits de ``analytics.quality`` cujas linhas ficam de fora (0 = não exclui nada)
+    exclude_flags: int = 0
+
+    def with_selection(self, **changes):
+        """Cópia com campos alterados (listas são convertidas em tuplas)."""
+        changes = {k: tuple(v) if isinstance(v, (list, set)) else v for k, v in changes.items()}
+        return replace(self, **changes)
+
+
+def default_filter_state(df: pd.DataFrame, col_bairro='Bairro', col_cidade='Cidade') -> FilterState:
+    """Seleção padrão do dashboard: todas as opções e faixas completas de ``df``."""
+    return FilterState(
+        col_bairro=col_bairro,
+        col_cidade=col_cidade,
+        cidades=tuple(sorted(df[col_cidade].dropna().unique().tolist())) if col_cidade in df.columns else (),
+        bairros=tuple(sorted(df[col_bairro].dropna().unique().tolist())) if col_bairro in df.columns else (),
+        tipos=tuple(sorted(df['Tipo'].dropna().unique().tolist())) if 'Tipo' in df.columns else (),
+        price=(int(df['Preço'].min()), int(df['Preço'].max())) if not df.empty else (0, 1000000),
+        area=(int(df['Área (m²)'].min()), int(df['Área (m²)'].max())) if not df.empty else (0, 1000),
+        quartos=tuple(sorted(df['Quartos'].dropna().unique().tolist())) if 'Quartos' in df.columns else (),
+    )
+
+
+def filter_mask(df: pd.DataFrame, state: FilterState) -> pd.Series:
+    """Máscara booleana dos filtros da sidebar (cidade, bairro, tipo, preço, área, quartos)."""
+    mask = map_filter_mask(df, state)
+    mask &= df['Preço'].between(state.price[0], state.price[1])
+    mask &= df['Área (m²)'].between(state.area[0], state.area[1])
+    if state.col_cidade in df.columns and state.cidades:
+        mask &= df[state.col_cidade].isin(state.cidades)
+    return mask
+
+
+def map_filter_mask(df: pd.DataFrame, state: FilterState) -> pd.Series:
+    """Máscara do mapa de calor: bairro, tipo, quartos e qualidade (sem preço/área)."""
+    mask = (
+        df[state.col_bairro].isin(state.bairros) &
+        df['Tipo'].isin(state.tipos) &
+        df['Quartos'].isin(state.quartos)
+    )
+    if state.exclude_flags and QUALITY_COLUMN in df.columns:
+        mask &= (df[QUALITY_COLUMN].to_numpy() & state.exclude_flags) == 0
+    return mask
+
+
+def apply_filters(df: pd.DataFrame, state: FilterState) -> pd.DataFrame:
+    """Retorna uma cópia de ``df`` com os filtros da sidebar aplicados."""
+    return df[filter_mask(df, state)].copy()
+
+
+def apply_map_filters(df: pd.DataFrame, state: FilterState) -> pd.DataFrame:
+    """Retorna uma cópia de ``df`` com os filtros do mapa de calor aplicados."""
+    return df[map_filter_mask(df, state)].copy()
@@ -0,0 +1,177 @@
+"""Coordenadas dos bairros resolvidas na ingestão, com métricas de cobertura.
+
+``BAIRRO_COORDINATES`` usa nomes sem acento ("Consolacao"), e a base traz os
+nomes do site ("Consolação"). Sem resolução, mais da metade dos anúncios sumia
+do mapa (``criar_mapa_calor`` descarta bairros sem coordenada) e ficava sem
+posição nos similares. Cada nome distinto passa, em ordem, por:
+
+1. ``exato``: o nome está em ``BAIRRO_COORDINATES``;
+2. ``normalizacao``: ``BAIRROS_NORMALIZATION`` (scripts/utils/bairros_zonas.py)
+   leva a um nome com coordenada;
+3. ``acentos``: igual a um nome conhecido sem acento, caixa e espaços extras;
+4. ``aproximado``: erro de digitação (``difflib``). Só a parte distintiva do
+   nome é comparada, com o mesmo prefixo genérico ("Vila", "Jardim"...) e corte
+   ``FUZZY_CUTOFF``; Vila Maria e Vila Mariana continuam bairros diferentes;
+5. ``gazetteer``: o arquivo offline ``GAZETTEER_FILE`` (CSV bairro, lat, lon),
+   sem consulta de rede;
+6. ``sem_coordenada``: o bairro fica fora do mapa e aparece no relatório.
+
+Nenhuma coordenada é inventada: o que não casa fica em ``sem_coordenada``.
+``scripts/utils/find_unmapped.py --template`` gera o CSV a preencher.
+"""
+
+import difflib
+import hashlib
+import logging
+import os
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from bairro_coordinates import BAIRRO_COORDINATES
+
+try:
+    from scripts.utils.bairros_zonas import BAIRROS_NORMALIZATION
+except ImportError:  # fora da raiz do repositório
+    BAIRROS_NORMALIZATION = {}
+
+logger = logging.getLogger("quintoandar.geo")
+
+GAZETTEER_FILE = os.path.join("base", "gazetteer_bairros.csv")
+FUZZY_CUTOFF = 0.93
+GENERIC_WORDS = {"vila", "jardim", "parque", "chacara", "conjunto", "residencial", "cidade", "alto", "bosque"}
+METHODS = {
+    "exato": "Nome igual ao de BAIRRO_COORDINATES",
+    "normalizacao": "Tabela de normalização",
+    "acentos": "Igual sem acento/caixa",
+    "aproximado": "Erro de digitação (difflib)",
+    "gazetteer": "Arquivo gazetteer offline",
+    "sem_coordenada": "Sem coordenada (fora do mapa)",
+}
+GEO_COLUMNS = ["lat", "lon", "metodo", "referencia"]
+
+
+def fold(name) -> str:
+    """Nome sem acento, em minúsculas e com espaços simples (chave de comparação)."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.lower().split())
+
+
+def _split_generic(folded):
+    """(prefixo genérico, parte distintiva): 'vila santa clara' -> ('vila', 'santa clara')."""
+    words = folded.split()
+    n = 0
+    while n < len(words) - 1 and words[n] in GENERIC_WORDS:
+        n += 1
+    return " ".join(words[:n]), " ".join(words[n:])
+
+
+def load_gazetteer(path=GAZETTEER_FILE) -> dict:
+    """Nome (``fold``) -> (lat, lon) do CSV offline; vazio se o arquivo não existir."""
+    if not path or not os.path.exists(path):
+        return {}
+    table = pd.read_csv(path).dropna(subset=["bairro", "lat", "lon"])
+    return {fold(b): (float(lat), float(lon)) for b, lat, lon in zip(table["bairro"], table["lat"], table["lon"])}
+
+
+class BairroResolver:
+    """Resolve nomes de bairro em coordenadas (veja os passos no topo do módulo)."""
+
+    def __init__(self, coordinates=None, normalization=None, gazetteer=None, cutoff=FUZZY_CUTOFF):
+        self.coordinates = BAIRRO_COORDINATES if coordinates is None else coordinates
+        self.normalization = BAIRROS_NORMALIZATION if normalization is None else normalization
+        self.gazetteer = load_gazetteer() if gazetteer is None else gazetteer
+        self.cutoff = cutoff
+        # Vocabulário sem acento: nomes com coordenada e chaves da normalização que levam a eles
+        self._known = {fold(name): name for name in self.coordinates}
+        for key, canonical in self.normalization.items():
+            target = canonical if canonical in self.coordinates else self._known.get(fold(canonical))
+            if target is not None:
+                self._known.setdefault(fold(key), target)
+        self._by_prefix = {}
+        for folded, name in self._known.items():
+            prefix, core = _split_generic(folded)
+            self._by_prefix.setdefault(prefix, {}).setdefault(core, name)
+
+    def resolve_one(self, name) -> tuple:
+        """(lat, lon, método, nome de referência) de um bairro."""
+        if name in self.coordinates:
+            return (*self.coordinates[name], "exato", name)
+        canonical = self.normalization.get(str(name).strip().lower())
+        if canonical is not None:
+            target = canonical if canonical in self.coordinates else self._known.get(fold(canonical))
+            if target is not None:
+                return (*self.coordinates[target], "normalizacao", target)
+        folded = fold(name)
+        if folded in self._known:
+            match = self._known[folded]
+            return (*self.coordinates[match], "acentos", match)
+        prefix, core = _split_generic(folded)
+        candidates = self._by_prefix.get(prefix, {})
+        close = difflib.get_close_matches(core, list(candidates), n=1, cutoff=self.cutoff) if core else []
+        if close:
+            match = candidates[close[0]]
+            return (*self.coordinates[match], "aproximado", match)
+        if folded in self.gazetteer:
+            return (*self.gazetteer[folded], "gazetteer", name)
+        return (np.nan, np.nan, "sem_coordenada", None)
+
+    def resolve(self, names) -> pd.DataFrame:
+        """Uma linha por nome distinto (índice = nome) com ``GEO_COLUMNS``."""
+        names = pd.Series(pd.unique(pd.Series(list(names), dtype=object).dropna()), dtype=object)
+        rows = [self.resolve_one(name) for name in names]
+        table = pd.DataFrame(rows, columns=GEO_COLUMNS, index=pd.Index(names, name="bairro"))
+        return table.astype({"lat": float, "lon": float})
+
+
+def default_resolver() -> BairroResolver:
+    """Resolvedor com as tabelas do repositório e o gazetteer padrão (refeito quando o gazetteer muda)."""
+    mtime = os.path.getmtime(GAZETTEER_FILE) if os.path.exists(GAZETTEER_FILE) else None
+    return _resolver(GAZETTEER_FILE, mtime)
+
+
+@lru_cache(maxsize=2)
+def _resolver(path, mtime) -> BairroResolver:
+    return BairroResolver(gazetteer=load_gazetteer(path))
+
+
+def geo_fingerprint(geo: pd.DataFrame) -> str:
+    """Hash dos bairros e coordenadas resolvidos (entra na chave dos artefatos que usam posições)."""
+    found = geo.dropna(subset=["lat", "lon"])[["lat", "lon"]].sort_index()
+    return hashlib.sha1(pd.util.hash_pandas_object(found, index=True).to_numpy().tobytes()).hexdigest()[:16]
+
+
+def coordinates_of(geo: pd.DataFrame) -> dict:
+    """Bairro -> (lat, lon) dos nomes resolvidos (mesmo formato de ``BAIRRO_COORDINATES``)."""
+    found = geo.dropna(subset=["lat", "lon"])
+    return dict(zip(found.index, zip(found["lat"], found["lon"])))
+
+
+def coverage_report(bairros: pd.Series, geo: pd.DataFrame) -> pd.DataFrame:
+    """Bairros e anúncios por método de resolução, com o total com coordenada."""
+    counts = bairros.value_counts()
+    metodo = geo["metodo"].reindex(counts.index).fillna("sem_coordenada")
+    total = max(int(counts.sum()), 1)
+    rows = [(m, desc, int((metodo == m).sum()), int(counts[metodo == m].sum())) for m, desc in METHODS.items()]
+    mapped = metodo != "sem_coordenada"
+    rows.append(("com_coordenada", "No mapa (todos os métodos)", int(mapped.sum()), int(counts[mapped].sum())))
+    report = pd.DataFrame(rows, columns=["Método", "Descrição", "Bairros", "Anúncios"])
+    report["%"] = (report["Anúncios"] / total * 100).round(2)
+    return report
+
+
+def unmapped(bairros: pd.Series, geo: pd.DataFrame) -> pd.DataFrame:
+    """Bairros sem coordenada e seus anúncios, do maior para o menor."""
+    counts = bairros.value_counts()
+    missing = geo.index[geo["metodo"] == "sem_coordenada"]
+    counts = counts[counts.index.isin(missing)]
+    return counts.rename_axis("Bairro").reset_index(name="Anúncios")
+
+
+def log_coverage(bairros: pd.Series, geo: pd.DataFrame):
+    report = coverage_report(bairros, geo).set_index("Método")
+    logger.info("cobertura do mapa: %.1f%% dos anúncios (%d de %d bairros); por método: %s",
+                report.loc["com_coordenada", "%"], report.loc["com_coordenada", "Bairros"], len(geo),
+                ", ".join(f"{m}={int(report.loc[m, 'Anúncios'])}" for m in METHODS))
@@ -0,0 +1,110 @@
+"""Modelo hedônico de preço: log(Preço) sobre área, quartos, condomínio, tipo e bairro.
+
+O modelo é ajustado uma vez por versão dos dados (captura mais recente, só
+linhas sem sinalização de qualidade) por mínimos quadrados esparsos (``scipy.sparse.linalg.lsqr``; sem SciPy, cai
+para ``numpy.linalg.lstsq`` na matriz densa). Tipo e bairro entram como
+efeitos fixos (uma coluna indicadora por categoria). Pontuar a base inteira
+é um produto matriz × vetor: ``score`` devolve "Preço justo" e "Resíduo (%)"
+(negativo = anunciado abaixo do que o modelo espera).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from analytics.quality import QUALITY_COLUMN
+
+try:
+    from scipy import sparse
+    from scipy.sparse.linalg import lsqr
+    HAS_SCIPY = True
+except Exception:
+    HAS_SCIPY = False
+
+NUMERIC_FEATURES = ['log_area', 'quartos', 'log_condominio', 'sem_condominio']
+
+
+def _numeric(df: pd.DataFrame) -> np.ndarray:
+    area = df['Área (m²)'].to_numpy(dtype=float)
+    quartos = pd.to_numeric(df['Quartos'], errors='coerce').fillna(0).clip(0, 10).to_numpy(dtype=float) \
+        if 'Quartos' in df.columns else np.zeros(len(df))
+    condo = df['Condomínio'].fillna(0).to_numpy(dtype=float) if 'Condomínio' in df.columns else np.zeros(len(df))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_area = np.where(area > 0, np.log(area), np.nan)
+    return np.column_stack([log_area, quartos, np.log1p(np.clip(condo, 0, None)), (condo <= 0).astype(float)])
+
+
+@dataclass
+class HedonicModel:
+    coef: np.ndarray         # intercepto, NUMERIC_FEATURES, tipos[1:], bairros[1:]
+    tipos: pd.Index
+    bairros: pd.Index
+    col_bairro: str = 'Bairro'
+    n_obs: int = 0
+    r2: float = 0.0
+
+    def _design(self, df: pd.DataFrame):
+        """Matriz de desenho (CSR com SciPy, densa sem); categorias desconhecidas ficam na base."""
+        n = len(df)
+        num = np.nan_to_num(_numeric(df))
+        k_num = 1 + num.shape[1]
+        tipo_idx = self.tipos.get_indexer(df['Tipo'])
+        bairro_idx = self.bairros.get_indexer(df[self.col_bairro])
+        # Categoria 0 é a base (sem coluna); -1 = desconhecida
+        tipo_col = np.where(tipo_idx > 0, k_num + tipo_idx - 1, -1)
+        bairro_col = np.where(bairro_idx > 0, k_num + len(self.tipos) - 1 + bairro_idx - 1, -1)
+
+        rows = [np.repeat(np.arange(n), k_num)]
+        cols = [np.tile(np.arange(k_num), n)]
+        vals = [np.column_stack([np.ones(n), num]).ravel()]
+        for cat_col in (tipo_col, bairro_col):
+            hit = cat_col >= 0
+            rows.append(np.flatnonzero(hit))
+            cols.append(cat_col[hit])
+            vals.append(np.ones(hit.sum()))
+        rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+        shape = (n, len(self.coef))
+        if HAS_SCIPY:
+            return sparse.csr_matrix((vals, (rows, cols)), shape=shape)
+        X = np.zeros(shape)
+        X[rows, cols] = vals
+        return X
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, col_bairro='Bairro'):
+        """Ajusta em ``df`` (tipado); usa só linhas com Preço e Área positivos e sem sinalização.
+
+        Outliers e valores fora da faixa (``analytics.quality``) distorceriam o
+        preço justo de todos; ``score`` continua valendo para qualquer linha.
+        """
+        train = df[(df['Preço'] > 0) & (df['Área (m²)'] > 0)]
+        if QUALITY_COLUMN in train.columns:
+            train = train[train[QUALITY_COLUMN] == 0]
+        tipos = pd.Index(train['Tipo'].value_counts().index)
+        bairros = pd.Index(train[col_bairro].value_counts().index)
+        n_coef = 1 + len(NUMERIC_FEATURES) + max(len(tipos) - 1, 0) + max(len(bairros) - 1, 0)
+        model = cls(np.zeros(n_coef), tipos, bairros, col_bairro, n_obs=len(train))
+        if train.empty:
+            return model
+        X = model._design(train)
+        y = np.log(train['Preço'].to_numpy(dtype=float))
+        if HAS_SCIPY:
+            model.coef = lsqr(X, y, damp=1e-6, atol=1e-10, btol=1e-10, iter_lim=5000)[0]
+        else:
+            model.coef = np.linalg.lstsq(X, y, rcond=None)[0]
+        resid = y - X @ model.coef
+        model.r2 = float(1 - resid.var() / y.var()) if y.var() > 0 else 0.0
+        return model
+
+    def predict(self, df: pd.DataFrame) -> pd.Series:
+        """Preço justo de cada linha (NaN sem área válida)."""
+        fair = np.exp(self._design(df) @ self.coef)
+        fair[~(df['Área (m²)'].to_numpy(dtype=float) > 0)] = np.nan
+        return pd.Series(fair, index=df.index, name='Preço justo')
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``df`` com 'Preço justo' e 'Resíduo (%)' (Preço / Preço justo - 1)."""
+        fair = self.predict(df)
+        resid = (df['Preço'] / fair - 1) * 100
+        return df.assign(**{'Preço justo': fair.round(0), 'Resíduo (%)': resid.where(df['Preço'] > 0).round(1)})
@@ -0,0 +1,53 @@
+"""Leitura e tipagem da base de imóveis, sem dependência do Streamlit.
+
+O dashboard envolve estas funções com ``st.cache_data``; benchmarks e scripts
+chamam diretamente.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def read_listings(file_path):
+    """Lê a planilha bruta. Retorna None se o arquivo não existir."""
+    if not os.path.exists(file_path):
+        return None
+    return pd.read_excel(file_path, dtype={'ID Imóvel': str})
+
+
+def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Garante tipos numéricos e recalcula Preço/m² (modifica e retorna ``df``).
+
+    Valores ilegíveis viram 0; ``analytics.quality`` sinaliza essas linhas e os
+    filtros as excluem pela coluna 'Qualidade'.
+    """
+    for col in ['Preço', 'Condomínio', 'Preço/m²']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(r'[R$\s\.]', '', regex=True).str.replace(',', ''), errors='coerce').fillna(0).astype(int)
+    df['Área (m²)'] = pd.to_numeric(df['Área (m²)'], errors='coerce').fillna(0).astype(int)
+    df['Quartos'] = pd.to_numeric(df['Quartos'], errors='coerce').fillna(0).astype(int)
+
+    # Recalcular Preço/m² para consistência (0 quando não há área)
+    area = df['Área (m²)'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pm2 = np.where(area > 0, df['Preço'].to_numpy() / area, 0.0)
+    df['Preço/m²'] = np.round(pm2, 2)
+
+    return df
+
+
+def load_listings(file_path):
+    """Lê e tipa a base completa (histórico de capturas)."""
+    df = read_listings(file_path)
+    if df is None:
+        return None
+    return coerce_types(df)
+
+
+def latest_snapshot(df: pd.DataFrame) -> pd.DataFrame:
+    """Mantém apenas a captura mais recente de cada imóvel."""
+    if 'Data e Hora da Extração' in df.columns:
+        return df.sort_values('Data e Hora da Extração', kind='stable').drop_duplicates(subset=['ID Imóvel'], keep='last').copy()
+    return df.drop_duplicates(subset=['ID Imóvel'], keep='last').copy()
@@ -0,0 +1,181 @@
+"""Instrumentação opcional dos estágios do dashboard (tempo, alocações, tamanhos).
+
+Uso::
+
+    perf = StageProfiler(enabled=True, track_allocations=True)
+    with perf.stage("filters") as s:
+        result = run_query(dataset, state)     # analytics.query
+        s.rows = len(result.rows)
+    perf.log()           # uma linha JSON no logger ``quintoandar.perf``
+    perf.records         # lista de dicts para exibir no painel
+
+Desligado (padrão), ``stage()`` devolve um contexto vazio e o custo é
+praticamente nulo, então as chamadas podem ficar no código de produção.
+
+``tracemalloc`` vale para o processo inteiro: medir alocações é uma opção do
+servidor (``QA_PERF=alloc``), não de sessão, e o rastreamento fica ligado só
+enquanto houver um profiler aberto (``close()``, chamado por ``log()``). Com
+sessões simultâneas, o pico não é atribuível a um estágio e fica de fora.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+
+logger = logging.getLogger("quintoandar.perf")
+
+# Ativa por variável de ambiente: QA_PERF=1 (tempo) ou QA_PERF=alloc (tempo + alocações)
+PERF_ENV_VAR = "QA_PERF"
+# Arquivo JSONL opcional para o log estruturado (padrão: stderr)
+PERF_LOG_ENV_VAR = "QA_PERF_LOG"
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False  # ligado por nós (e não, por exemplo, por PYTHONTRACEMALLOC)
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _sole_tracer() -> bool:
+    with _tracing_lock:
+        return _tracing_users == 1
+
+
+def _ensure_log_handler():
+    """Garante que o log estruturado saia em algum lugar (uma linha JSON por rerun)."""
+    if logger.handlers:
+        return
+    path = os.environ.get(PERF_LOG_ENV_VAR)
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class _Stage:
+    """Registro de um estágio; ``rows`` pode ser preenchido dentro do bloco."""
+
+    __slots__ = ("name", "rows", "extra")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.extra = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _TimedStage(_Stage):
+    __slots__ = ("profiler", "t0", "mem0")
+
+    def __init__(self, profiler, name, rows=None):
+        super().__init__(name, rows)
+        self.profiler = profiler
+
+    def __enter__(self):
+        if self.profiler.track_allocations:
+            self.mem0 = tracemalloc.get_traced_memory()[0]
+            if _sole_tracer():
+                tracemalloc.reset_peak()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.t0
+        record = {"stage": self.name, "ms": round(elapsed * 1000, 2), "rows": self.rows}
+        if self.profiler.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            record["alloc_net_kb"] = round((current - self.mem0) / 1024, 1)
+            if _sole_tracer():
+                record["alloc_peak_kb"] = round((peak - self.mem0) / 1024, 1)
+            else:
+                record["alloc_shared"] = True  # outra sessão alocando ao mesmo tempo
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(self.extra)
+        self.profiler.records.append(record)
+        return False
+
+
+class StageProfiler:
+    """Coleta métricas por estágio de um rerun do dashboard."""
+
+    def __init__(self, enabled=False, track_allocations=False):
+        self.enabled = enabled
+        self.track_allocations = enabled and track_allocations
+        self.run_id = uuid.uuid4().hex[:8]
+        self.records = []
+        self._t0 = time.perf_counter()
+        self._release = None
+        if self.track_allocations:
+            _acquire_tracing()
+            # Libera também se o rerun parar antes do log (st.stop, exceção)
+            self._release = weakref.finalize(self, _release_tracing)
+
+    @classmethod
+    def from_env(cls, override=None):
+        """Cria o profiler a partir de ``QA_PERF`` ou de ``override`` (ex.: query param).
+
+        ``override`` só liga a medição de tempo; alocações dependem de ``QA_PERF=alloc``.
+        """
+        env = os.environ.get(PERF_ENV_VAR, "").strip().lower()
+        mode = override.strip().lower() if override is not None else env
+        if mode in ("", "0", "false", "off"):
+            return cls(enabled=False)
+        _ensure_log_handler()
+        return cls(enabled=True, track_allocations=(env == "alloc"))
+
+    def close(self):
+        """Para o rastreamento de alocações se este era o último profiler que o usava."""
+        if self._release is not None:
+            self._release()
+
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            return _Stage(name, rows)
+        return _TimedStage(self, name, rows)
+
+    def total_ms(self):
+        return round((time.perf_counter() - self._t0) * 1000, 2)
+
+    def summary(self):
+        """Dicionário estruturado do rerun (o mesmo que vai para o log)."""
+        return {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "run_id": self.run_id,
+            "total_ms": self.total_ms(),
+            "stages": self.records,
+        }
+
+    def log(self, level=logging.INFO):
+        if not self.enabled:
+            return
+        self.close()
+        logger.log(level, json.dumps(self.summary(), ensure_ascii=False, default=str))
@@ -0,0 +1,144 @@
+"""Ciclo de vida dos anúncios: primeira/última captura, nº de capturas e status.
+
+A tabela é atualizada por lote (``update``) sem reler o histórico: cada lote
+é agregado por ``ID Imóvel`` e combinado com o estado anterior (mín/máx/soma).
+O status vem da última coleta de cada (cidade, bairro): um anúncio que não
+apareceu na coleta mais recente do seu bairro é considerado removido.
+
+``ListingStore.append`` mantém a tabela em ``base/partitions/_state/``.
+"""
+
+import os
+
+import pandas as pd
+
+from analytics.partitions import write_frame_atomic
+
+DATE_COL = 'Data e Hora da Extração'
+LIFECYCLE_FILE = "lifecycle.parquet"
+LIFECYCLE_RUNS_FILE = "lifecycle_runs.parquet"
+ATIVO, REMOVIDO = "ativo", "removido"
+
+_TABLE_COLUMNS = ['first_seen', 'last_seen', 'n_captures', 'Cidade', 'Bairro', 'Tipo', 'Preço']
+
+
+class LifecycleTable:
+    """Uma linha por ``ID Imóvel`` + última coleta por (Cidade, Bairro)."""
+
+    def __init__(self, table: pd.DataFrame = None, runs: pd.Series = None):
+        if table is None:
+            table = pd.DataFrame({
+                'first_seen': pd.Series(dtype='datetime64[ns]'),
+                'last_seen': pd.Series(dtype='datetime64[ns]'),
+                'n_captures': pd.Series(dtype='int64'),
+                'Cidade': pd.Series(dtype=object),
+                'Bairro': pd.Series(dtype=object),
+                'Tipo': pd.Series(dtype=object),
+                'Preço': pd.Series(dtype='int64'),
+            }, index=pd.Index([], name='ID Imóvel', dtype=object))
+        if runs is None:
+            runs = pd.Series(dtype='datetime64[ns]', index=pd.MultiIndex.from_tuples([], names=['Cidade', 'Bairro']), name='last_run')
+        self.table = table
+        self.runs = runs
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, col_bairro='Bairro', col_cidade='Cidade'):
+        """Monta a tabela a partir de um histórico completo (um único lote)."""
+        return cls().update(df, col_bairro, col_cidade)
+
+    def update(self, batch: pd.DataFrame, col_bairro='Bairro', col_cidade='Cidade'):
+        """Incorpora um lote de capturas (tipado). Retorna ``self``."""
+        if batch is None or batch.empty:
+            return self
+        caps = pd.DataFrame({
+            'id': batch['ID Imóvel'].to_numpy(),
+            'ts': pd.to_datetime(batch[DATE_COL], errors='coerce').to_numpy(),
+            'Cidade': batch[col_cidade].fillna("").to_numpy() if col_cidade in batch.columns else "",
+            'Bairro': batch[col_bairro].to_numpy(),
+            'Tipo': batch['Tipo'].to_numpy() if 'Tipo' in batch.columns else "",
+            'Preço': batch['Preço'].to_numpy(),
+        }).dropna(subset=['ts']).sort_values('ts', kind='stable')
+        if caps.empty:
+            return self
+
+        agg = caps.groupby('id', sort=False).agg(
+            first_seen=('ts', 'min'), last_seen=('ts', 'max'), n_captures=('ts', 'size'),
+            Cidade=('Cidade', 'last'), Bairro=('Bairro', 'last'), Tipo=('Tipo', 'last'), Preço=('Preço', 'last'),
+        )
+        agg.index.name = 'ID Imóvel'
+        old = self.table.reindex(agg.index)
+        known = old['last_seen'].notna()
+        # Atributos do lote só substituem os antigos se o lote for mais recente
+        newer = ~known | (agg['last_seen'] >= old['last_seen'])
+        merged = pd.DataFrame({
+            'first_seen': agg['first_seen'].where(~known | (agg['first_seen'] < old['first_seen']), old['first_seen']),
+            'last_seen': agg['last_seen'].where(newer, old['last_seen']),
+            'n_captures': agg['n_captures'] + old['n_captures'].fillna(0).astype('int64'),
+        }, index=agg.index)
+        for col in ['Cidade', 'Bairro', 'Tipo', 'Preço']:
+            merged[col] = agg[col].where(newer, old[col])
+        merged['Preço'] = merged['Preço'].astype('int64')
+        self.table = pd.concat([self.table[~self.table.index.isin(agg.index)], merged[_TABLE_COLUMNS]])
+
+        batch_runs = caps.groupby(['Cidade', 'Bairro'])['ts'].max()
+        self.runs = pd.concat([self.runs, batch_runs]).groupby(level=[0, 1]).max().rename('last_run')
+        self.runs.index.names = ['Cidade', 'Bairro']
+        return self
+
+    def frame(self, grace_days=0) -> pd.DataFrame:
+        """Tabela com ``status`` e ``dias_no_mercado`` (um anúncio por linha).
+
+        ``grace_days`` tolera coletas parciais: só é "removido" quem ficou mais
+        de ``grace_days`` dias sem aparecer antes da última coleta do bairro.
+        """
+        out = self.table.reset_index()
+        last_run = pd.Series(self.runs.reindex(pd.MultiIndex.from_frame(out[['Cidade', 'Bairro']])).to_numpy())
+        cutoff = last_run.dt.normalize() - pd.Timedelta(days=grace_days)
+        ativo = last_run.isna() | (out['last_seen'].dt.normalize() >= cutoff)
+        out['status'] = ativo.map({True: ATIVO, False: REMOVIDO}).to_numpy()
+        out['dias_no_mercado'] = (out['last_seen'].dt.normalize() - out['first_seen'].dt.normalize()).dt.days
+        return out
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        write_frame_atomic(self.table.reset_index(), os.path.join(directory, LIFECYCLE_FILE))
+        write_frame_atomic(self.runs.reset_index(), os.path.join(directory, LIFECYCLE_RUNS_FILE))
+
+    @classmethod
+    def load(cls, directory):
+        """Lê a tabela salva (vazia se ainda não existir)."""
+        path = os.path.join(directory, LIFECYCLE_FILE)
+        if not os.path.exists(path):
+            return cls()
+        table = pd.read_parquet(path).set_index('ID Imóvel')
+        runs = pd.read_parquet(os.path.join(directory, LIFECYCLE_RUNS_FILE)).set_index(['Cidade', 'Bairro'])['last_run']
+        return cls(table, runs)
+
+
+def lifecycle_kpis(frame: pd.DataFrame, recent_days=7) -> dict:
+    """Ativos, removidos, novos no período e mediana de dias no mercado."""
+    if frame.empty:
+        return {"ativos": 0, "removidos": 0, "novos": 0, "dias_mediana_ativos": None, "dias_mediana_removidos": None}
+    ativos = frame[frame['status'] == ATIVO]
+    removidos = frame[frame['status'] == REMOVIDO]
+    inicio = frame['last_seen'].max().normalize() - pd.Timedelta(days=recent_days - 1)
+    return {
+        "ativos": len(ativos),
+        "removidos": len(removidos),
+        "novos": int((frame['first_seen'] >= inicio).sum()),
+        "dias_mediana_ativos": float(ativos['dias_no_mercado'].median()) if len(ativos) else None,
+        "dias_mediana_removidos": float(removidos['dias_no_mercado'].median()) if len(removidos) else None,
+    }
+
+
+def days_on_market_by_bairro(frame: pd.DataFrame) -> pd.DataFrame:
+    """Distribuição de dias no mercado por bairro (quantis e contagem)."""
+    g = frame.groupby('Bairro')['dias_no_mercado']
+    return pd.DataFrame({
+        'Anúncios': g.size(),
+        'Removidos': frame['status'].eq(REMOVIDO).groupby(frame['Bairro']).sum(),
+        'P25': g.quantile(0.25),
+        'Mediana': g.median(),
+        'P75': g.quantile(0.75),
+        'Máx': g.max(),
+    }).reset_index().sort_values('Mediana', ascending=False)
@@ -0,0 +1,180 @@
+"""Manutenção da base particionada com um processo por partição.
+
+Cada comando reescreve partições inteiras (cidade × mês) em paralelo num
+``ProcessPoolExecutor``. Os arquivos novos só passam a valer quando o
+manifesto é trocado (``analytics.partitions.write_manifest``); depois disso
+os antigos são apagados. Um crash no meio deixa apenas órfãos, que o
+próximo ``ListingStore.compact()`` remove.
+
+A CLI fica em ``scripts/utils/maintenance.py``.
+"""
+
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+
+from analytics.bairros import normalize_bairros
+from analytics.ingest import coerce_types
+from analytics.partitions import write_manifest, write_partitions
+from analytics.schema import COLUMNS, detect_columns
+from analytics.store import ListingStore, StoreReader, manifest_entry
+
+DATE_COL = 'Data e Hora da Extração'
+
+
+@dataclass
+class MaintenanceReport:
+    command: str
+    partitions: int = 0
+    rows_in: int = 0
+    rows_out: int = 0
+    seconds: float = 0.0
+    workers: int = 1
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_in / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.command}: {self.partitions} partições, {self.rows_in} → {self.rows_out} linhas "
+                f"em {self.seconds:.2f}s ({self.rows_per_sec:,.0f} linhas/s, {self.workers} processos)")
+
+
+# ------------------------------------------------------------
+# Transformações por partição (funções de módulo: precisam ser picklable)
+# ------------------------------------------------------------
+def compact_frame(df):
+    """Só junta os arquivos da partição em um."""
+    return df
+
+
+def dedup_frame(df):
+    """Remove capturas repetidas (mesmo ID e mesma data/hora), preservando o histórico."""
+    keys = ['ID Imóvel', DATE_COL] if DATE_COL in df.columns else ['ID Imóvel']
+    return df.drop_duplicates(subset=keys, keep='last')
+
+
+def migrate_frame(df, cidade="São Paulo"):
+    """Schema atual: 'Bairro'/'Cidade' no lugar de '... de Busca', Cidade preenchida e ``COLUMNS`` primeiro."""
+    col_bairro, col_cidade = detect_columns(df)
+    df = df.rename(columns={col_bairro: 'Bairro', col_cidade: 'Cidade'})
+    if 'Cidade' not in df.columns:
+        df['Cidade'] = cidade
+    df['Cidade'] = df['Cidade'].fillna(cidade).replace("", cidade)
+    ordered = [c for c in COLUMNS if c in df.columns]
+    return df[ordered + [c for c in df.columns if c not in ordered]]
+
+
+def normalize_frame(df, normalization=None):
+    """Nomes de bairro normalizados, textos sem espaços extras e tipos/Preço/m² recalculados."""
+    col_bairro, _ = detect_columns(df)
+    if normalization:
+        df[col_bairro] = normalize_bairros(df[col_bairro], normalization)
+    for col in ('Tipo', 'Cidade', col_bairro):
+        if col in df.columns:
+            df[col] = df[col].astype("string").str.strip().astype(object)
+    return coerce_types(df)
+
+
+TRANSFORMS = {
+    "compact": compact_frame,
+    "dedup": dedup_frame,
+    "migrate": migrate_frame,
+    "normalize": normalize_frame,
+}
+
+
+def _rewrite_partition(root, rel_paths, command, options, tag):
+    """Worker: lê os arquivos de uma partição, aplica o comando e grava o resultado."""
+    df = pd.concat([pd.read_parquet(os.path.join(root, *p.split("/"))) for p in rel_paths], ignore_index=True)
+    rows_in = len(df)
+    out = TRANSFORMS[command](df, **options)
+    # write_partitions re-particiona: uma migração pode mover linhas de cidade
+    written = write_partitions(out, root, tag=tag)
+    return rel_paths, [manifest_entry(root, p) for p in written], rows_in, len(out)
+
+
+def rewrite_partitions(root, command, jobs=None, **options) -> MaintenanceReport:
+    """Aplica ``TRANSFORMS[command]`` a cada partição em paralelo e publica o resultado."""
+    start = time.perf_counter()
+    store = ListingStore(root)
+    manifest = store.compact()  # WAL pendente entra antes da reescrita
+
+    groups = {}
+    for f in manifest["files"]:
+        groups.setdefault((f["cidade"], f["mes"]), []).append(f["path"])
+    if command == "compact":
+        groups = {k: v for k, v in groups.items() if len(v) > 1}
+
+    report = MaintenanceReport(command, partitions=len(groups), workers=jobs or os.cpu_count() or 1)
+    if not groups:
+        report.seconds = time.perf_counter() - start
+        return report
+
+    version = manifest["version"] + 1
+    base_tag = f"m{version:06d}-{command}-{uuid.uuid4().hex[:6]}"
+    replaced, entries = set(), []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(_rewrite_partition, root, paths, command, options, f"{base_tag}-{i:04d}")
+            for i, paths in enumerate(groups.values())
+        ]
+        for future in futures:
+            rel_paths, new_entries, rows_in, rows_out = future.result()
+            replaced.update(rel_paths)
+            entries.extend(new_entries)
+            report.rows_in += rows_in
+            report.rows_out += rows_out
+
+    write_manifest(root, {
+        "version": version,
+        "updated": datetime.now().isoformat(timespec="seconds"),
+        "files": [f for f in manifest["files"] if f["path"] not in replaced] + entries,
+        "compacted_segments": manifest.get("compacted_segments", []),
+    })
+    for rel in replaced:
+        path = os.path.join(root, *rel.split("/"))
+        if os.path.exists(path):
+            os.remove(path)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def _load_source(path):
+    """Worker: lê uma fonte externa (.xlsx, .csv, .parquet ou diretório de partições) já tipada."""
+    if os.path.isdir(path):
+        return StoreReader(path).refresh()
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    elif path.endswith(".csv"):
+        df = pd.read_csv(path, dtype={'ID Imóvel': str})
+    else:
+        df = pd.read_excel(path, dtype={'ID Imóvel': str})
+    return coerce_types(migrate_frame(df))
+
+
+def merge_sources(root, sources, jobs=None, dedup=True) -> MaintenanceReport:
+    """Importa ``sources`` para a base (leitura/parse em paralelo, um processo por arquivo)."""
+    start = time.perf_counter()
+    store = ListingStore(root)
+    report = MaintenanceReport("merge", workers=jobs or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for df in pool.map(_load_source, sources):
+            if df is None:
+                continue
+            report.rows_in += len(df)
+            store.append(df)
+    manifest = store.compact()
+    report.partitions = len({(f["cidade"], f["mes"]) for f in manifest["files"]})
+    report.rows_out = sum(f["rows"] for f in manifest["files"])
+    report.seconds = time.perf_counter() - start
+    if dedup:
+        deduped = rewrite_partitions(root, "dedup", jobs)
+        report.rows_out = deduped.rows_out
+        report.seconds += deduped.seconds
+    return report
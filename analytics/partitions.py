@@ -0,0 +1,157 @@
+"""Armazenamento particionado da base por cidade e mês de captura.
+
+Layout::
+
+    base/partitions/
+        cidade=sao-paulo/mes=2026-02/part-20260213T113900-1a2b3c4d.parquet
+        cidade=rio-de-janeiro/mes=2026-02/part-....parquet
+
+Cada arquivo guarda linhas já tipadas (``analytics.ingest.coerce_types``).
+Arquivos são escritos em um temporário e renomeados, então leitores nunca
+veem um Parquet pela metade. Quando existe ``_manifest.json`` (mantido por
+``analytics.store``), só os arquivos listados nele fazem parte da base.
+
+Migração da planilha: ``python -m analytics.store migrate``.
+"""
+
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from analytics.schema import detect_columns
+from utils.text import slugify
+
+PARTITIONS_DIR = os.path.join("base", "partitions")
+UNKNOWN_MONTH = "desconhecido"
+MANIFEST_FILE = "_manifest.json"
+_PART_RE = re.compile(r"^cidade=(?P<cidade>[^/\\]+)$")
+
+
+def city_slug(cidade):
+    """'São Paulo' -> 'sao-paulo' (nome do diretório da partição)."""
+    return slugify(cidade) or "sem-cidade"
+
+
+def month_of(dates: pd.Series) -> pd.Series:
+    """Mês de captura 'YYYY-MM' de cada linha ('desconhecido' sem data válida)."""
+    return pd.to_datetime(dates, errors="coerce").dt.strftime("%Y-%m").fillna(UNKNOWN_MONTH)
+
+
+def partition_dir(root, cidade_slug, mes):
+    return os.path.join(root, f"cidade={cidade_slug}", f"mes={mes}")
+
+
+def _replace_atomic(write, path):
+    """Chama ``write(tmp)``, faz fsync e renomeia ``tmp`` para ``path``."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+    try:
+        write(tmp)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def write_frame_atomic(df: pd.DataFrame, path):
+    """Grava um Parquet via arquivo temporário + rename atômico."""
+    return _replace_atomic(lambda tmp: df.to_parquet(tmp, index=False), path)
+
+
+def read_manifest(root=PARTITIONS_DIR):
+    """Conteúdo de ``_manifest.json`` (None se a raiz ainda não tem manifesto)."""
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(root, manifest):
+    """Substitui o manifesto atomicamente (leitores veem o antigo ou o novo, nunca metade)."""
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return _replace_atomic(write, os.path.join(root, MANIFEST_FILE))
+
+
+def write_partitions(df: pd.DataFrame, root=PARTITIONS_DIR, tag=None):
+    """Divide ``df`` (tipado) por cidade e mês e grava um novo arquivo por partição.
+
+    Retorna a lista de arquivos criados. Arquivos existentes não são tocados.
+    """
+    if df.empty:
+        return []
+    col_bairro, col_cidade = detect_columns(df)
+    tag = tag or f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    cidades = df[col_cidade].map(city_slug) if col_cidade in df.columns else pd.Series("sem-cidade", index=df.index)
+    meses = month_of(df['Data e Hora da Extração']) if 'Data e Hora da Extração' in df.columns else pd.Series(UNKNOWN_MONTH, index=df.index)
+    written = []
+    for (cidade, mes), part in df.groupby([cidades, meses], sort=True):
+        path = os.path.join(partition_dir(root, cidade, mes), f"part-{tag}.parquet")
+        written.append(write_frame_atomic(part, path))
+    return written
+
+
+def list_partitions(root=PARTITIONS_DIR, cidades=None, meses=None):
+    """Lista (cidade, mês, arquivo) em ordem de cidade, mês e nome do arquivo.
+
+    ``cidades``/``meses`` restringem a leitura a um subconjunto (nomes ou slugs).
+    Com manifesto, lista só os arquivos registrados nele.
+    """
+    wanted_cidades = {city_slug(c) for c in cidades} if cidades else None
+    wanted_meses = set(meses) if meses else None
+    manifest = read_manifest(root)
+    if manifest is not None:
+        return sorted(
+            (f["cidade"], f["mes"], os.path.join(root, *f["path"].split("/")))
+            for f in manifest["files"]
+            if (not wanted_cidades or f["cidade"] in wanted_cidades) and (not wanted_meses or f["mes"] in wanted_meses)
+        )
+    return scan_partitions(root, wanted_cidades, wanted_meses)
+
+
+def scan_partitions(root=PARTITIONS_DIR, wanted_cidades=None, wanted_meses=None):
+    """Varre os diretórios ``cidade=*/mes=*`` (ignora o manifesto)."""
+    if not os.path.isdir(root):
+        return []
+    found = []
+    for cidade_dir in sorted(os.listdir(root)):
+        match = _PART_RE.match(cidade_dir)
+        if not match:
+            continue
+        cidade = match.group("cidade")
+        if wanted_cidades and cidade not in wanted_cidades:
+            continue
+        for mes_dir in sorted(os.listdir(os.path.join(root, cidade_dir))):
+            if not mes_dir.startswith("mes="):
+                continue
+            mes = mes_dir[4:]
+            if wanted_meses and mes not in wanted_meses:
+                continue
+            folder = os.path.join(root, cidade_dir, mes_dir)
+            for name in sorted(os.listdir(folder)):
+                if name.endswith(".parquet"):
+                    found.append((cidade, mes, os.path.join(folder, name)))
+    return found
+
+
+def iter_chunks(root=PARTITIONS_DIR, columns=None, cidades=None, meses=None):
+    """Gera um DataFrame por arquivo de partição (só as ``columns`` pedidas)."""
+    for _, _, path in list_partitions(root, cidades, meses):
+        yield pd.read_parquet(path, columns=columns)
+
+
+def read_partitions(root=PARTITIONS_DIR, columns=None, cidades=None, meses=None):
+    """Concatena as partições em um único DataFrame (caminho em memória)."""
+    chunks = list(iter_chunks(root, columns, cidades, meses))
+    if not chunks:
+        return None
+    return pd.concat(chunks, ignore_index=True)
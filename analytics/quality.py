@@ -0,0 +1,153 @@
+"""Validação da base na ingestão: checagens de schema e de faixa, outliers e um bitmask por linha.
+
+``coerce_types`` grava 0 onde Preço, Área ou Quartos não puderam ser lidos.
+Aqui esses zeros deixam de ser silenciosos: cada linha recebe em 'Qualidade'
+(uint16) um bit por problema encontrado:
+
+- preço ou área ausentes/ilegíveis, ou fora das faixas plausíveis (``RANGES``);
+- condomínio implausível para o preço (acima de ``MAX_CONDOMINIO_PRECO`` ao mês);
+- sem bairro, ou data de captura ilegível;
+- R$/m² atípico dentro do grupo bairro × tipo, pelo z robusto (mediana e MAD
+  de log(R$/m²) no histórico completo, MAD com piso ``MIN_MAD``; grupos com
+  menos de ``MIN_GROUP`` anúncios não são avaliados).
+
+As estatísticas vêm do histórico, então a mesma captura recebe a mesma
+sinalização no histórico e na captura mais recente (e no motor SQL). Os
+filtros excluem as linhas sinalizadas com ``FilterState.exclude_flags``, um
+AND de bits sobre a coluna.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from analytics.schema import COLUMNS
+
+logger = logging.getLogger("quintoandar.quality")
+
+QUALITY_COLUMN = 'Qualidade'
+
+PRECO_INVALIDO = 1 << 0
+AREA_INVALIDA = 1 << 1
+FORA_DA_FAIXA = 1 << 2
+CONDOMINIO_IMPLAUSIVEL = 1 << 3
+SEM_BAIRRO = 1 << 4
+DATA_INVALIDA = 1 << 5
+OUTLIER_PM2 = 1 << 6
+
+FLAGS = {
+    PRECO_INVALIDO: ("preco_invalido", "Preço ausente ou ilegível"),
+    AREA_INVALIDA: ("area_invalida", "Área ausente ou ilegível (R$/m² indefinido)"),
+    FORA_DA_FAIXA: ("fora_da_faixa", "Preço, área ou quartos fora da faixa plausível"),
+    CONDOMINIO_IMPLAUSIVEL: ("condominio_implausivel", "Condomínio implausível para o preço"),
+    SEM_BAIRRO: ("sem_bairro", "Sem bairro"),
+    DATA_INVALIDA: ("data_invalida", "Data de captura ilegível"),
+    OUTLIER_PM2: ("outlier_pm2", "R$/m² atípico para o bairro e tipo (MAD)"),
+}
+ALL_FLAGS = sum(FLAGS)
+
+# Faixas plausíveis (inclusivas) para imóveis à venda
+RANGES = {
+    'Preço': (10_000, 500_000_000),
+    'Área (m²)': (8, 100_000),
+    'Quartos': (0, 30),
+}
+MAX_CONDOMINIO_PRECO = 0.02
+MAD_THRESHOLD = 3.5
+MIN_GROUP = 10
+# Piso do MAD (em log, ~16%): grupos muito homogêneos não sinalizam desvios pequenos
+MIN_MAD = 0.15
+NUMERIC_COLUMNS = ['Preço', 'Condomínio', 'Área (m²)', 'Preço/m²', 'Quartos']
+
+
+def schema_problems(df: pd.DataFrame, col_bairro='Bairro') -> list:
+    """Colunas obrigatórias ausentes e colunas numéricas com tipo não numérico."""
+    required = [col_bairro if c == 'Bairro' else c for c in COLUMNS if c not in ('Cidade', 'Título/Descrição', 'Link')]
+    problems = [f"coluna ausente: {c}" for c in required if c not in df.columns]
+    problems += [f"coluna não numérica: {c} ({df[c].dtype})" for c in NUMERIC_COLUMNS
+                 if c in df.columns and not pd.api.types.is_numeric_dtype(df[c])]
+    return problems
+
+
+def _log_pm2(df: pd.DataFrame) -> np.ndarray:
+    preco = df['Preço'].to_numpy(dtype=float)
+    area = df['Área (m²)'].to_numpy(dtype=float)
+    valid = (preco > 0) & (area > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(valid, np.log(preco / np.where(valid, area, 1)), np.nan)
+
+
+def robust_stats(history: pd.DataFrame, col_bairro='Bairro') -> pd.DataFrame:
+    """Mediana, MAD e tamanho de log(R$/m²) por bairro × tipo, só com linhas de preço e área válidos."""
+    frame = pd.DataFrame({'bairro': history[col_bairro].to_numpy(), 'tipo': history['Tipo'].to_numpy(),
+                          'v': _log_pm2(history)}).dropna()
+    frame['desvio'] = (frame['v'] - frame.groupby(['bairro', 'tipo'])['v'].transform('median')).abs()
+    return frame.groupby(['bairro', 'tipo']).agg(mediana=('v', 'median'), mad=('desvio', 'median'), n=('v', 'size'))
+
+
+def quality_flags(df: pd.DataFrame, history: pd.DataFrame = None, col_bairro='Bairro') -> np.ndarray:
+    """Bitmask (uint16) de problemas de cada linha de ``df`` (estatísticas de ``history``, padrão ``df``).
+
+    Checagens cujas colunas não existem em ``df`` são puladas (``schema_problems`` as aponta).
+    """
+    history = df if history is None else history
+    flags = np.zeros(len(df), dtype=np.uint16)
+    has_pm2 = 'Preço' in df.columns and 'Área (m²)' in df.columns
+
+    if 'Preço' in df.columns:
+        flags[~(df['Preço'].to_numpy(dtype=float) > 0)] |= PRECO_INVALIDO
+    if 'Área (m²)' in df.columns:
+        flags[~(df['Área (m²)'].to_numpy(dtype=float) > 0)] |= AREA_INVALIDA
+    out_of_range = np.zeros(len(df), dtype=bool)
+    for col, (low, high) in RANGES.items():
+        if col in df.columns:
+            values = df[col].to_numpy(dtype=float)
+            # Zeros já são "ausente/ilegível"; aqui só valores lidos e implausíveis
+            out_of_range |= (values != 0) & ((values < low) | (values > high))
+    flags[out_of_range] |= FORA_DA_FAIXA
+    if 'Condomínio' in df.columns and 'Preço' in df.columns:
+        condominio = df['Condomínio'].to_numpy(dtype=float)
+        preco = df['Preço'].to_numpy(dtype=float)
+        flags[(preco > 0) & (condominio > MAX_CONDOMINIO_PRECO * preco)] |= CONDOMINIO_IMPLAUSIVEL
+    if col_bairro in df.columns:
+        bairro = df[col_bairro].astype('string')
+        flags[(bairro.isna() | bairro.str.strip().isin(['', '0'])).to_numpy(dtype=bool, na_value=True)] |= SEM_BAIRRO
+    if 'Data e Hora da Extração' in df.columns:
+        datas = pd.to_datetime(df['Data e Hora da Extração'], errors='coerce')
+        flags[datas.isna().to_numpy()] |= DATA_INVALIDA
+
+    if has_pm2 and all(c in df.columns and c in history.columns for c in (col_bairro, 'Tipo')):
+        stats = robust_stats(history, col_bairro)
+        stats = stats[stats['n'] >= MIN_GROUP]
+        pos = stats.index.get_indexer(pd.MultiIndex.from_arrays([df[col_bairro].to_numpy(), df['Tipo'].to_numpy()]))
+        known = pos >= 0
+        z = np.full(len(df), np.nan)
+        mad = np.maximum(stats['mad'].to_numpy(), MIN_MAD)
+        # 0.6745 = quantil 75% da normal: torna o MAD comparável a um desvio-padrão
+        z[known] = 0.6745 * (_log_pm2(df)[known] - stats['mediana'].to_numpy()[pos[known]]) / mad[pos[known]]
+        flags[np.abs(np.nan_to_num(z)) > MAD_THRESHOLD] |= OUTLIER_PM2
+    return flags
+
+
+def validate(df: pd.DataFrame, history: pd.DataFrame = None, col_bairro='Bairro') -> pd.DataFrame:
+    """Cópia de ``df`` com a coluna 'Qualidade'; problemas de schema vão para o log."""
+    for problem in schema_problems(df, col_bairro):
+        logger.warning("schema: %s", problem)
+    return df.assign(**{QUALITY_COLUMN: quality_flags(df, history, col_bairro)})
+
+
+def quality_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Linhas por sinalização (uma linha pode ter várias) e o total sinalizado."""
+    flags = df[QUALITY_COLUMN].to_numpy() if QUALITY_COLUMN in df.columns else np.zeros(len(df), dtype=np.uint16)
+    total = max(len(df), 1)
+    rows = [(name, desc, int(((flags & bit) != 0).sum())) for bit, (name, desc) in FLAGS.items()]
+    rows.append(("sinalizados", "Com ao menos uma sinalização", int((flags != 0).sum())))
+    report = pd.DataFrame(rows, columns=['Sinalização', 'Descrição', 'Anúncios'])
+    report['%'] = (report['Anúncios'] / total * 100).round(2)
+    return report
+
+
+def describe_flags(value) -> list:
+    """Nomes das sinalizações presentes em ``value``."""
+    return [name for bit, (name, _) in FLAGS.items() if int(value) & bit]
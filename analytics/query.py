@@ -0,0 +1,272 @@
+"""API de consulta: filtros entram, DataFrames agregados saem.
+
+    dataset = Dataset.load("base/quintoandar_database.xlsx")
+    state = dataset.default_filters()
+    result = run_query(dataset, state.with_selection(tipos=["Casa"]))
+    result.kpis, result.pm2_by_bairro, result.bairro_stats
+
+É o mesmo caminho usado pelo dashboard, pelos scripts e pelos benchmarks.
+Com um ``SqlEngine`` anexado (``dataset.attach_engine``), os agregados são
+calculados no banco embutido em vez de groupbys do pandas. Com um
+``ResultCache`` (``run_query(..., cache=, data_version=)``), consultas
+repetidas reaproveitam linhas filtradas e agregados entre sessões.
+"""
+
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from analytics import aggregations
+from analytics.derived import add_derived
+from analytics.filters import FilterState, default_filter_state, filter_mask, map_filter_mask
+from analytics.geo import coordinates_of, coverage_report, default_resolver, geo_fingerprint, log_coverage, unmapped
+from analytics.ingest import coerce_types, latest_snapshot, load_listings
+from analytics.quality import QUALITY_COLUMN, quality_report, validate
+from analytics.result_cache import CachedQuery, signature
+from analytics.schema import detect_columns
+
+
+@dataclass
+class Dataset:
+    """Histórico completo de capturas e a visão com a captura mais recente de cada imóvel."""
+
+    raw: pd.DataFrame
+    latest: pd.DataFrame
+    col_bairro: str = 'Bairro'
+    col_cidade: str = 'Cidade'
+    engine: object = None
+    # Preenchidos por ``use_change_log`` quando ``raw`` é um log de mudanças esparso
+    last_seen: pd.Series = None
+    capture_days: pd.Series = None
+    # Coordenadas de cada bairro distinto (``analytics.geo``), resolvidas em ``from_frame``
+    geo: pd.DataFrame = None
+
+    @classmethod
+    def from_frame(cls, raw: pd.DataFrame, typed=True, latest=None):
+        """Monta o dataset a partir de um DataFrame (``typed=False`` aplica ``coerce_types``).
+
+        ``latest`` reaproveita um snapshot já calculado (ex.: do cache em disco).
+        A validação (``analytics.quality``, coluna 'Qualidade'), as colunas
+        derivadas (``analytics.derived``) e as coordenadas dos bairros
+        (``analytics.geo``) são calculadas aqui, uma vez.
+        """
+        if not typed:
+            raw = coerce_types(raw)
+        col_bairro, col_cidade = detect_columns(raw)
+        if latest is None:
+            latest = latest_snapshot(raw)
+        raw = validate(raw, raw, col_bairro)
+        latest = validate(latest, raw, col_bairro)
+        # Referências das derivadas (ex.: média do bairro no IBairro) só com linhas sem sinalização
+        clean = raw[raw[QUALITY_COLUMN] == 0]
+        raw = add_derived(raw, clean, col_bairro)
+        latest = add_derived(latest, clean, col_bairro)
+        geo = default_resolver().resolve(raw[col_bairro].unique())
+        log_coverage(latest[col_bairro], geo)
+        return cls(raw=raw, latest=latest, col_bairro=col_bairro, col_cidade=col_cidade, geo=geo)
+
+    @classmethod
+    def from_prepared(cls, raw: pd.DataFrame, latest: pd.DataFrame, geo: pd.DataFrame):
+        """Dataset a partir de frames já montados por ``from_frame`` (ex.: servidos por ``analytics.server``).
+
+        Não refaz validação, derivadas nem resolução de coordenadas.
+        """
+        col_bairro, col_cidade = detect_columns(raw)
+        return cls(raw=raw, latest=latest, col_bairro=col_bairro, col_cidade=col_cidade, geo=geo)
+
+    @classmethod
+    def load(cls, file_path):
+        """Lê a planilha; retorna None se o arquivo não existir."""
+        raw = load_listings(file_path)
+        if raw is None:
+            return None
+        return cls.from_frame(raw)
+
+    def attach_engine(self, engine):
+        """Usa ``engine`` (um ``SqlEngine`` já carregado) para as agregações."""
+        self.engine = engine
+        self.__dict__.pop("engine_in_sync", None)
+        return self
+
+    def use_change_log(self, tracker):
+        """Lê ``raw`` como log esparso (``analytics.changes.ChangeTracker``) nas visões temporais."""
+        self.last_seen = tracker.last_seen
+        self.capture_days = tracker.capture_days
+        return self
+
+    def view(self, show_all=False) -> pd.DataFrame:
+        """Série temporal completa (``show_all``) ou apenas a captura mais recente."""
+        return self.raw if show_all else self.latest
+
+    def default_filters(self, show_all=False) -> FilterState:
+        return default_filter_state(self.view(show_all), self.col_bairro, self.col_cidade)
+
+    def summary(self) -> dict:
+        """Contagens gerais da base (as mesmas mostradas na sidebar)."""
+        latest = self.latest
+        return {
+            "registros": len(self.raw),
+            "imoveis_unicos": int(self.raw['ID Imóvel'].nunique()),
+            "apos_dedup": len(latest),
+            "ultima_captura": self.raw['Data e Hora da Extração'].max() if 'Data e Hora da Extração' in self.raw.columns else None,
+            "cidades": latest[self.col_cidade].value_counts() if self.col_cidade in latest.columns else pd.Series(dtype=int),
+            "bairros": latest[self.col_bairro].value_counts(),
+        }
+
+    def daily_mean_price(self) -> pd.DataFrame:
+        """Evolução do preço médio diário sobre todo o histórico."""
+        if self.last_seen is not None:
+            return aggregations.daily_mean_price_ffill(self.raw, self.last_seen, self.capture_days)
+        if self.engine is not None:
+            return self.engine.daily_mean_price()
+        return aggregations.daily_mean_price(self.raw)
+
+    @cached_property
+    def engine_in_sync(self) -> bool:
+        """Se o motor tem exatamente ``raw`` e as capturas de ``latest``.
+
+        Sem isso, ``run_query`` faz linhas e agregados no pandas: listagem e
+        KPIs nunca vêm de fontes diferentes.
+        """
+        if self.engine is None or not self.raw.index.is_unique:
+            return False
+        if len(self.engine.positions(show_all=True)) != len(self.raw):
+            return False
+        ords = self.engine.positions()
+        return len(ords) == len(self.latest) and bool(self.latest.index.isin(self.raw.index[ords]).all())
+
+    def engine_positions(self, state: FilterState, show_all=False, map_only=False) -> np.ndarray:
+        """Posições na visão das linhas filtradas pelo motor SQL (requer ``engine_in_sync``).
+
+        O motor foi carregado com ``raw`` (``_ord`` = posição em ``raw``); a
+        visão ``latest`` guarda os rótulos de ``raw``, então a tradução é um
+        ``get_indexer``.
+        """
+        ords = self.engine.positions(state, show_all, map_only)
+        if show_all:
+            return ords
+        return np.sort(self.latest.index.get_indexer(self.raw.index[ords]))
+
+    def quality_report(self, show_all=False) -> pd.DataFrame:
+        """Anúncios por sinalização de qualidade na visão escolhida."""
+        return quality_report(self.view(show_all))
+
+    @cached_property
+    def bairro_coordinates(self) -> dict:
+        """Bairro -> (lat, lon) dos bairros resolvidos, para o mapa e os similares."""
+        return coordinates_of(self.geo)
+
+    @cached_property
+    def geo_version(self) -> str:
+        """Hash das coordenadas resolvidas: muda quando o gazetteer ou as tabelas mudam."""
+        return geo_fingerprint(self.geo)
+
+    def map_coverage(self, show_all=False) -> pd.DataFrame:
+        """Bairros e anúncios por método de resolução de coordenadas na visão escolhida."""
+        return coverage_report(self.view(show_all)[self.col_bairro], self.geo)
+
+    def unmapped_bairros(self, show_all=False) -> pd.DataFrame:
+        """Bairros sem coordenada na visão escolhida, com o número de anúncios."""
+        return unmapped(self.view(show_all)[self.col_bairro], self.geo)
+
+
+@dataclass
+class QueryResult:
+    """Resultado de uma consulta: linhas filtradas e agregados (calculados sob demanda)."""
+
+    rows: pd.DataFrame
+    map_rows: pd.DataFrame
+    col_bairro: str = 'Bairro'
+    state: FilterState = None
+    show_all: bool = False
+    engine: object = None
+
+    cache: object = None
+    cache_entry: CachedQuery = None
+
+    def _aggregate(self, name, compute):
+        """Agregado vindo do cache compartilhado, ou calculado e registrado nele."""
+        if self.cache_entry is not None and name in self.cache_entry.aggregates:
+            return self.cache_entry.aggregates[name]
+        value = compute()
+        if self.cache_entry is not None:
+            self.cache.record(self.cache_entry, name, value)
+        return value
+
+    @cached_property
+    def kpis(self) -> dict:
+        if self.engine is not None:
+            return self._aggregate("kpis", lambda: self.engine.kpis(self.state, self.show_all))
+        return self._aggregate("kpis", lambda: aggregations.compute_kpis(self.rows))
+
+    @cached_property
+    def pm2_by_bairro(self) -> pd.DataFrame:
+        if self.engine is not None:
+            return self._aggregate("pm2_by_bairro", lambda: self.engine.pm2_by_bairro(self.state, self.show_all, self.col_bairro))
+        return self._aggregate("pm2_by_bairro", lambda: aggregations.pm2_by_bairro(self.rows, self.col_bairro))
+
+    @cached_property
+    def type_counts(self) -> pd.DataFrame:
+        if self.engine is not None:
+            return self._aggregate("type_counts", lambda: self.engine.type_counts(self.state, self.show_all))
+        return self._aggregate("type_counts", lambda: aggregations.type_counts(self.rows))
+
+    @cached_property
+    def map_aggregates(self) -> pd.DataFrame:
+        if self.engine is not None:
+            return self._aggregate("map_aggregates", lambda: self.engine.map_aggregates(self.state, self.show_all, self.col_bairro))
+        return self._aggregate("map_aggregates", lambda: aggregations.map_aggregates(self.map_rows, self.col_bairro))
+
+    @cached_property
+    def bairro_stats(self) -> pd.DataFrame:
+        if self.engine is not None:
+            return self._aggregate("bairro_stats", lambda: self.engine.bairro_stats(self.state, self.show_all, self.col_bairro))
+        return self._aggregate("bairro_stats", lambda: aggregations.bairro_stats(self.map_rows, self.col_bairro))
+
+    @cached_property
+    def rua_stats(self) -> pd.DataFrame:
+        if self.engine is not None:
+            return self._aggregate("rua_stats", lambda: self.engine.rua_stats(self.state, self.show_all))
+        return self._aggregate("rua_stats", lambda: aggregations.rua_stats(self.map_rows))
+
+
+def _filtered_positions(dataset: Dataset, state: FilterState, show_all):
+    """Posições (iloc) das linhas filtradas e das do mapa; com motor SQL, o WHERE roda no banco."""
+    if dataset.engine_in_sync:
+        return dataset.engine_positions(state, show_all), dataset.engine_positions(state, show_all, map_only=True)
+    df = dataset.view(show_all)
+    return np.flatnonzero(filter_mask(df, state).to_numpy()), np.flatnonzero(map_filter_mask(df, state).to_numpy())
+
+
+def run_query(dataset: Dataset, state: FilterState = None, show_all=False, cache=None, data_version=None) -> QueryResult:
+    """Aplica os filtros da sidebar (e os do mapa) sobre a visão escolhida.
+
+    Com ``cache`` (``analytics.result_cache.ResultCache``) e ``data_version``,
+    a mesma consulta reaproveita as posições filtradas e os agregados já
+    calculados por outra sessão.
+    """
+    df = dataset.view(show_all)
+    if state is None:
+        state = dataset.default_filters(show_all)
+    entry = None
+    if cache is not None and data_version is not None:
+        key = signature(data_version, state, show_all)
+        entry = cache.get(key)
+        if entry is None:
+            entry = CachedQuery(*_filtered_positions(dataset, state, show_all))
+            cache.put(key, entry)
+        positions, map_positions = entry.rows, entry.map_rows
+    else:
+        positions, map_positions = _filtered_positions(dataset, state, show_all)
+    return QueryResult(
+        rows=df.iloc[positions].copy(),
+        map_rows=df.iloc[map_positions].copy(),
+        col_bairro=dataset.col_bairro,
+        state=state,
+        show_all=show_all,
+        engine=dataset.engine if dataset.engine_in_sync else None,
+        cache=cache if entry is not None else None,
+        cache_entry=entry,
+    )
@@ -0,0 +1,134 @@
+"""Atualização dos dados em segundo plano, com troca atômica da versão em uso.
+
+Uma thread verifica a fonte a cada ``interval`` segundos (base particionada
+quando existir, senão a planilha). Quando a versão por conteúdo
+(``analytics.version``) muda, ela lê e prepara a nova versão: tipagem, dedup
+(``Dataset``) e o callback ``warm``, que preenche os caches derivados. Só
+então troca a referência de ``current``. Sessões sempre leem um ``Snapshot``
+pronto e imutável, e nenhuma requisição espera pela leitura da base.
+
+Com ``cache`` (``analytics.diskcache.DiskCache``), a planilha tipada e o
+snapshot mais recente de cada versão ficam em disco: reiniciar o servidor
+não repete o parse do Excel nem o dedup.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from analytics.ingest import latest_snapshot, load_listings
+from analytics.query import Dataset
+from analytics.store import ListingStore, StoreReader
+from analytics.version import file_version
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: str
+    dataset: Dataset
+    source: str
+    loaded_at: float
+    seconds: float
+
+    @property
+    def raw(self) -> pd.DataFrame:
+        return self.dataset.raw
+
+
+class DataRefresher:
+    """Mantém ``current`` apontando para a versão mais recente já preparada."""
+
+    def __init__(self, data_path, partitions_root, interval=5.0, warm=None, cache=None):
+        self.data_path = data_path
+        self.partitions_root = partitions_root
+        self.interval = interval
+        self.warm = warm
+        self.cache = cache
+        self.last_error = None
+        self.checks = 0
+        self._snapshot = None
+        self._reader = StoreReader(partitions_root)
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self) -> Snapshot:
+        return self._snapshot
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """Pede uma verificação imediata (sem esperar o próximo intervalo)."""
+        self._wake.set()
+
+    def wait_ready(self, timeout=None) -> Snapshot:
+        """Espera a primeira verificação (só bloqueia na partida do servidor); None sem dados."""
+        self._ready.wait(timeout)
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def poll_once(self) -> bool:
+        """Verifica a fonte; se a versão mudou, prepara e publica. Retorna True se trocou."""
+        self.checks += 1
+        self.last_error = None
+        try:
+            return self._refresh()
+        except Exception as exc:  # mantém a versão anterior em uso
+            self.last_error = exc
+            return False
+        finally:
+            self._ready.set()
+
+    def _refresh(self):
+        start = time.perf_counter()
+        if ListingStore(self.partitions_root).exists():
+            source = self.partitions_root
+            raw = self._reader.refresh()
+            version = self._reader.version
+        else:
+            source = self.data_path
+            version = file_version(self.data_path)
+            current = self._snapshot
+            if current is not None and current.source == source and current.version == version:
+                return False
+            raw = self._cached("typed", version, lambda: load_listings(self.data_path)) if version != "missing" else None
+        current = self._snapshot
+        if current is not None and current.source == source and current.version == version:
+            return False
+        if raw is None or raw.empty:
+            return False
+
+        latest = self._cached("latest", version, lambda: latest_snapshot(raw))
+        dataset = Dataset.from_frame(raw, latest=latest)
+        snapshot = Snapshot(version, dataset, source, time.time(), time.perf_counter() - start)
+        if self.warm is not None:
+            try:
+                self.warm(dataset, version)
+            except Exception as exc:  # caches frios não impedem a troca
+                self.last_error = exc
+        self._snapshot = snapshot
+        return True
+
+    def _cached(self, name, version, compute):
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute(name, {"data_version": version}, compute)
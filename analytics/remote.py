@@ -0,0 +1,143 @@
+"""Cliente do servidor do dataset (``analytics.server``), usado pelos workers do dashboard.
+
+    client = DatasetClient("http://127.0.0.1:8765")
+    version = client.version()
+    dataset = client.dataset(version)            # uma vez por versão
+    result = client.query(state, show_all=False, version=version)  # mesma interface de QueryResult
+    result.rows, result.kpis, result.bairro_stats
+
+Com ``version``, cada parte é calculada sobre essa versão; se o servidor já
+trocou de versão, ``VersionChanged`` (e o worker recomeça com a nova).
+
+Só ``urllib`` e PyArrow: nada de pandas/máscaras no worker para filtrar.
+"""
+
+import json
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from functools import cached_property
+
+import pandas as pd
+
+from analytics.filters import FilterState
+from analytics.query import Dataset
+from analytics.server import ARROW_MIME, PARTS, SNAPSHOT_PARTS, VERSION_HEADER, arrow_to_frame, dumps, state_to_dict
+
+
+class VersionChanged(Exception):
+    """O servidor trocou de versão entre duas requisições do mesmo snapshot."""
+
+    def __init__(self, version):
+        super().__init__(version)
+        self.version = version
+
+
+class DatasetClient:
+    def __init__(self, base_url, timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = dumps(payload) if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={"Content-Type": "application/json"} if data else {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                version = response.headers.get(VERSION_HEADER)
+                if response.headers.get("Content-Type") == ARROW_MIME:
+                    return arrow_to_frame(body), version
+                return json.loads(body), version
+        except urllib.error.HTTPError as exc:
+            if exc.code == 409:
+                raise VersionChanged(exc.headers.get(VERSION_HEADER)) from None
+            detail = exc.read().decode("utf-8", "replace")
+            raise RuntimeError(f"{path}: HTTP {exc.code} {detail}") from None
+
+    def status(self) -> dict:
+        return self._request("/v1/status")[0]
+
+    def version(self) -> str:
+        """Versão em uso no servidor (None enquanto ele não tem dados)."""
+        return self.status()["version"]
+
+    def refresh(self):
+        """Pede ao servidor uma verificação imediata da base."""
+        self._request("/v1/refresh", {})
+
+    def dataset(self, version) -> Dataset:
+        """Histórico, snapshot mais recente e coordenadas da versão ``version``; ``VersionChanged`` se ela saiu.
+
+        Os frames chegam prontos do servidor: o worker não refaz validação, derivadas nem geo.
+        """
+        raw, latest, geo = (self._request(f"/v1/snapshot/{part}?version={version}")[0] for part in SNAPSHOT_PARTS)
+        return Dataset.from_prepared(raw, latest, geo)
+
+    def query(self, state: FilterState, show_all=False, version=None) -> "RemoteQueryResult":
+        return RemoteQueryResult(self, state, show_all, version)
+
+    def fetch(self, state: FilterState, show_all, part, version=None):
+        """Uma parte do resultado (DataFrame ou dict) e a versão em que foi calculada.
+
+        Com ``version``, ``VersionChanged`` se o servidor já não está nela.
+        """
+        payload = {"state": state_to_dict(state), "show_all": show_all, "part": part}
+        if version is not None:
+            payload["version"] = version
+        return self._request("/v1/query", payload)
+
+
+@dataclass
+class RemoteQueryResult:
+    """Mesma interface de ``QueryResult``; cada parte é buscada no servidor na primeira leitura."""
+
+    client: DatasetClient
+    state: FilterState
+    show_all: bool = False
+    version: str = None  # versão do dataset do worker; None = a atual do servidor
+
+    @property
+    def col_bairro(self):
+        return self.state.col_bairro
+
+    def _fetch(self, part):
+        return self.client.fetch(self.state, self.show_all, part, self.version)[0]
+
+    def prefetch(self, parts=PARTS):
+        """Busca as partes de uma vez (um ``VersionChanged`` sai aqui, não no meio da página)."""
+        for part in parts:
+            getattr(self, part)
+        return self
+
+    @cached_property
+    def rows(self) -> pd.DataFrame:
+        return self._fetch("rows")
+
+    @cached_property
+    def map_rows(self) -> pd.DataFrame:
+        return self._fetch("map_rows")
+
+    @cached_property
+    def kpis(self) -> dict:
+        return self._fetch("kpis")
+
+    @cached_property
+    def pm2_by_bairro(self) -> pd.DataFrame:
+        return self._fetch("pm2_by_bairro")
+
+    @cached_property
+    def type_counts(self) -> pd.DataFrame:
+        return self._fetch("type_counts")
+
+    @cached_property
+    def map_aggregates(self) -> pd.DataFrame:
+        return self._fetch("map_aggregates")
+
+    @cached_property
+    def bairro_stats(self) -> pd.DataFrame:
+        return self._fetch("bairro_stats")
+
+    @cached_property
+    def rua_stats(self) -> pd.DataFrame:
+        return self._fetch("rua_stats")
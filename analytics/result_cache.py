@@ -0,0 +1,115 @@
+"""Cache de resultados de consulta compartilhado entre sessões (LRU limitado por tamanho).
+
+A chave é a assinatura canônica da consulta: versão dos dados, visão
+(``show_all``) e ``FilterState`` com as seleções ordenadas. A entrada guarda
+as posições das linhas filtradas (não as linhas) e os agregados à medida
+que ``QueryResult`` os calcula, então a próxima sessão com a mesma seleção
+(tipicamente os filtros padrão) não recalcula máscaras nem groupbys.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from analytics.filters import FilterState
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 128
+
+
+def _canonical(values):
+    return tuple(sorted(values, key=lambda v: (type(v).__name__, str(v))))
+
+
+def signature(data_version, state: FilterState, show_all=False) -> str:
+    """Assinatura estável da consulta (a ordem das seleções não importa)."""
+    parts = (
+        str(data_version), bool(show_all), state.col_bairro, state.col_cidade,
+        _canonical(state.cidades), _canonical(state.bairros), _canonical(state.tipos),
+        _canonical(state.quartos), tuple(int(v) for v in state.price), tuple(int(v) for v in state.area),
+        int(state.exclude_flags),
+    )
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    return 256
+
+
+@dataclass
+class CachedQuery:
+    rows: np.ndarray          # posições (iloc) das linhas filtradas na visão
+    map_rows: np.ndarray      # posições das linhas do mapa (sem filtro de preço/área)
+    aggregates: dict = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.map_rows.nbytes + sum(_nbytes(v) for v in self.aggregates.values())
+
+
+class ResultCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key) -> CachedQuery:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry: CachedQuery):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def record(self, entry: CachedQuery, name, value):
+        """Acrescenta um agregado a uma entrada (chamado por ``QueryResult``)."""
+        with self._lock:
+            entry.aggregates[name] = value
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes() > self.max_bytes):
+            # A entrada mais recente nunca sai, mesmo sozinha acima do limite
+            if len(self._entries) == 1:
+                break
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _bytes(self) -> int:
+        return sum(e.nbytes for e in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entries),
+                "bytes": self._bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
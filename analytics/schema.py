@@ -0,0 +1,16 @@
+"""Schema da base de imóveis e detecção de variações de nomes de coluna."""
+
+import pandas as pd
+
+# Ordem das colunas na planilha gerada pelo scraper
+COLUMNS = [
+    'ID Imóvel', 'Cidade', 'Bairro', 'Tipo', 'Título/Descrição', 'Preço', 'Condomínio',
+    'Área (m²)', 'Preço/m²', 'Quartos', 'Endereço', 'Link', 'Data e Hora da Extração',
+]
+
+
+def detect_columns(df: pd.DataFrame):
+    """Retorna (coluna de bairro, coluna de cidade), compatível com dados antigos e novos."""
+    col_bairro = 'Bairro' if 'Bairro' in df.columns else 'Bairro de Busca'
+    col_cidade = 'Cidade' if 'Cidade' in df.columns else 'Cidade de Busca'
+    return col_bairro, col_cidade
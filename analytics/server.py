@@ -0,0 +1,282 @@
+"""Servidor local do dataset para o modo multi-worker.
+
+Um processo mantém a versão em uso (``DataRefresher``) e o ``ResultCache`` e
+responde a consultas de filtro/agregado de vários workers do Streamlit, cada
+um no seu núcleo. Os workers deixam de ler a planilha e de montar máscaras e
+groupbys; recebem o snapshot uma vez por versão e os resultados já prontos.
+
+    python -m analytics.server --port 8765
+    QA_DATA_SERVER=http://127.0.0.1:8765 streamlit run quintoandar_dashboard.py --server.port 8501
+    QA_DATA_SERVER=http://127.0.0.1:8765 streamlit run quintoandar_dashboard.py --server.port 8502
+
+Protocolo (HTTP/1.1 em localhost, só biblioteca padrão + PyArrow):
+
+- ``GET /v1/status``: versão, fonte, linhas e estatísticas do cache (JSON).
+- ``GET /v1/snapshot/<raw|latest|geo>?version=``: DataFrame em Arrow IPC
+  (stream), já validado, com as derivadas e as coordenadas dos bairros;
+  409 se a versão pedida já não é a atual.
+- ``POST /v1/query``: ``{"state": {...}, "show_all": bool, "part": "rows", "version": "..."}``;
+  ``part`` é ``rows``, ``map_rows`` ou um agregado de ``QueryResult``. DataFrames
+  voltam em Arrow IPC, ``kpis`` em JSON. Com ``version``, 409 se ela já não é a
+  atual (o worker não mistura linhas de uma versão com o dataset de outra).
+- ``POST /v1/refresh``: pede uma verificação imediata da base ("Recarregar Dados").
+
+Toda resposta traz ``X-Data-Version``. O cliente fica em ``analytics.remote``;
+a API pública (``/api/v1/...``, com ETag e gzip) em ``analytics.api``.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from analytics.filters import FilterState, filter_mask
+from analytics.partitions import PARTITIONS_DIR
+from analytics.query import run_query
+from analytics.refresher import DataRefresher
+from analytics.result_cache import ResultCache, signature
+from analytics.version import forget
+
+logger = logging.getLogger("quintoandar.server")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+JSON_MIME = "application/json"
+VERSION_HEADER = "X-Data-Version"
+FRAME_PARTS = ("rows", "map_rows", "pm2_by_bairro", "type_counts", "map_aggregates", "bairro_stats", "rua_stats")
+PARTS = FRAME_PARTS + ("kpis",)
+SNAPSHOT_PARTS = ("raw", "latest", "geo")
+
+
+def frame_to_arrow(df: pd.DataFrame) -> bytes:
+    """Serializa ``df`` em Arrow IPC (stream); o índice vai junto nos metadados."""
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_to_frame(payload: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} não é serializável")
+
+
+def dumps(value) -> bytes:
+    return json.dumps(value, default=_json_default, ensure_ascii=False).encode("utf-8")
+
+
+def state_to_dict(state: FilterState) -> dict:
+    return asdict(state)
+
+
+def state_from_dict(payload: dict) -> FilterState:
+    """``FilterState`` a partir do JSON (listas viram tuplas; campos desconhecidos são erro)."""
+    return FilterState().with_selection(**payload)
+
+
+class DatasetService:
+    """O que o servidor expõe, separado do HTTP (usado direto nos testes)."""
+
+    def __init__(self, refresher: DataRefresher, cache: ResultCache = None):
+        self.refresher = refresher
+        self.cache = cache if cache is not None else ResultCache()
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self):
+        return self.refresher.current
+
+    def status(self) -> dict:
+        snapshot = self.snapshot
+        error = self.refresher.last_error
+        if snapshot is None:
+            return {"version": None, "last_error": repr(error) if error else None}
+        return {
+            "version": snapshot.version,
+            "source": snapshot.source,
+            "rows": len(snapshot.raw),
+            "latest_rows": len(snapshot.dataset.latest),
+            "loaded_at": snapshot.loaded_at,
+            "cache": self.cache.stats(),
+            "last_error": repr(error) if error else None,
+        }
+
+    def refresh(self):
+        """Refaz a impressão digital da planilha e acorda a thread de atualização."""
+        forget(self.refresher.data_path)
+        self.refresher.wake()
+
+    def query(self, state: FilterState, show_all=False, part="rows", snapshot=None):
+        """Parte ``part`` do resultado da consulta e a versão usada; None sem dados."""
+        if part not in PARTS:
+            raise KeyError(part)
+        snapshot = snapshot or self.snapshot
+        if snapshot is None:
+            return None, None
+        result = run_query(snapshot.dataset, state, show_all=show_all, cache=self.cache, data_version=snapshot.version)
+        return getattr(result, part), snapshot.version
+
+    def positions(self, state: FilterState, show_all=False, snapshot=None):
+        """Posições das linhas filtradas na visão, sem copiá-las (do cache quando a consulta já rodou)."""
+        snapshot = snapshot or self.snapshot
+        entry = self.cache.get(signature(snapshot.version, state, show_all))
+        if entry is not None:
+            return entry.rows
+        return np.flatnonzero(filter_mask(snapshot.dataset.view(show_all), state).to_numpy())
+
+    def artifact(self, name, compute, snapshot=None):
+        """``compute(dataset)`` uma vez por versão; só os artefatos da versão mais recente ficam."""
+        snapshot = snapshot or self.snapshot
+        key = (snapshot.version, name)
+        with self._lock:
+            if key in self._artifacts:
+                return self._artifacts[key]
+        value = compute(snapshot.dataset)
+        with self._lock:
+            if snapshot is self.snapshot:
+                self._artifacts = {k: v for k, v in self._artifacts.items() if k[0] == snapshot.version}
+                self._artifacts[key] = value
+        return value
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: DatasetService = None  # preenchido por ``make_server``
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status, body, content_type=JSON_MIME, version=None, headers=None):
+        """Envia ``body`` (bytes, ou um iterável de bytes enviado com chunked encoding)."""
+        streaming = not isinstance(body, bytes)
+        self.send_response(status)
+        if content_type is not None:
+            self.send_header("Content-Type", content_type)
+        if streaming:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        if version is not None:
+            self.send_header(VERSION_HEADER, version)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not streaming:
+            self.wfile.write(body)
+            return
+        for chunk in body:
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _error(self, status, message):
+        self._send(status, dumps({"error": message}))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith("/api/"):
+            from analytics import api  # api importa os codecs deste módulo
+
+            status, body, headers = api.handle(self.service, url.path, url.query, self.headers)
+            return self._send(status, body, content_type=None, headers=headers)
+        if url.path == "/v1/status":
+            return self._send(HTTPStatus.OK, dumps(self.service.status()))
+        if url.path.startswith("/v1/snapshot/"):
+            part = url.path.rsplit("/", 1)[-1]
+            if part not in SNAPSHOT_PARTS:
+                return self._error(HTTPStatus.NOT_FOUND, f"parte desconhecida: {part}")
+            snapshot = self.service.snapshot
+            if snapshot is None:
+                return self._error(HTTPStatus.SERVICE_UNAVAILABLE, "sem dados carregados")
+            wanted = parse_qs(url.query).get("version", [None])[0]
+            if wanted is not None and wanted != snapshot.version:
+                return self._send(HTTPStatus.CONFLICT, dumps({"error": "versão mudou", "version": snapshot.version}),
+                                  version=snapshot.version)
+            frame = getattr(snapshot.dataset, part)
+            return self._send(HTTPStatus.OK, frame_to_arrow(frame), ARROW_MIME, snapshot.version)
+        return self._error(HTTPStatus.NOT_FOUND, f"rota desconhecida: {url.path}")
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if path == "/v1/refresh":
+            self.service.refresh()
+            return self._send(HTTPStatus.ACCEPTED, dumps({"ok": True}))
+        if path != "/v1/query":
+            return self._error(HTTPStatus.NOT_FOUND, f"rota desconhecida: {path}")
+        try:
+            payload = json.loads(body or b"{}")
+            state = state_from_dict(payload.get("state", {}))
+            part = payload.get("part", "rows")
+        except (ValueError, TypeError, AttributeError) as exc:
+            return self._error(HTTPStatus.BAD_REQUEST, str(exc))
+        if part not in PARTS:
+            return self._error(HTTPStatus.BAD_REQUEST, f"parte desconhecida: {part}")
+        snapshot = self.service.snapshot
+        if snapshot is None:
+            return self._error(HTTPStatus.SERVICE_UNAVAILABLE, "sem dados carregados")
+        wanted = payload.get("version")
+        if wanted is not None and wanted != snapshot.version:
+            return self._send(HTTPStatus.CONFLICT, dumps({"error": "versão mudou", "version": snapshot.version}),
+                              version=snapshot.version)
+        value, version = self.service.query(state, bool(payload.get("show_all")), part, snapshot=snapshot)
+        if isinstance(value, pd.DataFrame):
+            return self._send(HTTPStatus.OK, frame_to_arrow(value), ARROW_MIME, version)
+        return self._send(HTTPStatus.OK, dumps(value), JSON_MIME, version)
+
+
+def make_server(service: DatasetService, host=DEFAULT_HOST, port=DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Servidor HTTP (uma thread por conexão) para ``service``; ``port=0`` escolhe uma porta livre."""
+    handler = type("DatasetHandler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local do dataset para vários workers do dashboard")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data", default=os.path.join("base", "quintoandar_database.xlsx"))
+    parser.add_argument("--root", default=PARTITIONS_DIR)
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("QA_REFRESH_INTERVAL", "5")))
+    parser.add_argument("--cache-mb", type=int, default=int(os.environ.get("QA_RESULT_CACHE_MB", "256")))
+    args = parser.parse_args(argv)
+
+    from analytics.diskcache import default_cache
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    refresher = DataRefresher(args.data, args.root, interval=args.interval, cache=default_cache()).start()
+    service = DatasetService(refresher, ResultCache(max_bytes=args.cache_mb * 1024 * 1024))
+    server = make_server(service, args.host, args.port)
+    snapshot = refresher.wait_ready()
+    logger.info("versão %s, servindo em http://%s:%d", snapshot.version if snapshot else None, *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        refresher.stop(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
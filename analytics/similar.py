@@ -0,0 +1,93 @@
+"""Índice de vizinhos mais próximos para "imóveis similares".
+
+Cada imóvel vira um ponto (área em log, quartos e R$/m² padronizados, mais
+a posição do bairro (``Dataset.bairro_coordinates`` ou ``BAIRRO_COORDINATES``) convertida para km e dividida
+por ``km_scale``). O índice é uma k-d tree (``scipy.spatial.cKDTree``) montada
+uma vez por versão dos dados; sem SciPy, a consulta é força bruta em NumPy.
+
+Bairros sem coordenada não ganham posição inventada: esses imóveis só são
+comparados com os do mesmo bairro.
+"""
+
+import numpy as np
+import pandas as pd
+
+from bairro_coordinates import BAIRRO_COORDINATES
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except Exception:
+    HAS_SCIPY = False
+
+KM_PER_DEGREE = 111.32
+RESULT_COLUMNS = ['ID Imóvel', 'Tipo', 'Preço', 'Área (m²)', 'Quartos', 'Preço/m²', 'Endereço', 'Link']
+
+
+class SimilarIndex:
+    def __init__(self, listings: pd.DataFrame, features: np.ndarray, mapped: np.ndarray, col_bairro='Bairro'):
+        self.listings = listings.reset_index(drop=True)
+        self.features = features
+        self.mapped = mapped
+        self.col_bairro = col_bairro
+        self._pos = pd.Series(np.arange(len(self.listings)), index=self.listings['ID Imóvel'].to_numpy())
+        self._pos = self._pos[~self._pos.index.duplicated(keep='last')]
+        self._mapped_rows = np.flatnonzero(mapped)
+        self.tree = cKDTree(features[mapped, :]) if HAS_SCIPY and mapped.any() else None
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, col_bairro='Bairro', km_scale=2.0, coordinates=None):
+        """Indexa ``df`` (uma linha por imóvel; ex.: ``Dataset.latest``) com Área e Preço válidos."""
+        listings = df[(df['Área (m²)'] > 0) & (df['Preço'] > 0)]
+        listings = listings.drop_duplicates('ID Imóvel', keep='last')
+        quartos = pd.to_numeric(listings['Quartos'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        attrs = np.column_stack([
+            np.log(listings['Área (m²)'].to_numpy(dtype=float)),
+            quartos,
+            listings['Preço/m²'].to_numpy(dtype=float),
+        ])
+        std = attrs.std(axis=0)
+        attrs = (attrs - attrs.mean(axis=0)) / np.where(std > 0, std, 1)
+
+        coords = listings[col_bairro].map(BAIRRO_COORDINATES if coordinates is None else coordinates)
+        mapped = coords.notna().to_numpy()
+        lat = np.array([c[0] if isinstance(c, tuple) else np.nan for c in coords], dtype=float)
+        lon = np.array([c[1] if isinstance(c, tuple) else np.nan for c in coords], dtype=float)
+        ref_lat = np.nanmean(lat) if mapped.any() else 0.0
+        geo = np.column_stack([lat * KM_PER_DEGREE, lon * KM_PER_DEGREE * np.cos(np.radians(ref_lat))]) / km_scale
+        features = np.column_stack([attrs, np.nan_to_num(geo)])
+        return cls(listings, features, mapped, col_bairro)
+
+    def __len__(self):
+        return len(self.listings)
+
+    def __contains__(self, listing_id):
+        return listing_id in self._pos.index
+
+    def query(self, listing_id, k=10) -> pd.DataFrame:
+        """Os ``k`` imóveis mais próximos de ``listing_id`` (ele mesmo excluído), com 'Distância'."""
+        if listing_id not in self._pos.index:
+            return pd.DataFrame(columns=[self.col_bairro, *RESULT_COLUMNS, 'Distância'])
+        row = int(self._pos[listing_id])
+        point = self.features[row]
+        if self.mapped[row]:
+            candidates = self._mapped_rows
+            if self.tree is not None:
+                dist, idx = self.tree.query(point, k=min(k + 1, len(candidates)))
+                dist, rows = np.atleast_1d(dist), candidates[np.atleast_1d(idx)]
+            else:
+                dist, rows = self._brute_force(point, candidates, k + 1)
+        else:
+            same = np.flatnonzero(self.listings[self.col_bairro].to_numpy() == self.listings.at[row, self.col_bairro])
+            dist, rows = self._brute_force(point[:3], same, k + 1, dims=3)
+        keep = rows != row
+        cols = [c for c in [self.col_bairro, *RESULT_COLUMNS] if c in self.listings.columns]
+        out = self.listings.iloc[rows[keep][:k]][cols].copy()
+        out['Distância'] = np.round(dist[keep][:k], 3)
+        return out.reset_index(drop=True)
+
+    def _brute_force(self, point, candidates, k, dims=None):
+        feats = self.features[candidates, :dims] if dims else self.features[candidates]
+        dist = np.sqrt(((feats - point) ** 2).sum(axis=1))
+        order = np.argsort(dist, kind='stable')[:k]
+        return dist[order], candidates[order]
@@ -0,0 +1,292 @@
+"""Motor SQL embutido (DuckDB, ou SQLite como fallback) sobre o histórico de imóveis.
+
+Tabelas criadas em ``ingest``:
+
+- ``listings``: todas as capturas (colunas com nomes ASCII, ver ``SQL_COLUMNS``);
+- ``latest``: captura mais recente de cada imóvel (a mesma de
+  ``analytics.ingest.latest_snapshot``: ordem estável pela coluna de horário
+  original, fica a última);
+- ``rollup_diario``: somas e contagens por dia × mês × bairro × tipo × quartos.
+
+Os métodos de agregação recebem um ``FilterState`` e empurram o WHERE e o
+GROUP BY para o banco, devolvendo DataFrames com os mesmos nomes de coluna
+das funções de ``analytics.aggregations``. Com DuckDB as consultas são
+multi-thread e, usando um arquivo em disco, rodam fora da memória.
+"""
+
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analytics.aggregations import extract_street
+
+try:
+    import duckdb
+    HAS_DUCKDB = True
+except Exception:
+    HAS_DUCKDB = False
+
+# Coluna da base -> coluna SQL
+SQL_COLUMNS = {
+    'ID Imóvel': 'id',
+    'Cidade': 'cidade',
+    'Bairro': 'bairro',
+    'Tipo': 'tipo',
+    'Preço': 'preco',
+    'Condomínio': 'condominio',
+    'Área (m²)': 'area',
+    'Preço/m²': 'pm2',
+    'Quartos': 'quartos',
+    'Endereço': 'endereco',
+    'Data e Hora da Extração': 'data',
+    'Qualidade': 'qualidade',
+}
+
+
+def to_sql_frame(df: pd.DataFrame, col_bairro='Bairro', col_cidade='Cidade') -> pd.DataFrame:
+    """Projeta o DataFrame tipado nas colunas SQL (+ rua, dia e mês pré-calculados)."""
+    source = df.rename(columns={col_bairro: 'Bairro', col_cidade: 'Cidade'})
+    out = pd.DataFrame({sql: source[col] for col, sql in SQL_COLUMNS.items() if col in source.columns})
+    for sql in SQL_COLUMNS.values():
+        if sql not in out.columns:
+            out[sql] = None
+    out['id'] = out['id'].astype(str)
+    out['qualidade'] = pd.to_numeric(out['qualidade']).fillna(0).astype(int)
+    data = pd.to_datetime(out['data'], errors='coerce')
+    out['data'] = data.dt.strftime('%Y-%m-%d %H:%M')
+    out['dia'] = data.dt.strftime('%Y-%m-%d')
+    out['mes'] = data.dt.strftime('%Y-%m')
+    out['rua'] = extract_street(out['endereco'])
+    out['_ord'] = range(len(out))
+    # Posição na ordenação de latest_snapshot, sobre a coluna original (``data`` acima é truncada ao minuto)
+    seq = np.arange(len(out))
+    if 'Data e Hora da Extração' in source.columns:
+        stamps = source['Data e Hora da Extração'].reset_index(drop=True)
+        seq[stamps.sort_values(kind='stable').index.to_numpy()] = np.arange(len(out))
+    out['_seq'] = seq
+    return out
+
+
+class SqlEngine:
+    """Conexão embutida com as tabelas de imóveis e rollups.
+
+    ``backend`` pode ser "duckdb", "sqlite" ou "auto" (DuckDB se instalado).
+    ``path`` ":memory:" mantém tudo em memória; um arquivo permite trabalhar
+    com bases maiores que a RAM (DuckDB faz spill para disco).
+    """
+
+    def __init__(self, backend="auto", path=":memory:", threads=None):
+        if backend == "auto":
+            backend = "duckdb" if HAS_DUCKDB else "sqlite"
+        if backend == "duckdb" and not HAS_DUCKDB:
+            raise ImportError("duckdb não está instalado (pip install duckdb)")
+        self.backend = backend
+        self._lock = threading.Lock()
+        if backend == "duckdb":
+            self._con = duckdb.connect(path)
+            if threads:
+                self._con.execute(f"SET threads = {int(threads)}")
+        else:
+            self._con = sqlite3.connect(path, check_same_thread=False)
+
+    # --------------------------------------------------------
+    # Carga
+    # --------------------------------------------------------
+    def ingest(self, df: pd.DataFrame, col_bairro='Bairro', col_cidade='Cidade'):
+        """(Re)cria ``listings``, ``latest`` e os rollups a partir do DataFrame tipado."""
+        frame = to_sql_frame(df, col_bairro, col_cidade)
+        with self._lock:
+            for table in ("rollup_diario", "latest", "listings"):
+                self._con.execute(f"DROP TABLE IF EXISTS {table}")
+            if self.backend == "duckdb":
+                self._con.register("_frame", frame)
+                self._con.execute("CREATE TABLE listings AS SELECT * FROM _frame")
+                self._con.unregister("_frame")
+            else:
+                frame.to_sql("listings", self._con, index=False)
+            self._con.execute("""
+                CREATE TABLE latest AS
+                SELECT * FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY id ORDER BY _seq DESC) AS _rn
+                    FROM listings
+                ) t WHERE _rn = 1
+            """)
+            self._con.execute("""
+                CREATE TABLE rollup_diario AS
+                SELECT dia, mes, cidade, bairro, tipo, quartos,
+                       COUNT(*) AS n, SUM(preco) AS soma_preco, SUM(pm2) AS soma_pm2, SUM(area) AS soma_area
+                FROM listings
+                GROUP BY dia, mes, cidade, bairro, tipo, quartos
+            """)
+            if self.backend == "sqlite":
+                self._con.execute("CREATE INDEX idx_latest_bairro ON latest (bairro)")
+                self._con.execute("CREATE INDEX idx_listings_bairro ON listings (bairro)")
+        return self
+
+    # --------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------
+    def sql(self, query, params=()) -> pd.DataFrame:
+        """Executa uma consulta e devolve um DataFrame."""
+        if self.backend == "duckdb":
+            # cursor() abre uma conexão-filha, segura para uso em outra thread
+            cur = self._con.cursor()
+            try:
+                return cur.execute(query, list(params)).df()
+            finally:
+                cur.close()
+        with self._lock:
+            return pd.read_sql_query(query, self._con, params=list(params))
+
+    @staticmethod
+    def _where(state, map_only=False):
+        """Cláusula WHERE parametrizada equivalente a ``filters.filter_mask``."""
+        if state is None:
+            return "", []
+        clauses, params = [], []
+
+        def isin(col, values):
+            if not values:
+                clauses.append("1 = 0")
+                return
+            clauses.append(f"{col} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        isin("bairro", list(state.bairros))
+        isin("tipo", list(state.tipos))
+        isin("quartos", [int(q) for q in state.quartos])
+        if state.exclude_flags:
+            clauses.append("(qualidade & ?) = 0")
+            params.append(int(state.exclude_flags))
+        if not map_only:
+            clauses.append("preco BETWEEN ? AND ?")
+            params.extend([int(state.price[0]), int(state.price[1])])
+            clauses.append("area BETWEEN ? AND ?")
+            params.extend([int(state.area[0]), int(state.area[1])])
+            if state.cidades:
+                isin("cidade", list(state.cidades))
+        return "WHERE " + " AND ".join(clauses), params
+
+    @staticmethod
+    def _table(show_all):
+        return "listings" if show_all else "latest"
+
+    def rows(self, state=None, show_all=False) -> pd.DataFrame:
+        """Linhas filtradas, com os nomes de coluna da base."""
+        where, params = self._where(state)
+        columns = ", ".join(SQL_COLUMNS.values())
+        df = self.sql(f"SELECT {columns} FROM {self._table(show_all)} {where} ORDER BY _ord", params)
+        return df.rename(columns={sql: col for col, sql in SQL_COLUMNS.items()})
+
+    def positions(self, state=None, show_all=False, map_only=False) -> np.ndarray:
+        """``_ord`` (posição em ``listings``) das linhas filtradas, em ordem; só o WHERE, sem as colunas."""
+        where, params = self._where(state, map_only)
+        return self.sql(f"SELECT _ord FROM {self._table(show_all)} {where} ORDER BY _ord", params)['_ord'].to_numpy(dtype=np.int64)
+
+    def kpis(self, state=None, show_all=False) -> dict:
+        where, params = self._where(state)
+        table = self._table(show_all)
+        median = "MEDIAN(preco)" if self.backend == "duckdb" else "NULL"
+        row = self.sql(f"""
+            SELECT COUNT(*) AS imoveis, COUNT(DISTINCT id) AS imoveis_unicos,
+                   AVG(preco) AS preco_medio, {median} AS preco_mediano,
+                   AVG(pm2) AS pm2_medio, AVG(area) AS area_media, AVG(condominio) AS condominio_medio
+            FROM {table} {where}
+        """, params).iloc[0]
+        if not row['imoveis']:
+            return {
+                "imoveis": 0, "imoveis_unicos": 0, "preco_medio": 0, "preco_mediano": None,
+                "pm2_medio": 0, "area_media": 0, "condominio_medio": 0,
+            }
+        kpis = {k: (int(v) if k.startswith("imoveis") else (float(v) if v is not None and not pd.isna(v) else None)) for k, v in row.items()}
+        if kpis["preco_mediano"] is None:
+            # SQLite não tem MEDIAN: busca só a coluna de preço já filtrada
+            kpis["preco_mediano"] = float(self.sql(f"SELECT preco FROM {table} {where}", params)['preco'].median())
+        return kpis
+
+    def pm2_by_bairro(self, state=None, show_all=False, col_bairro='Bairro') -> pd.DataFrame:
+        where, params = self._where(state)
+        df = self.sql(f"""
+            SELECT bairro, AVG(pm2) AS pm2 FROM {self._table(show_all)} {where}
+            GROUP BY bairro ORDER BY pm2 ASC, bairro ASC
+        """, params)
+        return df.rename(columns={'bairro': col_bairro, 'pm2': 'Preço/m²'})
+
+    def type_counts(self, state=None, show_all=False) -> pd.DataFrame:
+        where, params = self._where(state)
+        df = self.sql(f"""
+            SELECT tipo, COUNT(*) AS n FROM {self._table(show_all)} {where}
+            GROUP BY tipo ORDER BY n DESC, tipo ASC
+        """, params)
+        return df.rename(columns={'tipo': 'Tipo', 'n': 'Quantidade'})
+
+    def map_aggregates(self, state=None, show_all=False, col_bairro='Bairro') -> pd.DataFrame:
+        where, params = self._where(state, map_only=True)
+        df = self.sql(f"""
+            SELECT bairro, AVG(preco) AS preco_medio, AVG(pm2) AS pm2_medio,
+                   AVG(area) AS area_media, COUNT(*) AS qtd
+            FROM {self._table(show_all)} {where}
+            GROUP BY bairro ORDER BY bairro
+        """, params)
+        return df.rename(columns={'bairro': col_bairro})
+
+    def bairro_stats(self, state=None, show_all=False, col_bairro='Bairro') -> pd.DataFrame:
+        where, params = self._where(state, map_only=True)
+        df = self.sql(f"""
+            SELECT bairro, COUNT(DISTINCT id) AS imoveis, MIN(preco) AS preco_min, MAX(preco) AS preco_max,
+                   ROUND(AVG(preco), 2) AS preco_medio, ROUND(AVG(pm2), 2) AS pm2_medio, ROUND(AVG(area), 2) AS area_media
+            FROM {self._table(show_all)} {where}
+            GROUP BY bairro ORDER BY preco_medio DESC
+        """, params)
+        return df.rename(columns={
+            'bairro': col_bairro, 'imoveis': 'Imóveis', 'preco_min': 'Preço Min', 'preco_max': 'Preço Max',
+            'preco_medio': 'Preço Médio', 'pm2_medio': 'Preço/m² Médio', 'area_media': 'Área Média',
+        })
+
+    def rua_stats(self, state=None, show_all=False, top=20) -> pd.DataFrame:
+        where, params = self._where(state, map_only=True)
+        df = self.sql(f"""
+            SELECT rua, COUNT(DISTINCT id) AS imoveis, ROUND(AVG(preco), 2) AS preco_medio,
+                   ROUND(AVG(pm2), 2) AS pm2_medio, ROUND(AVG(area), 2) AS area_media
+            FROM {self._table(show_all)} {where}
+            GROUP BY rua ORDER BY imoveis DESC, rua ASC LIMIT {int(top)}
+        """, params)
+        return df.rename(columns={
+            'rua': 'Rua', 'imoveis': 'Imóveis', 'preco_medio': 'Preço Médio',
+            'pm2_medio': 'Preço/m² Médio', 'area_media': 'Área Média',
+        })
+
+    def daily_mean_price(self) -> pd.DataFrame:
+        """Preço médio por dia a partir do rollup (sem tocar nas linhas)."""
+        df = self.sql("""
+            SELECT dia, SUM(soma_preco) * 1.0 / SUM(n) AS preco
+            FROM rollup_diario WHERE dia IS NOT NULL GROUP BY dia ORDER BY dia
+        """)
+        return pd.DataFrame({'Data': pd.to_datetime(df['dia']).dt.date, 'Preço': df['preco'].astype(float)})
+
+    def slice(self, dims=("mes", "tipo", "quartos"), bairros=None) -> pd.DataFrame:
+        """Preço médio e contagem por combinação de dimensões do rollup diário.
+
+        ``dims`` é um subconjunto de dia, mes, cidade, bairro, tipo, quartos.
+        """
+        allowed = {"dia", "mes", "cidade", "bairro", "tipo", "quartos"}
+        dims = [d for d in dims if d in allowed]
+        if not dims:
+            raise ValueError(f"dims deve conter ao menos uma de {sorted(allowed)}")
+        where, params = "", []
+        if bairros:
+            where = f"WHERE bairro IN ({', '.join('?' * len(bairros))})"
+            params = list(bairros)
+        group = ", ".join(dims)
+        return self.sql(f"""
+            SELECT {group}, SUM(n) AS registros,
+                   SUM(soma_preco) * 1.0 / SUM(n) AS preco_medio,
+                   SUM(soma_pm2) * 1.0 / SUM(n) AS pm2_medio
+            FROM rollup_diario {where}
+            GROUP BY {group} ORDER BY {group}
+        """, params)
+
+    def close(self):
+        self._con.close()
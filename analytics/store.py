@@ -0,0 +1,254 @@
+"""Escrita incremental e à prova de falhas da base particionada.
+
+1. ``append(lote)`` grava o lote como um segmento em ``_wal/`` (temporário +
+   fsync + rename): um crash no meio deixa só um ``.tmp`` que é ignorado.
+2. ``compact()`` junta os segmentos pendentes em arquivos de partição
+   (``analytics.partitions``), publica um novo ``_manifest.json`` com troca
+   atômica e só então apaga os segmentos. O manifesto registra quais
+   segmentos já foram compactados, então um crash entre os passos não
+   duplica nem perde linhas; partições órfãs são removidas na próxima vez.
+   Na primeira compactação um manifesto v0 é publicado antes, para que
+   partições recém-gravadas nunca sejam lidas sem manifesto.
+
+Leitores usam o manifesto + segmentos pendentes (``StoreReader``). Assume um
+único escritor por vez. Cada ``append`` também atualiza a tabela de ciclo de
+vida (``analytics.lifecycle``) em ``_state/``, sem reler o histórico.
+
+    python -m analytics.store migrate base/quintoandar_database.xlsx
+    python -m analytics.store compact --root base/partitions
+    python -m analytics.store status
+"""
+
+import argparse
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from analytics.changes import state_dir
+from analytics.ingest import load_listings
+from analytics.lifecycle import LIFECYCLE_FILE, LifecycleTable
+from analytics.partitions import (
+    PARTITIONS_DIR, read_manifest, scan_partitions, write_frame_atomic,
+    write_manifest, write_partitions,
+)
+from analytics.version import combine, parquet_digest, remember_digest
+
+WAL_DIR = "_wal"
+
+
+def manifest_entry(root, path):
+    """Registro do manifesto para um arquivo ``root/cidade=*/mes=*/part-*.parquet``.
+
+    ``digest`` é o ``analytics.version.frame_digest`` do conteúdo do arquivo.
+    """
+    rel = os.path.relpath(path, root).replace(os.sep, "/")
+    cidade_dir, mes_dir = rel.split("/")[:2]
+    return {
+        "path": rel,
+        "cidade": cidade_dir[len("cidade="):],
+        "mes": mes_dir[len("mes="):],
+        "rows": pq.read_metadata(path).num_rows,
+        "bytes": os.path.getsize(path),
+        "digest": str(parquet_digest(path)),
+    }
+
+
+class ListingStore:
+    """Base particionada em ``root`` com log de escrita (WAL) e manifesto."""
+
+    def __init__(self, root=PARTITIONS_DIR):
+        self.root = root
+        self.wal_dir = os.path.join(root, WAL_DIR)
+        self._lifecycle = None
+
+    def exists(self):
+        return read_manifest(self.root) is not None or bool(scan_partitions(self.root)) or bool(self._segments())
+
+    def manifest(self):
+        """Manifesto atual; sem ``_manifest.json``, monta um a partir dos arquivos existentes."""
+        manifest = read_manifest(self.root)
+        if manifest is None:
+            manifest = {
+                "version": 0,
+                "files": [manifest_entry(self.root, p) for _, _, p in scan_partitions(self.root)],
+                "compacted_segments": [],
+            }
+        return manifest
+
+    def _segments(self):
+        if not os.path.isdir(self.wal_dir):
+            return []
+        return sorted(n for n in os.listdir(self.wal_dir) if n.endswith(".parquet"))
+
+    def pending_segments(self, manifest=None):
+        """Caminhos dos segmentos ainda não compactados, em ordem de escrita."""
+        done = set((manifest or self.manifest()).get("compacted_segments", []))
+        return [os.path.join(self.wal_dir, n) for n in self._segments() if n not in done]
+
+    def append(self, df: pd.DataFrame, sightings: pd.DataFrame = None):
+        """Grava um lote (tipado) como novo segmento do WAL; retorna o caminho.
+
+        ``sightings`` é a coleta completa quando ``df`` traz só as mudanças
+        (``--changes-only``): é ela que alimenta o ciclo de vida.
+        """
+        sightings = df if sightings is None else sightings
+        has_sightings = sightings is not None and not sightings.empty
+        # Carregada antes do segmento (montá-la da base depois o contaria duas vezes)
+        lifecycle = self.lifecycle() if has_sightings else None
+        path = None
+        if df is not None and not df.empty:
+            name = f"seg-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+            path = write_frame_atomic(df, os.path.join(self.wal_dir, name))
+        # Atualizada só depois do segmento gravado: uma falha acima não conta as capturas
+        if has_sightings:
+            lifecycle.update(sightings)
+            lifecycle.save(state_dir(self.root))
+        return path
+
+    def lifecycle(self) -> LifecycleTable:
+        """Tabela de ciclo de vida; na primeira vez, montada a partir da base existente."""
+        if self._lifecycle is None:
+            if os.path.exists(os.path.join(state_dir(self.root), LIFECYCLE_FILE)) or not self.exists():
+                self._lifecycle = LifecycleTable.load(state_dir(self.root))
+            else:
+                self._lifecycle = LifecycleTable.from_history(StoreReader(self.root).refresh())
+        return self._lifecycle
+
+    def compact(self):
+        """Move os segmentos pendentes para as partições e publica o novo manifesto."""
+        manifest = self.manifest()
+        if read_manifest(self.root) is None and (manifest["files"] or self._segments()):
+            # Primeira compactação: publica o v0 (partições já existentes) antes de gravar
+            # as novas; um crash no meio as deixa fora do manifesto, como órfãs
+            write_manifest(self.root, manifest)
+        self._remove_orphans(manifest)
+        # Segmentos que um crash deixou no WAL depois da troca do manifesto: já estão nas partições
+        self._remove_compacted(manifest)
+        pending = self.pending_segments(manifest)
+        if pending:
+            batch = pd.concat([pd.read_parquet(p) for p in pending], ignore_index=True)
+            version = manifest["version"] + 1
+            written = write_partitions(batch, self.root, tag=f"c{version:06d}-{uuid.uuid4().hex[:8]}")
+            entries = [manifest_entry(self.root, p) for p in written]
+            manifest = {
+                "version": version,
+                "updated": datetime.now().isoformat(timespec="seconds"),
+                "files": manifest["files"] + entries,
+                "compacted_segments": [os.path.basename(p) for p in pending],
+            }
+            write_manifest(self.root, manifest)
+        # Agora o manifesto já cobre esses segmentos: podem sair do WAL
+        self._remove_compacted(manifest)
+        return manifest
+
+    def _remove_compacted(self, manifest):
+        done = set(manifest.get("compacted_segments", []))
+        for name in self._segments():
+            if name in done:
+                os.remove(os.path.join(self.wal_dir, name))
+
+    def _remove_orphans(self, manifest):
+        """Apaga partições gravadas por uma compactação que não chegou a publicar o manifesto."""
+        if read_manifest(self.root) is None:
+            return
+        known = {f["path"] for f in manifest["files"]}
+        for cidade, mes, path in scan_partitions(self.root):
+            if os.path.relpath(path, self.root).replace(os.sep, "/") not in known:
+                os.remove(path)
+
+    def data_version(self, manifest=None):
+        """Versão por conteúdo das linhas visíveis (partições do manifesto + segmentos pendentes).
+
+        Não muda com compactação/reescrita que preserve as linhas.
+        """
+        manifest = manifest or self.manifest()
+        pending = self.pending_segments(manifest)
+        digests = [
+            f["digest"] if "digest" in f else parquet_digest(os.path.join(self.root, *f["path"].split("/")))
+            for f in manifest["files"]
+        ] + [parquet_digest(p) for p in pending]
+        rows = sum(f["rows"] for f in manifest["files"]) + sum(pq.read_metadata(p).num_rows for p in pending)
+        return combine(digests, rows)
+
+
+class StoreReader:
+    """Leitura incremental: arquivos são imutáveis, então cada um é lido uma única vez.
+
+    ``refresh()`` só abre partições/segmentos que apareceram desde a última
+    chamada e devolve o mesmo DataFrame quando nada mudou.
+    """
+
+    def __init__(self, root=PARTITIONS_DIR):
+        self.store = ListingStore(root)
+        self._frames = {}
+        self._paths = None
+        self._combined = None
+        self.last_read = 0
+        self.version = None
+        self._lock = threading.Lock()
+
+    def refresh(self, retries=3):
+        with self._lock:
+            for attempt in range(retries):
+                try:
+                    return self._refresh()
+                except FileNotFoundError:
+                    # Uma compactação concorrente apagou um segmento: relê o manifesto novo
+                    if attempt == retries - 1:
+                        raise
+
+    def _refresh(self):
+        manifest = self.store.manifest()
+        paths = [os.path.join(self.store.root, *f["path"].split("/")) for f in manifest["files"]]
+        paths += self.store.pending_segments(manifest)
+        if paths == self._paths:
+            self.last_read = 0
+            return self._combined
+        new = [p for p in paths if p not in self._frames]
+        for path in new:
+            self._frames[path] = pd.read_parquet(path)
+            remember_digest(path, self._frames[path])
+        self._frames = {p: self._frames[p] for p in paths}
+        self.last_read = len(new)
+        self._paths = paths
+        self._combined = pd.concat(self._frames.values(), ignore_index=True) if paths else None
+        self.version = self.store.data_version(manifest)
+        return self._combined
+
+
+def migrate_workbook(xlsx_path, root=PARTITIONS_DIR):
+    """Converte a planilha única em partições (via WAL + compactação)."""
+    df = load_listings(xlsx_path)
+    if df is None:
+        raise FileNotFoundError(xlsx_path)
+    store = ListingStore(root)
+    store.append(df)
+    return store.compact()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Base particionada: migração, compactação e status")
+    parser.add_argument("command", choices=["migrate", "compact", "status"])
+    parser.add_argument("source", nargs="?", default=os.path.join("base", "quintoandar_database.xlsx"),
+                        help="planilha de origem (migrate)")
+    parser.add_argument("--root", default=PARTITIONS_DIR)
+    args = parser.parse_args(argv)
+
+    store = ListingStore(args.root)
+    if args.command == "migrate":
+        migrate_workbook(args.source, args.root)
+    elif args.command == "compact":
+        store.compact()
+    manifest = store.manifest()
+    print(f"{store.root}: manifesto v{manifest['version']}, {len(manifest['files'])} arquivos, "
+          f"{sum(f['rows'] for f in manifest['files'])} linhas, "
+          f"{len(store.pending_segments(manifest))} segmentos pendentes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Séries temporais por bairro: índice de R$/m², medianas móveis e vendas repetidas.
+
+A média diária de ``Preço`` sobre todo o histórico depende de quais bairros
+foram coletados em cada dia. Aqui cada imóvel entra uma vez por período
+(a última captura dele no período) e os agregados são por bairro, então a
+série de um bairro não muda quando outro deixa de ser coletado.
+
+Tudo é groupby vetorizado; o dashboard guarda o resultado por versão dos dados.
+"""
+
+import numpy as np
+import pandas as pd
+
+DATE_COL = 'Data e Hora da Extração'
+FREQS = {"D": "Diária", "W": "Semanal", "M": "Mensal"}
+
+
+def _period_captures(df: pd.DataFrame, freq="W", col_bairro='Bairro') -> pd.DataFrame:
+    """Uma linha por (imóvel, período): a última captura dele no período."""
+    ts = pd.to_datetime(df[DATE_COL], errors='coerce')
+    caps = pd.DataFrame({
+        'id': df['ID Imóvel'].to_numpy(),
+        'Bairro': df[col_bairro].to_numpy(),
+        'Período': ts.dt.to_period(freq).dt.start_time.to_numpy(),
+        'ts': ts.to_numpy(),
+        'Preço': df['Preço'].to_numpy(dtype=float),
+        'Preço/m²': df['Preço/m²'].to_numpy(dtype=float),
+    })
+    caps = caps[caps['Preço'].gt(0) & caps['Preço/m²'].gt(0) & caps['ts'].notna()]
+    return caps.sort_values('ts', kind='stable').drop_duplicates(['id', 'Período'], keep='last')
+
+
+def bairro_pm2_index(df: pd.DataFrame, freq="W", col_bairro='Bairro') -> pd.DataFrame:
+    """R$/m² mediano por bairro e período, com índice base 100 no primeiro período do bairro.
+
+    Colunas: ``col_bairro``, 'Período', 'Preço/m²', 'Anúncios', 'Índice'.
+    """
+    caps = _period_captures(df, freq, col_bairro)
+    out = (
+        caps.groupby(['Bairro', 'Período'])['Preço/m²']
+        .agg(['median', 'size'])
+        .rename(columns={'median': 'Preço/m²', 'size': 'Anúncios'})
+        .reset_index()
+    )
+    base = out.groupby('Bairro')['Preço/m²'].transform('first')
+    out['Índice'] = (out['Preço/m²'] / base * 100).round(2)
+    return out.rename(columns={'Bairro': col_bairro})
+
+
+def rolling_median(index: pd.DataFrame, window=4, col_bairro='Bairro', value='Preço/m²') -> pd.DataFrame:
+    """Acrescenta 'Mediana Móvel': mediana dos últimos ``window`` períodos de cada bairro."""
+    ordered = index.sort_values([col_bairro, 'Período'], kind='stable')
+    rolled = ordered.groupby(col_bairro, sort=False)[value].rolling(window, min_periods=1).median()
+    return ordered.assign(**{'Mediana Móvel': rolled.reset_index(level=0, drop=True)})
+
+
+def repeat_sales_index(df: pd.DataFrame, freq="W", col_bairro='Bairro', bairros=None) -> pd.DataFrame:
+    """Índice de vendas repetidas (Bailey-Muth-Nourse) a partir de imóveis com várias capturas.
+
+    Cada par de capturas consecutivas do mesmo imóvel em períodos diferentes
+    dá uma equação log(p1/p0) = b[t1] - b[t0]; ``b`` sai de mínimos quadrados
+    com b[primeiro período] = 0. Como compara o mesmo imóvel consigo mesmo,
+    não depende do mix de bairros/tipos coletados. Pede histórico denso (com
+    log de mudanças esparso, imóveis sem mudança não formam pares).
+
+    Colunas: 'Período', 'Índice' (base 100), 'Pares' (pares que terminam no período).
+    """
+    caps = _period_captures(df, freq, col_bairro)
+    if bairros is not None:
+        caps = caps[caps['Bairro'].isin(list(bairros))]
+    caps = caps.sort_values(['id', 'Período'], kind='stable')
+    prev = caps.groupby('id', sort=False)[['Período', 'Preço']].shift(1)
+    pairs = pd.DataFrame({
+        't0': prev['Período'], 't1': caps['Período'],
+        'dlog': np.log(caps['Preço']) - np.log(prev['Preço']),
+    }).dropna()
+    periods = pd.Index(np.sort(pd.concat([pairs['t0'], pairs['t1']]).unique()))
+    if len(periods) < 2:
+        return pd.DataFrame(columns=['Período', 'Índice', 'Pares'])
+
+    i0 = periods.get_indexer(pairs['t0'])
+    i1 = periods.get_indexer(pairs['t1'])
+    # Equações normais (períodos × períodos) acumuladas direto dos pares:
+    # memória não cresce com o número de pares
+    n = len(periods)
+    dlog = pairs['dlog'].to_numpy()
+    XtX = (np.bincount(i1 * n + i1, minlength=n * n) + np.bincount(i0 * n + i0, minlength=n * n)
+           - np.bincount(i0 * n + i1, minlength=n * n) - np.bincount(i1 * n + i0, minlength=n * n)).reshape(n, n)
+    Xty = np.bincount(i1, weights=dlog, minlength=n) - np.bincount(i0, weights=dlog, minlength=n)
+    beta, *_ = np.linalg.lstsq(XtX[1:, 1:].astype(float), Xty[1:], rcond=None)
+    counts = np.bincount(i1, minlength=len(periods))
+    return pd.DataFrame({
+        'Período': periods,
+        'Índice': (np.exp(np.concatenate([[0.0], beta])) * 100).round(2),
+        'Pares': counts,
+    })
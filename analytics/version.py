@@ -0,0 +1,80 @@
+"""Versão dos dados por conteúdo, usada como chave de todos os caches do dashboard.
+
+- Base particionada: cada arquivo do manifesto guarda um ``digest`` (soma
+  módulo 2⁶⁴ dos hashes das suas linhas). A soma é independente de ordem e
+  de como as linhas estão repartidas, então compactar ou reescrever arquivos
+  sem mudar o conteúdo mantém a versão; qualquer linha nova/alterada a muda.
+- Planilha: SHA-1 dos bytes do arquivo. Só é recalculado quando tamanho ou
+  mtime mudam, e ``touch`` sem mudar o conteúdo mantém a versão.
+"""
+
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+_MEMO = {}
+_MEMO_LOCK = threading.Lock()
+
+
+def frame_digest(df: pd.DataFrame) -> int:
+    """Soma (uint64, com overflow) dos hashes das linhas de ``df``; colunas em ordem alfabética."""
+    if df is None or df.empty:
+        return 0
+    hashes = pd.util.hash_pandas_object(df[sorted(df.columns)], index=False).to_numpy()
+    return int(hashes.sum(dtype=np.uint64))
+
+
+def combine(digests, rows=None) -> str:
+    """Versão textual a partir de digests de partes (soma módulo 2⁶⁴)."""
+    total = sum(int(d) for d in digests) % (1 << 64)
+    prefix = f"{rows}r-" if rows is not None else ""
+    return f"{prefix}{total:016x}"
+
+
+def _memo(path, compute):
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    with _MEMO_LOCK:
+        if key in _MEMO:
+            return _MEMO[key]
+    value = compute(path)
+    with _MEMO_LOCK:
+        _MEMO[key] = value
+    return value
+
+
+def parquet_digest(path) -> int:
+    """``frame_digest`` de um arquivo Parquet (imutável: calculado uma vez por arquivo)."""
+    return _memo(path, lambda p: frame_digest(pd.read_parquet(p)))
+
+
+def remember_digest(path, df: pd.DataFrame):
+    """Registra o digest de um arquivo que acabou de ser lido (evita reler para versionar)."""
+    st = os.stat(path)
+    with _MEMO_LOCK:
+        _MEMO[(path, st.st_size, st.st_mtime_ns)] = frame_digest(df)
+
+
+def file_version(path) -> str:
+    """SHA-1 (16 hex) do conteúdo de ``path``; "missing" se não existir."""
+    if not os.path.exists(path):
+        return "missing"
+
+    def sha1(p):
+        h = hashlib.sha1()
+        with open(p, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()[:16]
+
+    return _memo(path, sha1)
+
+
+def forget(path=None):
+    """Descarta digests memorizados (de ``path`` ou todos): força recálculo na próxima consulta."""
+    with _MEMO_LOCK:
+        for key in [k for k in _MEMO if path is None or k[0] == path]:
+            del _MEMO[key]
@@ -0,0 +1,219 @@
+"""Benchmarks do pipeline do dashboard sobre históricos sintéticos.
+
+Uso (na raiz do repositório):
+
+    python -m benchmarks.run_benchmarks --sizes 10k,100k --output bench.json
+    python -m benchmarks.run_benchmarks --sizes 10k --baseline bench.json
+
+Cada estágio é cronometrado ``--repeat`` vezes (mediana e mínimo) e executado
+uma vez extra sob ``tracemalloc`` para medir o pico de memória alocada. O
+resultado é um JSON com metadados do ambiente e uma linha por (tamanho, estágio),
+pensado para ser versionado e comparado entre commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analytics.aggregations import bairro_pm2_reference, compute_ibairro
+from analytics.filters import apply_filters, apply_map_filters, default_filter_state
+from analytics.ingest import coerce_types, load_listings, latest_snapshot
+from benchmarks.synthetic import generate_history
+from mapa_calor import criar_mapa_calor, criar_tabela_bairros, criar_tabela_ruas
+from utils.formatting import style_listing_table
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), ".fixtures")
+SIZE_ALIASES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+STAGES = ["load_data", "dedup", "filters", "mapa_calor", "tabela_bairros", "tabela_ruas", "styler"]
+
+
+def parse_sizes(text):
+    sizes = []
+    for token in text.split(","):
+        token = token.strip().lower()
+        if token:
+            sizes.append(SIZE_ALIASES[token] if token in SIZE_ALIASES else int(token))
+    return sizes
+
+
+def excel_fixture(n_rows, seed):
+    """Gera (uma vez) a planilha sintética usada pelo estágio load_data."""
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, f"history_{n_rows}_{seed}.xlsx")
+    if not os.path.exists(path):
+        generate_history(n_rows, seed=seed).to_excel(path, index=False)
+    return path
+
+
+def listing_display_frame(filtered, reference):
+    """Monta a tabela de listagem como o dashboard (IBairro + colunas renomeadas)."""
+    out = filtered.assign(IBairro=compute_ibairro(filtered, bairro_pm2_reference(reference)))
+    return out.rename(columns={
+        'Preço': 'Preço (R$)', 'Condomínio': 'Condomínio (R$)',
+        'Preço/m²': 'Preço/m² (R$)', 'Data e Hora da Extração': 'Captura',
+    })
+
+
+def render_styler(display_df):
+    """Formata a listagem com o Styler do dashboard e a renderiza (API pública do Styler)."""
+    with pd.option_context("styler.render.max_elements", max(display_df.size, 1)):
+        style_listing_table(display_df).to_html()
+    return display_df
+
+
+def measure(fn, repeat):
+    """Executa ``fn`` ``repeat`` vezes e uma vez sob tracemalloc."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, timings, peak
+
+
+def bench_size(n_rows, repeat, seed, stages, skip_load=False):
+    """Roda todos os estágios para um tamanho e retorna as linhas de resultado."""
+    if "load_data" in stages and not skip_load:
+        path = excel_fixture(n_rows, seed)
+        plan = [("load_data", n_rows, lambda: load_listings(path))]
+    else:
+        plan = []
+
+    # Demais estágios partem do frame já tipado, sem depender do Excel
+    df_raw = coerce_types(generate_history(n_rows, seed=seed))
+    state = {}
+
+    def dedup():
+        state["latest"] = latest_snapshot(df_raw)
+        return state["latest"]
+
+    def filters():
+        latest = state["latest"]
+        f = default_filter_state(latest)
+        state["filtered"] = apply_filters(latest, f)
+        state["mapa"] = apply_map_filters(latest, f)
+        return state["filtered"]
+
+    def styler():
+        return render_styler(state["display"])
+
+    plan += [
+        ("dedup", n_rows, dedup),
+        ("filters", None, filters),
+        ("mapa_calor", None, lambda: criar_mapa_calor(state["mapa"])),
+        ("tabela_bairros", None, lambda: criar_tabela_bairros(state["mapa"])),
+        ("tabela_ruas", None, lambda: criar_tabela_ruas(state["mapa"])),
+        ("styler", None, styler),
+    ]
+
+    rows = []
+    for name, rows_in, fn in plan:
+        if name not in stages:
+            # dedup/filters alimentam os estágios seguintes, mesmo se não reportados
+            if name in ("dedup", "filters"):
+                fn()
+            continue
+        if name == "styler":
+            state["display"] = listing_display_frame(state["filtered"], df_raw)
+            rows_in = len(state["display"])
+        elif rows_in is None:
+            rows_in = len(state["latest"]) if name == "filters" else len(state["mapa"])
+        result, timings, peak = measure(fn, repeat)
+        median = statistics.median(timings)
+        rows.append({
+            "size": n_rows,
+            "stage": name,
+            "rows_in": int(rows_in),
+            "rows_out": int(len(result)) if isinstance(result, pd.DataFrame) else None,
+            "repeat": repeat,
+            "seconds_median": round(median, 6),
+            "seconds_min": round(min(timings), 6),
+            "rows_per_sec": round(rows_in / median, 1) if median > 0 else None,
+            "peak_mem_mb": round(peak / 2**20, 3),
+        })
+        print(f"{n_rows:>9,} {name:<15} {median * 1000:10.1f} ms  {rows[-1]['peak_mem_mb']:9.1f} MB", file=sys.stderr)
+    return rows
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Compara medianas com um JSON anterior. Retorna a lista de regressões."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get((r["size"], r["stage"]))
+        if not base or not base["seconds_median"]:
+            continue
+        ratio = r["seconds_median"] / base["seconds_median"]
+        r["baseline_ratio"] = round(ratio, 3)
+        if ratio > threshold:
+            regressions.append(r)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline do dashboard")
+    parser.add_argument("--sizes", default="10k,100k,1m", help="tamanhos separados por vírgula (10k, 100k, 1m ou inteiros)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="estágios a medir")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-load", action="store_true", help="não mede load_data (evita gerar planilhas grandes)")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--baseline", help="JSON anterior para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=1.25, help="razão mediana/baseline considerada regressão")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    results = []
+    for n_rows in parse_sizes(args.sizes):
+        results.extend(bench_size(n_rows, args.repeat, args.seed, stages, skip_load=args.skip_load))
+
+    regressions = compare(results, args.baseline, args.threshold) if args.baseline else []
+    payload = {"meta": environment(), "results": results}
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    for r in regressions:
+        print(f"REGRESSÃO: {r['stage']} @ {r['size']:,} linhas ({r['baseline_ratio']}x)", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Gerador de históricos sintéticos com o mesmo schema da base real.
+
+Cada imóvel é capturado várias vezes (em média ``captures_per_id``) ao longo de
+``n_days`` dias, com pequenas variações de preço entre capturas, reproduzindo o
+formato de ``base/quintoandar_database.xlsx``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analytics.schema import COLUMNS
+from bairro_coordinates import BAIRRO_COORDINATES
+
+TIPOS = ['Apartamento', 'Casa', 'Casa de Condomínio', 'Studio e kitnet']
+TIPO_WEIGHTS = [0.70, 0.15, 0.08, 0.07]
+RUAS = ['Rua Augusta', 'Avenida Paulista', 'Rua Vergueiro', 'Rua Flechas', 'Rua Domingos de Morais',
+        'Avenida Santo Amaro', 'Rua Cardeal Arcoverde', 'Rua Tuim', 'Travessa Fantasia do Lago', 'Rua Apinajés']
+# Bairros fora de BAIRRO_COORDINATES, como acontece na base real
+UNMAPPED_BAIRROS = ['Jardim Sao Paulo', 'Vila Clementino', 'Paraiso']
+
+
+def generate_history(n_rows, captures_per_id=3, n_days=90, seed=42, start="2026-01-01"):
+    """Retorna um DataFrame com ``n_rows`` capturas sintéticas (tipos da planilha bruta)."""
+    rng = np.random.default_rng(seed)
+    n_ids = max(1, n_rows // captures_per_id)
+
+    bairros = np.array(list(BAIRRO_COORDINATES.keys()) + UNMAPPED_BAIRROS)
+    bairro_pm2 = rng.uniform(6_000, 18_000, size=len(bairros))
+
+    # Atributos fixos por imóvel
+    ids = np.arange(890_000_000, 890_000_000 + n_ids).astype(str)
+    bairro_idx = rng.integers(0, len(bairros), size=n_ids)
+    tipo = rng.choice(TIPOS, size=n_ids, p=TIPO_WEIGHTS)
+    area = np.clip(rng.lognormal(mean=4.1, sigma=0.5, size=n_ids), 18, 900).astype(int)
+    quartos = np.clip(np.round(area / 35), 0, 6).astype(int)
+    base_price = np.round(area * bairro_pm2[bairro_idx] * rng.normal(1.0, 0.15, size=n_ids), -3)
+    base_price = np.clip(base_price, 50_000, None)
+    condo = np.round(area * rng.uniform(8, 20, size=n_ids)).astype(int)
+    rua = rng.choice(RUAS, size=n_ids)
+    numero = rng.integers(1, 3000, size=n_ids)
+
+    # Capturas: cada linha aponta para um imóvel
+    owner = np.concatenate([np.arange(n_ids), rng.integers(0, n_ids, size=n_rows - n_ids)]) if n_rows > n_ids else np.arange(n_rows)
+    owner = owner[:n_rows]
+    day = rng.integers(0, n_days, size=n_rows)
+    minute = rng.integers(0, 24 * 60, size=n_rows)
+    ts = pd.Timestamp(start) + pd.to_timedelta(day, unit='D') + pd.to_timedelta(minute, unit='min')
+    # Variação de preço ao longo do tempo (tendência por dia + ruído pontual)
+    drift = 1 + (day / n_days) * rng.normal(0.0, 0.05, size=n_rows)
+    preco = (np.round(base_price[owner] * drift, -3)).astype(np.int64)
+    area_o = area[owner]
+    bairro_o = bairros[bairro_idx[owner]]
+    tipo_o = tipo[owner]
+    ids_o = ids[owner]
+
+    df = pd.DataFrame({
+        'ID Imóvel': ids_o,
+        'Cidade': 'São Paulo',
+        'Bairro': bairro_o,
+        'Tipo': tipo_o,
+        'Título/Descrição': pd.Series(tipo_o).str.cat(pd.Series(bairro_o), sep=' à venda em ').to_numpy(),
+        'Preço': preco,
+        'Condomínio': condo[owner],
+        'Área (m²)': area_o,
+        'Preço/m²': np.round(preco / area_o, 2),
+        'Quartos': quartos[owner],
+        'Endereço': pd.Series(rua[owner]).str.cat([f", {n}" for n in numero[owner]]).str.cat(pd.Series(bairro_o), sep=', ').to_numpy(),
+        'Link': 'https://www.quintoandar.com.br/imovel/' + pd.Series(ids_o),
+        'Data e Hora da Extração': pd.Series(ts).dt.strftime('%Y-%m-%d %H:%M').to_numpy(),
+    }, columns=COLUMNS)
+    return df
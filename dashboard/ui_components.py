@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 from utils.formatting import format_brl
 
 # ============================================================
@@ -14,7 +15,7 @@ CHART_TEMPLATE = "plotly_dark"
 GRID_COLOR = "#2D3139"
 TITLE_GRADIENT = "linear-gradient(90deg, #FF6B35, #FF9F1C)"
 
-__all__ = ['BG_COLOR', 'CARD_BG', 'CARD_BORDER', 'TEXT_COLOR', 'SUBTEXT_COLOR', 'SIDEBAR_BG', 'CHART_TEMPLATE', 'GRID_COLOR', 'TITLE_GRADIENT', 'apply_custom_css', 'render_header', 'render_kpi_card', 'get_chart_layout']
+__all__ = ['BG_COLOR', 'CARD_BG', 'CARD_BORDER', 'TEXT_COLOR', 'SUBTEXT_COLOR', 'SIDEBAR_BG', 'CHART_TEMPLATE', 'GRID_COLOR', 'TITLE_GRADIENT', 'apply_custom_css', 'render_header', 'render_kpi_card', 'get_chart_layout', 'render_perf_panel']
 
 def apply_custom_css():
     st.markdown(f"""
@@ -127,3 +128,19 @@ def get_chart_layout():
         margin=dict(l=40, r=20, t=50, b=40),
         hoverlabel=dict(bgcolor=SIDEBAR_BG, font_color=TEXT_COLOR),
     )
+
+def render_perf_panel(summary):
+    """Painel recolhível com a latência de cada estágio do rerun atual."""
+    with st.expander("⏱️ Performance", expanded=False):
+        st.caption(f"Rerun {summary['run_id']} — {summary['total_ms']:,.0f} ms no total")
+        if summary["stages"]:
+            st.dataframe(
+                pd.DataFrame(summary["stages"]).sort_values("ms", ascending=False),
+                hide_index=True,
+                width="stretch",
+                column_config={
+                    "stage": st.column_config.TextColumn("Estágio"),
+                    "ms": st.column_config.NumberColumn("ms", format="%.1f"),
+                    "rows": st.column_config.NumberColumn("Linhas"),
+                },
+            )
@@ -5,6 +5,7 @@ Usa plotly.express.scatter_mapbox com OpenStreetMap (sem token).
 
 import pandas as pd
 import plotly.express as px
+from analytics.aggregations import bairro_stats, map_aggregates, rua_stats
 from bairro_coordinates import BAIRRO_COORDINATES
 
 # Centro de São Paulo para o mapa
@@ -12,11 +13,16 @@ SP_CENTER = {"lat": -23.5605, "lon": -46.6533}
 SP_ZOOM = 11
 
 
-def criar_mapa_calor(df: pd.DataFrame):
+def criar_mapa_calor(df: pd.DataFrame, agg: pd.DataFrame = None, coordinates: dict = None):
     """Cria mapa interativo com bolhas coloridas por preço médio do bairro.
 
     Args:
         df: DataFrame com colunas 'Bairro', 'Preço', 'Área (m²)', 'Preço/m²'.
+        agg: agregados por bairro já calculados (ex.: pelo motor SQL); se
+            omitido, são calculados a partir de ``df``.
+        coordinates: bairro -> (lat, lon), ex.: ``Dataset.bairro_coordinates``
+            (padrão: ``BAIRRO_COORDINATES``). Bairros sem coordenada ficam de
+            fora; ``Dataset.unmapped_bairros`` os lista.
 
     Returns:
         plotly.graph_objects.Figure ou None se não houver dados.
@@ -25,20 +31,12 @@ def criar_mapa_calor(df: pd.DataFrame):
         return None
 
     # --- agregar por bairro ---
-    agg = (
-        df.groupby("Bairro")
-        .agg(
-            preco_medio=("Preço", "mean"),
-            pm2_medio=("Preço/m²", "mean"),
-            area_media=("Área (m²)", "mean"),
-            qtd=("Preço", "count"),
-        )
-        .reset_index()
-    )
+    agg = map_aggregates(df) if agg is None else agg.copy()
 
     # --- coordenadas ---
-    agg["lat"] = agg["Bairro"].map(lambda b: BAIRRO_COORDINATES.get(b, (None, None))[0])
-    agg["lon"] = agg["Bairro"].map(lambda b: BAIRRO_COORDINATES.get(b, (None, None))[1])
+    coordinates = BAIRRO_COORDINATES if coordinates is None else coordinates
+    agg["lat"] = agg["Bairro"].map(lambda b: coordinates.get(b, (None, None))[0])
+    agg["lon"] = agg["Bairro"].map(lambda b: coordinates.get(b, (None, None))[1])
     agg = agg.dropna(subset=["lat", "lon"])
 
     if agg.empty:
@@ -110,54 +108,12 @@ def criar_tabela_bairros(df: pd.DataFrame):
     if df.empty:
         return None
 
-    stats = (
-        df.groupby("Bairro")
-        .agg(
-            Imóveis=("ID Imóvel", "nunique"),
-            **{
-                "Preço Min": ("Preço", "min"),
-                "Preço Max": ("Preço", "max"),
-                "Preço Médio": ("Preço", "mean"),
-                "Preço/m² Médio": ("Preço/m²", "mean"),
-                "Área Média": ("Área (m²)", "mean"),
-            },
-        )
-        .round(2)
-        .reset_index()
-        .sort_values("Preço Médio", ascending=False)
-    )
-
-    return stats
+    return bairro_stats(df)
 
 
 def criar_tabela_ruas(df: pd.DataFrame):
-    """Retorna DataFrame com estatísticas agregadas por rua."""
+    """Retorna DataFrame com estatísticas agregadas por rua (top 20 ruas)."""
     if df.empty:
         return None
 
-    # Tenta extrair o nome da rua (tudo antes da primeira vírgula ou hífen no endereço)
-    def extrair_rua(addr):
-        if not isinstance(addr, str): return "N/A"
-        # Remove números e complementos comuns da rua para agrupar melhor
-        rua = addr.split(',')[0].split(' - ')[0].strip()
-        return rua
-
-    df_ruas = df.copy()
-    df_ruas['Rua'] = df_ruas['Endereço'].apply(extrair_rua)
-
-    stats = (
-        df_ruas.groupby("Rua")
-        .agg(
-            Imóveis=("ID Imóvel", "nunique"),
-            **{
-                "Preço Médio": ("Preço", "mean"),
-                "Preço/m² Médio": ("Preço/m²", "mean"),
-                "Área Média": ("Área (m²)", "mean"),
-            },
-        )
-        .round(2)
-        .reset_index()
-        .sort_values("Imóveis", ascending=False)
-    )
-
-    return stats.head(20) # Retorna as top 20 ruas
+    return rua_stats(df, top=20)
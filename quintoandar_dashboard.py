@@ -1,14 +1,35 @@
 import streamlit as st # Reloaded to fix import cache
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 import os
-from mapa_calor import criar_mapa_calor, criar_tabela_bairros, criar_tabela_ruas
+import time
+from dataclasses import replace
+from mapa_calor import criar_mapa_calor
 
 # New modules
-from utils.formatting import format_brl, fmt_br_currency, fmt_br_pm2, fmt_br_area
+from utils.formatting import format_brl, style_listing_table, LISTING_TABLE_FORMATS, BAIRRO_TABLE_FORMATS, RUA_TABLE_FORMATS, DROPS_TABLE_FORMATS
 from dashboard.ui_components import *
 from dashboard.filters import init_filter_session_state, update_price_slider, update_price_inputs, update_area_slider, update_area_inputs, reset_filters
+from analytics.filters import FilterState
+from analytics.query import run_query
+from analytics.sql_engine import SqlEngine
+from analytics.instrumentation import StageProfiler
+from analytics.events import price_events, recent_drops, drops_by_bairro
+from analytics.changes import ChangeTracker, state_dir, STATE_FILE
+from analytics.partitions import PARTITIONS_DIR
+from analytics.version import forget
+from analytics.refresher import DataRefresher, Snapshot
+from analytics.remote import DatasetClient, VersionChanged
+from analytics.diskcache import default_cache, persist
+from analytics.result_cache import ResultCache
+from analytics.timeseries import FREQS, bairro_pm2_index, rolling_median, repeat_sales_index
+from analytics.hedonic import HedonicModel
+from analytics.similar import SimilarIndex
+from analytics.distributions import BairroDistributions
+from analytics.export import EXPORT_FORMATS, export_bytes, positions_of, to_arrow
+from analytics.quality import ALL_FLAGS
+from analytics.lifecycle import LIFECYCLE_FILE, LifecycleTable, REMOVIDO, lifecycle_kpis, days_on_market_by_bairro
 
 try:
     import statsmodels.api as sm
@@ -24,24 +45,136 @@ apply_custom_css()
 # ============================================================
 DATA_PATH = os.path.join("base", "quintoandar_database.xlsx")
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_data(file_path, _file_mtime):
-    """Load data with cache invalidation based on file modification time"""
-    if not os.path.exists(file_path):
-        return None
-    df = pd.read_excel(file_path, dtype={'ID Imóvel': str})
+# Todos os caches derivados são chaveados pela versão dos dados por conteúdo
+# (analytics.version): uma versão nova só recalcula o que depende dela e as
+# antigas saem por max_entries, sem TTL nem limpeza global
+VERSIONS_KEPT = 2
 
-    # Garantir tipos numéricos
-    for col in ['Preço', 'Condomínio', 'Preço/m²']:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col].astype(str).str.replace(r'[R$\s\.]', '', regex=True).str.replace(',', ''), errors='coerce').fillna(0).astype(int)
-    df['Área (m²)'] = pd.to_numeric(df['Área (m²)'], errors='coerce').fillna(0).astype(int)
-    df['Quartos'] = pd.to_numeric(df['Quartos'], errors='coerce').fillna(0).astype(int)
-    
-    # Recalcular Preço/m² para consistência
-    df['Preço/m²'] = df.apply(lambda r: round(r['Preço'] / r['Área (m²)'], 2) if r['Área (m²)'] > 0 else 0, axis=1)
-    
-    return df
+# Estado da coleta diferencial (scraper.engine --changes-only): histórico como log de mudanças
+CHANGE_STATE_DIR = state_dir(PARTITIONS_DIR)
+
+@st.cache_data(max_entries=VERSIONS_KEPT)
+def load_change_tracker(directory, state_mtime):
+    return ChangeTracker.load(directory)
+
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@persist("price_events")
+def get_price_events(_df_raw, col_bairro, data_version):
+    """Tabela de mudanças de preço, calculada uma vez por versão dos dados."""
+    return price_events(_df_raw, col_bairro)
+
+@st.cache_data(max_entries=VERSIONS_KEPT * len(FREQS))
+@persist("pm2_index")
+def get_pm2_index(_df_raw, col_bairro, freq, data_version):
+    """R$/m² mediano por bairro e período, uma vez por versão dos dados e frequência."""
+    return bairro_pm2_index(_df_raw, freq, col_bairro)
+
+# Depende da seleção da sidebar: fica só em memória (como os agregados filtrados), sem @persist
+@st.cache_data(max_entries=VERSIONS_KEPT * len(FREQS))
+def get_repeat_sales(_df_raw, col_bairro, freq, bairros, tipos, data_version):
+    """Índice de vendas repetidas dos imóveis nos bairros e tipos selecionados."""
+    selecao = _df_raw[_df_raw[col_bairro].isin(bairros) & _df_raw['Tipo'].isin(tipos)]
+    return repeat_sales_index(selecao, freq, col_bairro)
+
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@persist("bairro_distributions")
+def get_bairro_distributions(_df_latest, col_bairro, data_version):
+    """Histogramas e estatísticas de box por bairro (captura mais recente), uma vez por versão."""
+    return BairroDistributions.build(_df_latest, col_bairro)
+
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@persist("hedonic_model")
+def get_hedonic_model(_df_latest, col_bairro, data_version):
+    """Modelo de preço justo ajustado na captura mais recente, uma vez por versão."""
+    return HedonicModel.fit(_df_latest, col_bairro)
+
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+@persist("similar_index")
+def get_similar_index(_df_latest, col_bairro, data_version, geo_version, _coordinates=None):
+    """Índice k-NN de imóveis similares, montado uma vez por versão dos dados e das coordenadas."""
+    return SimilarIndex.build(_df_latest, col_bairro, coordinates=_coordinates)
+
+@st.cache_resource(max_entries=VERSIONS_KEPT * 2)
+def get_export_table(_view, show_all, data_version):
+    """Visão em Arrow para a exportação (fatias sem cópia), uma vez por versão e visão."""
+    return to_arrow(_view)
+
+# Limite de bairros no "Comparar Bairros"
+COMPARE_MAX = 6
+
+# Ciclo de vida dos anúncios: mantido a cada append da base particionada;
+# sem esse estado (planilha), é montado do histórico uma vez por versão
+@st.cache_data(max_entries=VERSIONS_KEPT)
+def load_lifecycle(directory, state_mtime):
+    return LifecycleTable.load(directory).frame()
+
+@st.cache_data(max_entries=VERSIONS_KEPT)
+@persist("lifecycle")
+def build_lifecycle(_df_raw, col_bairro, col_cidade, data_version):
+    return LifecycleTable.from_history(_df_raw, col_bairro, col_cidade).frame()
+
+# Motor SQL opcional para as agregações: QA_SQL_ENGINE=duckdb | sqlite | auto
+SQL_BACKEND = os.environ.get("QA_SQL_ENGINE", "").strip().lower()
+
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+def get_sql_engine(backend, _df_raw, col_bairro, col_cidade, data_version):
+    """Uma conexão por versão dos dados, compartilhada entre sessões."""
+    return SqlEngine(backend).ingest(_df_raw, col_bairro, col_cidade)
+
+# Resultados de consulta (linhas filtradas + agregados) compartilhados entre sessões
+RESULT_CACHE_MB = int(os.environ.get("QA_RESULT_CACHE_MB", "256"))
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(max_bytes=RESULT_CACHE_MB * 1024 * 1024)
+
+# Leitura em segundo plano (analytics.refresher): base particionada quando
+# existir, senão a planilha. A versão nova é preparada e os caches acima são
+# aquecidos antes da troca, então nenhuma sessão espera pela ingestão
+REFRESH_INTERVAL = float(os.environ.get("QA_REFRESH_INTERVAL", "5"))
+
+def warm_caches(dataset, data_version):
+    """Pré-calcula os artefatos derivados da versão nova (chamado pela thread de atualização)."""
+    col_bairro, col_cidade = dataset.col_bairro, dataset.col_cidade
+    get_price_events(dataset.raw, col_bairro, data_version)
+    get_pm2_index(dataset.raw, col_bairro, "W", data_version)
+    get_bairro_distributions(dataset.latest, col_bairro, data_version)
+    get_hedonic_model(dataset.latest, col_bairro, data_version)
+    get_similar_index(dataset.latest, col_bairro, data_version, dataset.geo_version, dataset.bairro_coordinates)
+    if not os.path.exists(os.path.join(CHANGE_STATE_DIR, LIFECYCLE_FILE)):
+        build_lifecycle(dataset.raw, col_bairro, col_cidade, data_version)
+
+@st.cache_resource
+def get_refresher():
+    """Uma thread de atualização por servidor, compartilhada entre sessões."""
+    return DataRefresher(DATA_PATH, PARTITIONS_DIR, interval=REFRESH_INTERVAL, warm=warm_caches,
+                         cache=default_cache()).start()
+
+# Modo multi-worker: QA_DATA_SERVER=http://127.0.0.1:8765 aponta para um
+# ``python -m analytics.server``, que lê a base e responde filtros/agregados
+# para todos os workers; aqui só fica o snapshot de cada versão
+DATA_SERVER = os.environ.get("QA_DATA_SERVER", "").strip()
+
+@st.cache_resource
+def get_data_client(url):
+    return DatasetClient(url)
+
+@st.cache_resource(max_entries=VERSIONS_KEPT)
+def get_remote_snapshot(url, data_version):
+    """Snapshot da versão ``data_version`` baixado do servidor, uma vez por versão por worker."""
+    start = time.perf_counter()
+    dataset = get_data_client(url).dataset(data_version)
+    return Snapshot(data_version, dataset, url, time.time(), time.perf_counter() - start)
+
+def remote_snapshot(url):
+    client = get_data_client(url)
+    data_version = client.version()
+    if data_version is None:
+        return None
+    try:
+        return get_remote_snapshot(url, data_version)
+    except VersionChanged as exc:  # trocou entre status e download: pega a nova
+        return get_remote_snapshot(url, exc.version)
 
 # ============================================================
 # PAGE CONFIG & HEADER
@@ -54,40 +187,58 @@ st.set_page_config(
 )
 render_header(version="3.1")
 
+# Instrumentação opcional: QA_PERF=1 (ou ?perf=1 na URL); QA_PERF=alloc mede alocações
+perf = StageProfiler.from_env(st.query_params.get("perf"))
+
 # ============================================================
 # LOAD DATA
 # ============================================================
-# Cache-busting: use file modification time to invalidate cache when data updates
-file_mtime = os.path.getmtime(DATA_PATH) if os.path.exists(DATA_PATH) else 0
-df_raw = load_data(DATA_PATH, file_mtime)
+with perf.stage("load_data") as stage:
+    if DATA_SERVER:
+        refresher = None
+        snapshot = remote_snapshot(DATA_SERVER)
+        stage.extra["servidor"] = DATA_SERVER
+    else:
+        refresher = get_refresher()
+        # Só a primeira sessão após a partida espera; depois é sempre a versão já pronta
+        snapshot = refresher.wait_ready()
+    df_raw = snapshot.raw if snapshot is not None else None
+    data_version = snapshot.version if snapshot is not None else None
+    stage.extra["versao"] = data_version
+    stage.rows = len(df_raw) if df_raw is not None else 0
 
 if df_raw is None or df_raw.empty:
-    st.error("❌ Nenhum dado encontrado. Execute o scraper primeiro: `python quintoandar_scraper.py`")
+    st.error("❌ Nenhum dado encontrado. Execute o scraper primeiro: `python -m scraper.engine --output base/quintoandar_database.xlsx`")
     st.stop()
 
-# Detectar nomes de coluna (compatível com dados antigos e novos)
-COL_BAIRRO = 'Bairro' if 'Bairro' in df_raw.columns else 'Bairro de Busca'
-COL_CIDADE = 'Cidade' if 'Cidade' in df_raw.columns else 'Cidade de Busca'
-
 # ============================================================
 # VISÃO: ÚLTIMA CAPTURA vs TODOS OS REGISTROS
 # ============================================================
 # Por padrão, exibir apenas o registro mais recente de cada imóvel
-if 'Data e Hora da Extração' in df_raw.columns:
-    df_latest = df_raw.sort_values('Data e Hora da Extração').drop_duplicates(subset=['ID Imóvel'], keep='last').copy()
-else:
-    df_latest = df_raw.drop_duplicates(subset=['ID Imóvel'], keep='last').copy()
+# (Dataset também detecta os nomes de coluna, compatível com dados antigos e novos)
+with perf.stage("dedup", rows=len(df_raw)):
+    # Cópia rasa: attach_engine/use_change_log não podem alterar o snapshot compartilhado
+    dataset = replace(snapshot.dataset)
+state_path = os.path.join(CHANGE_STATE_DIR, STATE_FILE)
+if os.path.exists(state_path):
+    dataset.use_change_log(load_change_tracker(CHANGE_STATE_DIR, os.path.getmtime(state_path)))
+df_latest = dataset.latest
+COL_BAIRRO, COL_CIDADE = dataset.col_bairro, dataset.col_cidade
+
+if SQL_BACKEND:
+    with perf.stage("sql_engine", rows=len(df_raw)):
+        dataset.attach_engine(get_sql_engine(SQL_BACKEND, df_raw, COL_BAIRRO, COL_CIDADE, data_version))
 
 # Calculate defaults for filters
 df_default = df_latest
-default_cidades = sorted(df_default[COL_CIDADE].dropna().unique().tolist()) if COL_CIDADE in df_default.columns else []
-default_bairros = sorted(df_default[COL_BAIRRO].dropna().unique().tolist()) if COL_BAIRRO in df_default.columns else []
-default_tipos = sorted(df_default['Tipo'].dropna().unique().tolist()) if 'Tipo' in df_default.columns else []
-default_price_min = int(df_default['Preço'].min()) if not df_default.empty else 0
-default_price_max = int(df_default['Preço'].max()) if not df_default.empty else 1000000
-default_area_min = int(df_default['Área (m²)'].min()) if not df_default.empty else 0
-default_area_max = int(df_default['Área (m²)'].max()) if not df_default.empty else 1000
-default_quartos = sorted(df_default['Quartos'].dropna().unique().tolist()) if 'Quartos' in df_default.columns else []
+with perf.stage("filter_defaults", rows=len(df_latest)):
+    default_state = dataset.default_filters()
+    default_cidades = list(default_state.cidades)
+    default_bairros = list(default_state.bairros)
+    default_tipos = list(default_state.tipos)
+    default_price_min, default_price_max = default_state.price
+    default_area_min, default_area_max = default_state.area
+    default_quartos = list(default_state.quartos)
 
 # Initialize session state for filters
 init_filter_session_state(df_default, default_cidades, default_bairros, default_tipos, default_price_min, default_price_max, default_area_min, default_area_max, default_quartos)
@@ -178,13 +329,29 @@ with st.sidebar:
     quartos_opts = sorted(df['Quartos'].dropna().unique().tolist())
     sel_quartos = st.multiselect("Quartos", quartos_opts, default=quartos_opts, key="sel_quartos")
 
+    # Linhas sinalizadas na ingestão (analytics.quality): excluídas por um AND de bits
+    excluir_sinalizados = st.toggle("🧹 Excluir anúncios sinalizados", value=True, key="excluir_sinalizados",
+                                    help="Preço ou área ilegíveis/fora de faixa, condomínio implausível, sem bairro "
+                                         "ou R$/m² atípico para o bairro e tipo.")
+    relatorio_qualidade = dataset.quality_report(show_all)
+    sinalizados = int(relatorio_qualidade['Anúncios'].iloc[-1])
+    with st.expander(f"Qualidade dos dados ({sinalizados} sinalizados)"):
+        st.dataframe(relatorio_qualidade[relatorio_qualidade['Anúncios'] > 0][['Descrição', 'Anúncios', '%']],
+                     hide_index=True, width="stretch")
+
     st.markdown("---")
-    st.caption(f"Base atualizada: {df_raw['Data e Hora da Extração'].max()}")
+    st.caption(f"Base atualizada: {df_raw['Data e Hora da Extração'].max()} | versão {data_version[-8:]}")
     st.caption(f"Imóveis únicos: {df_raw['ID Imóvel'].nunique()} | Registros totais: {len(df_raw)}")
     
     if st.button("🔄 Recarregar Dados", use_container_width=True):
-        st.cache_data.clear()
-        st.rerun()
+        # Só refaz a impressão digital da planilha: se o conteúdo mudou, a versão
+        # nova recalcula o que depende dela; senão os caches continuam quentes
+        if refresher is not None:
+            forget(DATA_PATH)
+            refresher.wake()
+        else:
+            get_data_client(DATA_SERVER).refresh()
+        st.toast("Verificando a base; a versão nova aparece assim que estiver pronta.")
 
     if st.button("🗑️ Limpar Filtros", use_container_width=True, on_click=reset_filters, args=(default_cidades, default_bairros, default_tipos, default_price_min, default_price_max, default_area_min, default_area_max, default_quartos)):
         pass
@@ -192,44 +359,54 @@ with st.sidebar:
 # ============================================================
 # APLICAR FILTROS
 # ============================================================
-# Base filter for cities
-df_filtered_city = df[df[COL_CIDADE].isin(sel_cidades)] if (COL_CIDADE in df.columns and sel_cidades) else df
-
-filtered = df_filtered_city[
-    (df_filtered_city[COL_BAIRRO].isin(sel_bairros)) &
-    (df_filtered_city['Tipo'].isin(sel_tipos)) &
-    (df['Preço'].between(sel_price[0], sel_price[1])) &
-    (df['Área (m²)'].between(sel_area[0], sel_area[1])) &
-    (df['Quartos'].isin(sel_quartos))
-].copy()
+with perf.stage("filters", rows=len(df)) as stage:
+    filter_state = FilterState(
+        col_bairro=COL_BAIRRO, col_cidade=COL_CIDADE,
+        cidades=tuple(sel_cidades), bairros=tuple(sel_bairros), tipos=tuple(sel_tipos),
+        price=tuple(sel_price), area=tuple(sel_area), quartos=tuple(sel_quartos),
+        exclude_flags=ALL_FLAGS if excluir_sinalizados else 0,
+    )
+    if DATA_SERVER:
+        # Filtros e agregados calculados (e cacheados) no servidor, compartilhados entre workers,
+        # sempre sobre a mesma versão do dataset desta execução
+        try:
+            result = get_data_client(DATA_SERVER).query(filter_state, show_all=show_all, version=data_version).prefetch()
+        except VersionChanged:
+            st.rerun()  # o servidor trocou de versão: recomeça com o snapshot novo
+        stage.extra["result_cache"] = "remoto"
+    else:
+        result_cache = get_result_cache()
+        hits_before = result_cache.hits
+        result = run_query(dataset, filter_state, show_all=show_all, cache=result_cache, data_version=data_version)
+        stage.extra["result_cache"] = "hit" if result_cache.hits > hits_before else "miss"
+    filtered = result.rows
+    stage.extra["rows_out"] = len(filtered)
 
 # ============================================================
 # CRIAR ABAS
 # ============================================================
-tab1, tab2 = st.tabs(['📊 Dashboard', '🗺️ Mapa de Calor'])
+tab1, tab2, tab3, tab4 = st.tabs(['📊 Dashboard', '🗺️ Mapa de Calor', '📉 Quedas Recentes', '⏳ Tempo de Mercado'])
 
 # ============ ABA 1: DASHBOARD ============
 with tab1:
-    col1, col2, col3, col4, col5 = st.columns(5)
+    with perf.stage("kpis", rows=len(filtered)):
+        kpis = result.kpis
+        col1, col2, col3, col4, col5 = st.columns(5)
     
-    with col1:
-        render_kpi_card("Imóveis", f"{len(filtered):,}", 'registros totais' if show_all else 'únicos')
+        with col1:
+            render_kpi_card("Imóveis", f"{kpis['imoveis']:,}", 'registros totais' if show_all else 'únicos')
     
-    with col2:
-        avg_price = filtered['Preço'].mean() if not filtered.empty else 0
-        render_kpi_card("Preço Médio", format_brl(avg_price), f"mediana: {format_brl(filtered['Preço'].median()) if not filtered.empty else 'N/A'}")
+        with col2:
+            render_kpi_card("Preço Médio", format_brl(kpis['preco_medio']), f"mediana: {format_brl(kpis['preco_mediano']) if kpis['imoveis'] else 'N/A'}")
     
-    with col3:
-        avg_pm2 = filtered['Preço/m²'].mean() if not filtered.empty else 0
-        render_kpi_card("Preço/m² Médio", format_brl(avg_pm2), "por metro quadrado")
+        with col3:
+            render_kpi_card("Preço/m² Médio", format_brl(kpis['pm2_medio']), "por metro quadrado")
     
-    with col4:
-        avg_area = filtered['Área (m²)'].mean() if not filtered.empty else 0
-        render_kpi_card("Área Média", f"{avg_area:.0f} m²", "média dos filtrados")
+        with col4:
+            render_kpi_card("Área Média", f"{kpis['area_media']:.0f} m²", "média dos filtrados")
     
-    with col5:
-        avg_condo = filtered['Condomínio'].mean() if not filtered.empty else 0
-        render_kpi_card("Condomínio Médio", format_brl(avg_condo), "encargos mensais")
+        with col5:
+            render_kpi_card("Condomínio Médio", format_brl(kpis['condominio_medio']), "encargos mensais")
     
     # 🕒 Freshness Indicator
     last_update = df_raw['Data e Hora da Extração'].max()
@@ -249,29 +426,30 @@ with tab1:
         
         with chart_col1:
             st.markdown("#### 📊 Distribuição de Preços")
-            fig_hist = px.histogram(
-                filtered, x='Preço', nbins=30,
-                color_discrete_sequence=['#FF6B35'],
-                labels={'Preço': 'Preço (R$)', 'count': 'Quantidade'}
-            )
-            fig_hist.update_layout(**chart_layout, showlegend=False)
-            fig_hist.update_xaxes(gridcolor="#2D3139", tickformat=',.0f')
-            fig_hist.update_yaxes(gridcolor="#2D3139", title='Quantidade')
-            st.plotly_chart(fig_hist, width="stretch")
+            with perf.stage("fig_histograma", rows=len(filtered)):
+                fig_hist = px.histogram(
+                    filtered, x='Preço', nbins=30,
+                    color_discrete_sequence=['#FF6B35'],
+                    labels={'Preço': 'Preço (R$)', 'count': 'Quantidade'}
+                )
+                fig_hist.update_layout(**chart_layout, showlegend=False)
+                fig_hist.update_xaxes(gridcolor="#2D3139", tickformat=',.0f')
+                fig_hist.update_yaxes(gridcolor="#2D3139", title='Quantidade')
+                st.plotly_chart(fig_hist, width="stretch")
         
         with chart_col2:
             st.markdown(f"#### 🏘️ Preço/m² por Bairro")
-            avg_by_bairro = filtered.groupby(COL_BAIRRO)['Preço/m²'].mean().reset_index()
-            avg_by_bairro = avg_by_bairro.sort_values('Preço/m²', ascending=True)
-            fig_bar = px.bar(
-                avg_by_bairro, x='Preço/m²', y=COL_BAIRRO, orientation='h',
-                color='Preço/m²', color_continuous_scale=['#FF6B35', '#FF9F1C', '#FFD166'],
-                labels={'Preço/m²': 'R$/m²', COL_BAIRRO: ''}
-            )
-            fig_bar.update_layout(**chart_layout, showlegend=False, coloraxis_showscale=False)
-            fig_bar.update_xaxes(gridcolor=GRID_COLOR, tickformat=',.0f')
-            fig_bar.update_yaxes(gridcolor=GRID_COLOR)
-            st.plotly_chart(fig_bar, width="stretch")
+            with perf.stage("fig_bairros", rows=len(filtered)):
+                avg_by_bairro = result.pm2_by_bairro
+                fig_bar = px.bar(
+                    avg_by_bairro, x='Preço/m²', y=COL_BAIRRO, orientation='h',
+                    color='Preço/m²', color_continuous_scale=['#FF6B35', '#FF9F1C', '#FFD166'],
+                    labels={'Preço/m²': 'R$/m²', COL_BAIRRO: ''}
+                )
+                fig_bar.update_layout(**chart_layout, showlegend=False, coloraxis_showscale=False)
+                fig_bar.update_xaxes(gridcolor=GRID_COLOR, tickformat=',.0f')
+                fig_bar.update_yaxes(gridcolor=GRID_COLOR)
+                st.plotly_chart(fig_bar, width="stretch")
     
         st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
     
@@ -279,33 +457,34 @@ with tab1:
         
         with chart_col3:
             st.markdown("#### 🏠 Tipos de Imóvel")
-            type_counts = filtered['Tipo'].value_counts().reset_index()
-            type_counts.columns = ['Tipo', 'Quantidade']
-            fig_donut = px.pie(
-                type_counts, values='Quantidade', names='Tipo', hole=0.55,
-                color_discrete_sequence=['#FF6B35', '#FF9F1C', '#FFD166', '#06D6A0', '#118AB2']
-            )
-            fig_donut.update_layout(**chart_layout,
-                legend=dict(orientation='h', yanchor='bottom', y=-0.15, xanchor='center', x=0.5))
-            fig_donut.update_traces(textposition='inside', textinfo='percent+label', textfont_size=12)
-            st.plotly_chart(fig_donut, width="stretch")
+            with perf.stage("fig_tipos", rows=len(filtered)):
+                type_counts = result.type_counts
+                fig_donut = px.pie(
+                    type_counts, values='Quantidade', names='Tipo', hole=0.55,
+                    color_discrete_sequence=['#FF6B35', '#FF9F1C', '#FFD166', '#06D6A0', '#118AB2']
+                )
+                fig_donut.update_layout(**chart_layout,
+                    legend=dict(orientation='h', yanchor='bottom', y=-0.15, xanchor='center', x=0.5))
+                fig_donut.update_traces(textposition='inside', textinfo='percent+label', textfont_size=12)
+                st.plotly_chart(fig_donut, width="stretch")
         
         with chart_col4:
             st.markdown("#### 💎 Preço vs Área")
-            scatter_df = filtered[(filtered['Preço'] > 0) & (filtered['Área (m²)'] > 0)]
-            trendline_mode = "ols" if HAS_STATSMODELS else None
-            fig_scatter = px.scatter(
-                scatter_df, x='Área (m²)', y='Preço', color='Tipo',
-                size='Preço/m²', size_max=15, opacity=0.7, trendline=trendline_mode,
-                color_discrete_sequence=['#FF6B35', '#FF9F1C', '#FFD166', '#06D6A0', '#118AB2'],
-                labels={'Preço': 'Preço (R$)', 'Área (m²)': 'Área (m²)'},
-                hover_data=[COL_BAIRRO, 'Quartos']
-            )
-            fig_scatter.update_layout(**chart_layout,
-                legend=dict(orientation='h', yanchor='bottom', y=-0.2, xanchor='center', x=0.5))
-            fig_scatter.update_xaxes(gridcolor=GRID_COLOR)
-            fig_scatter.update_yaxes(gridcolor=GRID_COLOR, tickformat=',.0f')
-            st.plotly_chart(fig_scatter, width="stretch")
+            with perf.stage("fig_preco_area", rows=len(filtered)):
+                scatter_df = filtered[(filtered['Preço'] > 0) & (filtered['Área (m²)'] > 0)]
+                trendline_mode = "ols" if HAS_STATSMODELS else None
+                fig_scatter = px.scatter(
+                    scatter_df, x='Área (m²)', y='Preço', color='Tipo',
+                    size='Preço/m²', size_max=15, opacity=0.7, trendline=trendline_mode,
+                    color_discrete_sequence=['#FF6B35', '#FF9F1C', '#FFD166', '#06D6A0', '#118AB2'],
+                    labels={'Preço': 'Preço (R$)', 'Área (m²)': 'Área (m²)'},
+                    hover_data=[COL_BAIRRO, 'Quartos']
+                )
+                fig_scatter.update_layout(**chart_layout,
+                    legend=dict(orientation='h', yanchor='bottom', y=-0.2, xanchor='center', x=0.5))
+                fig_scatter.update_xaxes(gridcolor=GRID_COLOR)
+                fig_scatter.update_yaxes(gridcolor=GRID_COLOR, tickformat=',.0f')
+                st.plotly_chart(fig_scatter, width="stretch")
     
     # ============================================================
     # EVOLUÇÃO TEMPORAL E COMPARAÇÃO
@@ -315,54 +494,99 @@ with tab1:
     col_hist, col_comp = st.columns([1.2, 0.8])
     
     with col_hist:
-        st.markdown("#### 🕒 Evolução de Preço Médio (Total)")
-        # Process temporal data
-        df_temporal = df_raw.copy()
-        df_temporal['Data'] = pd.to_datetime(df_temporal['Data e Hora da Extração']).dt.date
-        hist_data = df_temporal.groupby('Data')['Preço'].mean().reset_index()
-        
-        if len(hist_data) > 1:
-            fig_line = px.line(
-                hist_data, x='Data', y='Preço',
-                color_discrete_sequence=['#FF6B35'],
-                markers=True,
-                labels={'Preço': 'Preço Médio (R$)', 'Data': ''}
-            )
-            fig_line.update_layout(**get_chart_layout(), showlegend=False)
-            fig_line.update_xaxes(gridcolor=GRID_COLOR)
-            fig_line.update_yaxes(gridcolor=GRID_COLOR, tickformat=',.0f')
-            st.plotly_chart(fig_line, use_container_width=True)
-        else:
-            st.info("ℹ️ Dados históricos insuficientes para gerar o gráfico de evolução.")
+        st.markdown("#### 🕒 Evolução de Preço")
+        col_serie, col_freq = st.columns([1.4, 0.6])
+        with col_serie:
+            serie = st.selectbox("Série", ["R$/m² por bairro", "Vendas repetidas", "Preço médio (total)"], key="ts_serie")
+        with col_freq:
+            freq = st.selectbox("Período", list(FREQS), index=1, format_func=FREQS.get, key="ts_freq",
+                                disabled=serie == "Preço médio (total)")
+
+        with perf.stage("fig_temporal", rows=len(df_raw)):
+            if serie == "R$/m² por bairro":
+                indice = get_pm2_index(df_raw, COL_BAIRRO, freq, data_version)
+                indice = indice[indice[COL_BAIRRO].isin(sel_bairros)]
+                # Bairros com mais anúncios na seleção, para o gráfico não virar ruído
+                top = indice.groupby(COL_BAIRRO)['Anúncios'].sum().nlargest(6).index
+                hist_data = rolling_median(indice[indice[COL_BAIRRO].isin(top)], window=4, col_bairro=COL_BAIRRO)
+                x, y, color = 'Período', 'Mediana Móvel', COL_BAIRRO
+                labels = {'Mediana Móvel': 'R$/m² (mediana móvel)', 'Período': '', COL_BAIRRO: ''}
+            elif serie == "Vendas repetidas":
+                hist_data = get_repeat_sales(df_raw, COL_BAIRRO, freq, tuple(sorted(sel_bairros)),
+                                             tuple(sorted(sel_tipos)), data_version)
+                x, y, color = 'Período', 'Índice', None
+                labels = {'Índice': 'Índice (base 100)', 'Período': ''}
+            else:
+                hist_data = dataset.daily_mean_price()
+                x, y, color = 'Data', 'Preço', None
+                labels = {'Preço': 'Preço Médio (R$)', 'Data': ''}
+
+            if hist_data[x].nunique() > 1:
+                fig_line = px.line(
+                    hist_data, x=x, y=y, color=color,
+                    color_discrete_sequence=['#FF6B35', '#FF9F1C', '#FFD166', '#06D6A0', '#4ECDC4', '#118AB2'],
+                    markers=True,
+                    labels=labels,
+                )
+                fig_line.update_layout(**get_chart_layout(), showlegend=color is not None)
+                fig_line.update_xaxes(gridcolor=GRID_COLOR)
+                fig_line.update_yaxes(gridcolor=GRID_COLOR, tickformat=',.0f')
+                st.plotly_chart(fig_line, use_container_width=True)
+            else:
+                st.info("ℹ️ Dados históricos insuficientes para gerar o gráfico de evolução.")
 
     with col_comp:
         st.markdown("#### ⚖️ Comparar Bairros")
+        distribuicoes = get_bairro_distributions(df_latest, COL_BAIRRO, data_version)
         target_bairros = st.multiselect(
             "Selecione para comparar:",
             options=sorted(df[COL_BAIRRO].dropna().unique()),
             default=sorted(filtered[COL_BAIRRO].dropna().unique())[:2] if not filtered.empty else [],
-            max_selections=4,
+            max_selections=COMPARE_MAX,
             key="comp_bairros"
         )
+        formato = st.radio("Distribuição", ["Box", "Violino"], horizontal=True, key="comp_formato", label_visibility="collapsed")
         
         if target_bairros:
-            comp_df = df_latest[df_latest[COL_BAIRRO].isin(target_bairros)]
-            comp_stats = comp_df.groupby(COL_BAIRRO).agg({
-                'Preço': 'mean',
-                'Preço/m²': 'mean',
-                'Área (m²)': 'mean'
-            }).reset_index()
-            
-            # Show a small comparison table or bar chart
-            fig_comp = px.bar(
-                comp_stats, x=COL_BAIRRO, y='Preço/m²',
-                color=COL_BAIRRO,
-                color_discrete_sequence=['#FF6B35', '#FF9F1C', '#FFD166', '#06D6A0'],
-                labels={'Preço/m²': 'R$/m²', COL_BAIRRO: ''}
-            )
-            fig_comp.update_layout(**get_chart_layout(), showlegend=False)
-            fig_comp.update_yaxes(gridcolor=GRID_COLOR)
-            st.plotly_chart(fig_comp, use_container_width=True)
+            with perf.stage("fig_comparacao"):
+                # Só tabelas pré-calculadas: nenhuma linha é lida aqui
+                cores = ['#FF6B35', '#FF9F1C', '#FFD166', '#06D6A0', '#4ECDC4', '#118AB2']
+                box = distribuicoes.box_stats(target_bairros)
+                fig_comp = go.Figure()
+                if formato == "Box":
+                    for i, (bairro, row) in enumerate(box.iterrows()):
+                        fig_comp.add_trace(go.Box(
+                            name=str(bairro), q1=[row['P25']], median=[row['Mediana']], q3=[row['P75']],
+                            lowerfence=[row['Cerca Inf']], upperfence=[row['Cerca Sup']], mean=[row['Média']],
+                            marker_color=cores[i % len(cores)],
+                        ))
+                else:
+                    dens = distribuicoes.density(box.index)
+                    for i, bairro in enumerate(box.index):
+                        d = dens[dens[COL_BAIRRO] == bairro]
+                        largura = d['Fração'] / max(d['Fração'].max(), 1e-9) * 0.45
+                        fig_comp.add_trace(go.Scatter(
+                            x=np.concatenate([i - largura, (i + largura)[::-1]]),
+                            y=np.concatenate([d['Preço/m²'], d['Preço/m²'][::-1]]),
+                            fill='toself', mode='lines', name=str(bairro),
+                            line=dict(color=cores[i % len(cores)], width=1),
+                        ))
+                    fig_comp.update_xaxes(tickvals=list(range(len(box))), ticktext=[str(b) for b in box.index])
+                fig_comp.update_layout(**get_chart_layout(), showlegend=False)
+                fig_comp.update_yaxes(gridcolor=GRID_COLOR, title='R$/m²', tickformat=',.0f')
+                st.plotly_chart(fig_comp, use_container_width=True)
+
+                tendencia = get_pm2_index(df_raw, COL_BAIRRO, freq, data_version)
+                tendencia = tendencia[tendencia[COL_BAIRRO].isin(target_bairros)]
+                if tendencia['Período'].nunique() > 1:
+                    fig_tend = px.line(
+                        tendencia, x='Período', y='Preço/m²', color=COL_BAIRRO, markers=True,
+                        color_discrete_sequence=cores,
+                        labels={'Preço/m²': f'R$/m² mediano ({FREQS[freq].lower()})', 'Período': '', COL_BAIRRO: ''},
+                    )
+                    fig_tend.update_layout(**get_chart_layout())
+                    fig_tend.update_yaxes(gridcolor=GRID_COLOR, tickformat=',.0f')
+                    st.plotly_chart(fig_tend, use_container_width=True)
         else:
             st.write("Selecione bairros para visualizar a comparação de R$/m².")
     
@@ -388,38 +612,44 @@ with tab1:
     with search_col4:
         search_endereco = st.text_input("📮 Endereço", placeholder="Ex: Rua...", key="search_endereco", help="Busca parcial em Endereço")
     
-    # Apply filters based on search inputs
-    if search_id:
-        filtered = filtered[filtered['ID Imóvel'].astype(str).str.contains(search_id, case=False, na=False)]
+    with perf.stage("busca_texto", rows=len(filtered)):
+        # Apply filters based on search inputs
+        if search_id:
+            filtered = filtered[filtered['ID Imóvel'].astype(str).str.contains(search_id, case=False, na=False)]
     
-    if search_bairro:
-        filtered = filtered[filtered[COL_BAIRRO].astype(str).str.contains(search_bairro, case=False, na=False)]
+        if search_bairro:
+            filtered = filtered[filtered[COL_BAIRRO].astype(str).str.contains(search_bairro, case=False, na=False)]
     
-    if search_tipo:
-        filtered = filtered[filtered['Tipo'].astype(str).str.contains(search_tipo, case=False, na=False)]
+        if search_tipo:
+            filtered = filtered[filtered['Tipo'].astype(str).str.contains(search_tipo, case=False, na=False)]
     
-    if search_endereco:
-        filtered = filtered[filtered['Endereço'].astype(str).str.contains(search_endereco, case=False, na=False)]
+        if search_endereco:
+            filtered = filtered[filtered['Endereço'].astype(str).str.contains(search_endereco, case=False, na=False)]
     
-    # Calcular IBairro (Índice de Preço do Bairro)
-    bairro_avg_pm2 = df_raw.groupby(COL_BAIRRO)['Preço/m²'].mean()
-    filtered['IBairro'] = filtered.apply(
-        lambda row: row['Preço/m²'] / bairro_avg_pm2.get(row[COL_BAIRRO], 1) if bairro_avg_pm2.get(row[COL_BAIRRO], 0) > 0 else 0,
-        axis=1
-    )
+    # IBairro, Preço/Quarto, Condomínio/m² etc. já vêm calculados na ingestão (analytics.derived)
+    with perf.stage("preco_justo", rows=len(filtered)):
+        # Modelo hedônico: um produto matriz × vetor sobre as linhas filtradas
+        filtered = get_hedonic_model(df_latest, COL_BAIRRO, data_version).score(filtered)
+        if st.toggle("💎 Subvalorizados primeiro", value=False, key="sort_residuo",
+                     help="Ordena pelo resíduo do modelo hedônico (preço anunciado vs. preço justo)"):
+            filtered = filtered.sort_values('Resíduo (%)', kind='stable')
     
     display_cols = [
-        'ID Imóvel', COL_BAIRRO, 'Tipo', 'Título/Descrição', 'Preço', 'Condomínio',
-        'Área (m²)', 'Preço/m²', 'IBairro', 'Quartos', 'Endereço', 'Link', 'Data e Hora da Extração'
+        'ID Imóvel', COL_BAIRRO, 'Tipo', 'Título/Descrição', 'Preço', 'Preço justo', 'Resíduo (%)', 'Condomínio',
+        'Área (m²)', 'Preço/m²', 'IBairro', 'Quartos', 'Preço/Quarto', 'Condomínio/m²', 'Faixa de Área',
+        'Endereço', 'Link', 'Data e Hora da Extração'
     ]
     display_df = filtered[[c for c in display_cols if c in filtered.columns]].copy()
     
     # Renomear colunas para exibição final (garante cabeçalho correto)
     display_df = display_df.rename(columns={
         'Preço': 'Preço (R$)',
+        'Preço justo': 'Preço justo (R$)',
         'Condomínio': 'Condomínio (R$)',
         'Área (m²)': 'Área (m²)',
         'Preço/m²': 'Preço/m² (R$)',
+        'Preço/Quarto': 'Preço/Quarto (R$)',
+        'Condomínio/m²': 'Condomínio/m² (R$)',
         'IBairro': 'IBairro',
         'Quartos': 'Quartos',
         'Data e Hora da Extração': 'Captura'
@@ -436,83 +666,234 @@ with tab1:
         "Preço/m² (R$)": st.column_config.NumberColumn("R$/m²"),
         "Área (m²)": st.column_config.NumberColumn("Área"),
         "IBairro": st.column_config.NumberColumn("IBairro"),
+        "Preço/Quarto (R$)": st.column_config.NumberColumn("R$/quarto"),
+        "Condomínio/m² (R$)": st.column_config.NumberColumn("Condo/m²"),
+        "Faixa de Área": st.column_config.TextColumn("Faixa"),
+        "Preço justo (R$)": st.column_config.NumberColumn("Preço justo", help="Estimativa do modelo hedônico"),
+        "Resíduo (%)": st.column_config.NumberColumn("Resíduo", help="Preço anunciado vs. preço justo"),
     }
 
-    def highlight_ibairro(val):
-        if pd.isna(val) or val == 0: return ''
-        return 'background-color: rgba(6, 214, 160, 0.3); color: #06D6A0' if val < 1 else 'background-color: rgba(255, 107, 53, 0.3); color: #FF6B35'
-
-    # FORMATAÇÃO: Streamlit dataframe preserva ordenação numérica se o DF original for numérico
-    styler = display_df.style.format({
-        "Preço (R$)": fmt_br_currency,
-        "Condomínio (R$)": fmt_br_currency,
-        "Preço/m² (R$)": fmt_br_pm2,
-        "Área (m²)": fmt_br_area,
-        "IBairro": "{:.2f}"
-    }).map(highlight_ibairro, subset=['IBairro'])
+    with perf.stage("styler_listagem", rows=len(display_df)):
+        # FORMATAÇÃO: Streamlit dataframe preserva ordenação numérica se o DF original for numérico
+        styler = style_listing_table(display_df)
     
-    st.dataframe(styler, width="stretch", height=500, column_config=column_config, hide_index=True)
+        selecao = st.dataframe(styler, width="stretch", height=500, column_config=column_config, hide_index=True,
+                               on_select="rerun", selection_mode="single-row", key="listagem")
     
     unique_count = filtered['ID Imóvel'].nunique() if not filtered.empty else 0
     st.caption(f"Exibindo {len(filtered)} registros ({unique_count} imóveis únicos) | Última atualização: {df_raw['Data e Hora da Extração'].max()}")
 
+    # Download da seleção: gerado em blocos a partir da visão em Arrow, só quando clicado
+    export_col1, export_col2 = st.columns([1, 4])
+    with export_col1:
+        formato = st.selectbox("Formato", list(EXPORT_FORMATS), key="export_formato", label_visibility="collapsed")
+    with export_col2:
+        export_table = get_export_table(dataset.view(show_all), show_all, data_version)
+        export_positions = positions_of(dataset.view(show_all), filtered)
+        st.download_button(
+            f"⬇️ Baixar seleção ({len(filtered)} registros)",
+            data=lambda: export_bytes(export_table, export_positions, formato),
+            file_name=f"imoveis-{data_version[-8:]}.{EXPORT_FORMATS[formato][1]}",
+            mime=EXPORT_FORMATS[formato][0],
+            disabled=filtered.empty,
+        )
+
+    # ============================================================
+    # IMÓVEIS SIMILARES (k-NN)
+    # ============================================================
+    st.markdown("#### 🔎 Imóveis Similares")
+    linhas = selecao.selection.rows if selecao is not None else []
+    if not linhas:
+        st.caption("Selecione um imóvel na listagem para ver os mais parecidos (área, quartos, R$/m² e localização do bairro).")
+    else:
+        imovel = display_df.iloc[linhas[0]]
+        k_similares = st.slider("Quantidade", min_value=5, max_value=30, value=10, key="k_similares")
+        with perf.stage("similares") as stage:
+            similares = get_similar_index(df_latest, COL_BAIRRO, data_version, dataset.geo_version, dataset.bairro_coordinates).query(imovel['ID Imóvel'], k=k_similares)
+            stage.rows = len(similares)
+        if similares.empty:
+            st.info("ℹ️ Imóvel sem área ou preço válidos para comparação.")
+        else:
+            st.caption(f"Mais parecidos com {imovel['ID Imóvel']} ({imovel[COL_BAIRRO]}, {format_brl(imovel['Preço (R$)'])})")
+            st.dataframe(
+                similares.rename(columns={'Preço': 'Preço (R$)', 'Preço/m²': 'Preço/m² (R$)'}).style.format(LISTING_TABLE_FORMATS | {'Distância': '{:.2f}'}),
+                width="stretch",
+                hide_index=True,
+                column_config={
+                    "Link": st.column_config.LinkColumn("🔗 Link", display_text="Abrir"),
+                    "Distância": st.column_config.NumberColumn("Distância", help="Distância no espaço padronizado (menor = mais parecido)"),
+                },
+            )
+
 
 # ============ ABA 2: MAPA DE CALOR ============
 with tab2:
     st.markdown("#### 🗺️ Mapa de Calor - Preços Médios por Bairro")
     
     # Criar mapa com todos os dados (sem filtros de preço/área, apenas bairro e tipo)
-    mapa_filtered = df[
-        (df[COL_BAIRRO].isin(sel_bairros)) &
-        (df['Tipo'].isin(sel_tipos)) &
-        (df['Quartos'].isin(sel_quartos))
-    ].copy()
+    mapa_filtered = result.map_rows
     
     if not mapa_filtered.empty:
-        fig_mapa = criar_mapa_calor(mapa_filtered)
+        with perf.stage("mapa_calor", rows=len(mapa_filtered)):
+            fig_mapa = criar_mapa_calor(mapa_filtered, agg=result.map_aggregates, coordinates=dataset.bairro_coordinates)
+            if fig_mapa:
+                st.plotly_chart(fig_mapa, use_container_width=True)
+        # Bairros sem coordenada ficam fora das bolhas: mostrar quantos, em vez de sumirem em silêncio
+        fora_do_mapa = mapa_filtered[~mapa_filtered[COL_BAIRRO].isin(list(dataset.bairro_coordinates))]
+        if not fora_do_mapa.empty:
+            st.caption(f"📍 {len(fora_do_mapa)} de {len(mapa_filtered)} anúncios ({fora_do_mapa[COL_BAIRRO].nunique()} bairros) "
+                       "sem coordenada não aparecem no mapa.")
+        with st.expander("Cobertura do mapa"):
+            st.dataframe(dataset.map_coverage(show_all)[['Descrição', 'Bairros', 'Anúncios', '%']],
+                         hide_index=True, width="stretch")
+            sem_coordenada = dataset.unmapped_bairros(show_all)
+            if not sem_coordenada.empty:
+                st.caption("Bairros sem coordenada (adicione-os ao gazetteer offline, `base/gazetteer_bairros.csv`):")
+                st.dataframe(sem_coordenada, hide_index=True, width="stretch", height=240)
         if fig_mapa:
-            st.plotly_chart(fig_mapa, use_container_width=True)
-            
             # --- Tabela de Bairros (Ordenação Numérica) ---
             st.markdown("---")
             st.markdown("#### 📊 Estatísticas por Bairro")
-            tabela_bairros = criar_tabela_bairros(mapa_filtered)
-            if tabela_bairros is not None:
-                st.dataframe(
-                    tabela_bairros.style.format({
-                        "Preço Min": fmt_br_currency,
-                        "Preço Max": fmt_br_currency,
-                        "Preço Médio": fmt_br_currency,
-                        "Preço/m² Médio": fmt_br_pm2,
-                        "Área Média": fmt_br_area,
-                    }),
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Imóveis": st.column_config.NumberColumn("🏠 Imóveis"),
-                        "Preço Médio": st.column_config.NumberColumn("Preço Médio"),
-                    }
-                )
+            with perf.stage("tabela_bairros", rows=len(mapa_filtered)):
+                tabela_bairros = result.bairro_stats
+                if not tabela_bairros.empty:
+                    st.dataframe(
+                        tabela_bairros.style.format(BAIRRO_TABLE_FORMATS),
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            "Imóveis": st.column_config.NumberColumn("🏠 Imóveis"),
+                            "Preço Médio": st.column_config.NumberColumn("Preço Médio"),
+                        }
+                    )
             
             # --- Tabela de Ruas (NOVO) ---
             st.markdown("---")
             st.markdown("#### 🛣️ Top Ruas com mais imóveis (nesta seleção)")
-            tabela_ruas = criar_tabela_ruas(mapa_filtered)
-            if tabela_ruas is not None:
-                st.dataframe(
-                    tabela_ruas.style.format({
-                        "Preço Médio": fmt_br_currency,
-                        "Preço/m² Médio": fmt_br_pm2,
-                        "Área Média": fmt_br_area,
-                    }),
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Imóveis": st.column_config.NumberColumn("🏠 Imóveis"),
-                    }
-                )
-            else:
-                st.info("ℹ️ Dados de endereço insuficientes para análise por rua.")
+            with perf.stage("tabela_ruas", rows=len(mapa_filtered)):
+                tabela_ruas = result.rua_stats
+                if not tabela_ruas.empty:
+                    st.dataframe(
+                        tabela_ruas.style.format(RUA_TABLE_FORMATS),
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            "Imóveis": st.column_config.NumberColumn("🏠 Imóveis"),
+                        }
+                    )
+                else:
+                    st.info("ℹ️ Dados de endereço insuficientes para análise por rua.")
     else:
         st.warning("❌ Nenhum dado disponível com os filtros selecionados")
 
+# ============ ABA 3: QUEDAS RECENTES ============
+with tab3:
+    st.markdown("#### 📉 Reduções de preço recentes")
+    with perf.stage("price_events", rows=len(df_raw)) as stage:
+        events = get_price_events(df_raw, COL_BAIRRO, data_version)
+        stage.rows = len(events)
+
+    col_periodo, col_min = st.columns(2)
+    with col_periodo:
+        periodo = st.selectbox("Período", ["7 dias", "30 dias", "90 dias", "Todo o histórico"], index=1, key="drops_periodo")
+    with col_min:
+        min_pct = st.number_input("Queda mínima (%)", min_value=0.0, max_value=90.0, value=0.0, step=0.5, key="drops_min_pct")
+
+    with perf.stage("quedas_recentes", rows=len(events)) as stage:
+        dias = None if periodo == "Todo o histórico" else int(periodo.split()[0])
+        quedas = recent_drops(events, days=dias, bairros=sel_bairros, tipos=sel_tipos, cidades=sel_cidades, min_pct=min_pct)
+        stage.rows = len(quedas)
+
+    if quedas.empty:
+        st.info("ℹ️ Nenhuma redução de preço no período com os filtros selecionados.")
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            render_kpi_card("Quedas", f"{len(quedas):,}", f"{quedas['ID Imóvel'].nunique():,} imóveis")
+        with col2:
+            render_kpi_card("Queda Mediana", f"{quedas['Variação (%)'].median():.1f}%", format_brl(-quedas['Variação (R$)'].median()))
+        with col3:
+            maior = quedas.iloc[0]
+            render_kpi_card("Maior Queda", f"{maior['Variação (%)']:.1f}%", str(maior[COL_BAIRRO]))
+        with col4:
+            render_kpi_card("Total Reduzido", format_brl(-quedas['Variação (R$)'].sum()), "soma das quedas")
+
+        st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
+        por_bairro = drops_by_bairro(quedas, COL_BAIRRO).head(15)
+        fig_quedas = px.bar(
+            por_bairro.sort_values('Quedas'), x='Quedas', y=COL_BAIRRO, orientation='h',
+            color='Queda Mediana (%)', color_continuous_scale=['#FFD166', '#FF9F1C', '#FF6B35'],
+            labels={COL_BAIRRO: ''}
+        )
+        fig_quedas.update_layout(**get_chart_layout())
+        st.plotly_chart(fig_quedas, width="stretch")
+
+        tabela_quedas = quedas[[c for c in ['Data', COL_BAIRRO, 'Tipo', 'Preço Anterior', 'Preço', 'Variação (R$)', 'Variação (%)', 'Dias', 'Link'] if c in quedas.columns]]
+        st.dataframe(
+            tabela_quedas.head(500).style.format(DROPS_TABLE_FORMATS),
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "Data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
+                "Dias": st.column_config.NumberColumn("Dias desde a captura anterior"),
+                "Link": st.column_config.LinkColumn("Link", display_text="Abrir"),
+            }
+        )
+
+with tab4:
+    st.markdown("#### ⏳ Tempo de mercado e anúncios removidos")
+    with perf.stage("lifecycle", rows=len(df_raw)) as stage:
+        lifecycle_path = os.path.join(CHANGE_STATE_DIR, LIFECYCLE_FILE)
+        if os.path.exists(lifecycle_path):
+            ciclo = load_lifecycle(CHANGE_STATE_DIR, os.path.getmtime(lifecycle_path))
+        else:
+            ciclo = build_lifecycle(df_raw, COL_BAIRRO, COL_CIDADE, data_version)
+        ciclo = ciclo[ciclo['Bairro'].isin(sel_bairros) & ciclo['Tipo'].isin(sel_tipos)]
+        if sel_cidades:
+            ciclo = ciclo[ciclo['Cidade'].isin(sel_cidades)]
+        stage.rows = len(ciclo)
+
+    if ciclo.empty:
+        st.info("ℹ️ Nenhum anúncio com os filtros selecionados.")
+    else:
+        kpis = lifecycle_kpis(ciclo)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            render_kpi_card("Ativos", f"{kpis['ativos']:,}", "vistos na última coleta do bairro")
+        with col2:
+            render_kpi_card("Removidos", f"{kpis['removidos']:,}", f"{kpis['removidos'] / len(ciclo):.0%} dos anúncios")
+        with col3:
+            render_kpi_card("Novos (7 dias)", f"{kpis['novos']:,}", "primeira captura")
+        with col4:
+            dias = kpis['dias_mediana_removidos']
+            render_kpi_card("Dias até Remoção", f"{dias:.0f}" if dias is not None else "—", "mediana dos removidos")
+
+        st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
+        por_bairro = days_on_market_by_bairro(ciclo)
+        top_bairros = por_bairro.nlargest(20, 'Anúncios')[['Bairro']]
+        dist = ciclo.merge(top_bairros, on='Bairro')
+        fig_dias = px.box(
+            dist, x='dias_no_mercado', y='Bairro', color='status', orientation='h',
+            color_discrete_map={'ativo': '#4ECDC4', REMOVIDO: '#FF6B35'},
+            labels={'dias_no_mercado': 'Dias no mercado', 'Bairro': '', 'status': 'Status'},
+        )
+        fig_dias.update_layout(**get_chart_layout())
+        st.plotly_chart(fig_dias, width="stretch")
+
+        st.dataframe(
+            por_bairro.style.format({'P25': '{:.0f}', 'Mediana': '{:.0f}', 'P75': '{:.0f}'}),
+            width="stretch",
+            hide_index=True,
+        )
+
+# ============================================================
+# PERFORMANCE (opt-in)
+# ============================================================
+if perf.enabled:
+    perf.log()
+    with st.sidebar:
+        render_perf_panel(perf.summary())
+        cache_stats = get_data_client(DATA_SERVER).status()["cache"] if DATA_SERVER else get_result_cache().stats()
+        st.caption(f"Cache de consultas: {cache_stats['entradas']} entradas, {cache_stats['bytes'] / 1e6:.1f} MB, "
+                   f"{cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%}), "
+                   f"{cache_stats['evictions']} removidas")
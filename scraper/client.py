@@ -0,0 +1,113 @@
+"""Cliente HTTP assíncrono: pool de conexões, concorrência limitada,
+rate limit por host e retry com backoff exponencial.
+
+Requer ``aiohttp`` (``pip install aiohttp``); sem ele ``HAS_AIOHTTP`` é False.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except Exception:
+    HAS_AIOHTTP = False
+
+from scraper.ratelimit import HostRateLimiter
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept-Language": "pt-BR,pt;q=0.9",
+}
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int = 0
+    text: str = ""
+    attempts: int = 0
+    elapsed: float = 0.0
+    error: str = ""
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300 and not self.error
+
+
+class ScraperClient:
+    """Uso::
+
+        async with ScraperClient(concurrency=16, rate=8) as client:
+            results = await client.fetch_many(urls)
+    """
+
+    def __init__(self, concurrency=8, rate=4.0, burst=None, retries=4, backoff=0.5,
+                 max_backoff=30.0, timeout=30.0, headers=None):
+        if not HAS_AIOHTTP:
+            raise RuntimeError("aiohttp não está instalado (pip install aiohttp)")
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.limiter = HostRateLimiter(rate, burst)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        base = min(self.max_backoff, self.backoff * (2 ** (attempt - 1)))
+        return base * (0.5 + random.random() / 2)
+
+    async def fetch(self, url) -> FetchResult:
+        """GET com retry em erros de rede e status 429/5xx. Nunca levanta exceção."""
+        result = FetchResult(url)
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        for attempt in range(1, self.retries + 2):
+            result.attempts = attempt
+            retry_after = None
+            # O slot de concorrência só é ocupado durante a requisição, não no backoff
+            async with self._semaphore:
+                await self.limiter.acquire(host)
+                try:
+                    async with self._session.get(url) as resp:
+                        result.status = resp.status
+                        result.error = ""
+                        if resp.status not in RETRY_STATUS:
+                            result.text = await resp.text()
+                            break
+                        retry_after = resp.headers.get("Retry-After")
+                        result.error = f"HTTP {resp.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result.error = f"{type(e).__name__}: {e}"
+            if attempt <= self.retries:
+                await asyncio.sleep(self._delay(attempt, retry_after))
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def fetch_many(self, urls):
+        """Busca todas as ``urls`` concorrentemente (ordem preservada)."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
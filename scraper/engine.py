@@ -0,0 +1,165 @@
+"""Coleta concorrente de todos os bairros de uma cidade.
+
+Cada bairro é paginado em sequência (até uma página vazia ou ``max_pages``);
+bairros diferentes rodam em paralelo, limitados por ``concurrency`` e pelo
+token bucket do host.
+
+    python -m scraper.engine --cidade "São Paulo" --concurrency 16 --rate 8
+    python -m scraper.engine --bairros "Pari,Bras" --base-url http://127.0.0.1:8080
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+from analytics.changes import ChangeTracker, state_dir
+from analytics.ingest import coerce_types
+from analytics.store import ListingStore, StoreReader
+from analytics.schema import COLUMNS
+from bairro_coordinates import BAIRRO_COORDINATES
+from scraper.client import ScraperClient
+from scraper.parse import parse_listings
+from scraper.urls import BASE_URL, search_url
+
+logger = logging.getLogger("quintoandar.scraper")
+
+
+@dataclass
+class CrawlStats:
+    bairros: int = 0
+    pages: int = 0
+    requests: int = 0
+    failures: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+
+async def crawl_bairro(client, cidade, bairro, stats, max_pages=20, base_url=BASE_URL, extracted_at=""):
+    """Pagina a busca de um bairro e retorna as linhas (sem IDs repetidos)."""
+    rows, seen = [], set()
+    for page in range(1, max_pages + 1):
+        result = await client.fetch(search_url(cidade, bairro, page=page, base_url=base_url))
+        stats.requests += result.attempts
+        if not result.ok:
+            stats.failures.append((bairro, page, result.error or f"HTTP {result.status}"))
+            logger.warning("%s p.%d falhou: %s", bairro, page, result.error or result.status)
+            break
+        stats.pages += 1
+        new = [r for r in parse_listings(result.text, cidade, bairro, extracted_at) if r['ID Imóvel'] not in seen]
+        if not new:
+            break
+        seen.update(r['ID Imóvel'] for r in new)
+        rows.extend(new)
+    return rows
+
+
+async def crawl(cidade, bairros, concurrency=8, rate=4.0, max_pages=20, base_url=BASE_URL, sink=None, **client_kwargs):
+    """Coleta ``bairros`` de ``cidade``; retorna (DataFrame bruto, ``CrawlStats``).
+
+    Com ``sink`` (ex.: ``PartitionSink``), cada bairro concluído é gravado assim
+    que termina, sem esperar o fim da varredura.
+    """
+    stats = CrawlStats(bairros=len(bairros))
+    extracted_at = datetime.now().strftime("%Y-%m-%d %H:%M")
+    start = time.perf_counter()
+
+    async def run(client, bairro):
+        rows = await crawl_bairro(client, cidade, bairro, stats, max_pages, base_url, extracted_at)
+        if sink is not None and rows:
+            await asyncio.to_thread(sink.write, rows)
+        return rows
+
+    async with ScraperClient(concurrency=concurrency, rate=rate, **client_kwargs) as client:
+        per_bairro = await asyncio.gather(*(run(client, b) for b in bairros))
+    stats.elapsed = time.perf_counter() - start
+    rows = [row for bairro_rows in per_bairro for row in bairro_rows]
+    df = pd.DataFrame(rows, columns=COLUMNS).drop_duplicates(subset=['ID Imóvel'], keep='first')
+    return df.reset_index(drop=True), stats
+
+
+class PartitionSink:
+    """Grava cada lote como segmento do WAL (``analytics.store``); ``close()`` compacta.
+
+    Um crash no meio da varredura preserva os bairros já gravados. Com
+    ``changes_only`` só vão para o WAL os imóveis novos ou alterados.
+    """
+
+    def __init__(self, root, changes_only=False):
+        self.store = ListingStore(root)
+        self.tracker = None
+        self.written = self.skipped = 0
+        self._lock = threading.Lock()
+        if changes_only:
+            self.tracker = ChangeTracker.load(state_dir(root))
+            if not self.tracker.runs:
+                # Primeira coleta diferencial: estado reconstruído do histórico existente
+                self.tracker = ChangeTracker.from_history(StoreReader(root).refresh())
+
+    def write(self, rows):
+        batch = coerce_types(pd.DataFrame(rows, columns=COLUMNS))
+        with self._lock:
+            changed = batch
+            if self.tracker is not None:
+                changed = self.tracker.diff(batch)
+                self.skipped += len(batch) - len(changed)
+            self.store.append(changed, sightings=batch)
+            self.written += len(changed)
+
+    def close(self):
+        with self._lock:
+            if self.tracker is not None:
+                self.tracker.save(state_dir(self.store.root))
+            return self.store.compact()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coleta assíncrona de anúncios de venda do QuintoAndar")
+    parser.add_argument("--cidade", default="São Paulo")
+    parser.add_argument("--bairros", default="", help="lista separada por vírgula (padrão: BAIRRO_COORDINATES)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=4.0, help="requisições/s por host")
+    parser.add_argument("--max-pages", type=int, default=20)
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--base-url", default=BASE_URL, help="útil para apontar para um servidor local")
+    parser.add_argument("--output", default="", help="grava as linhas em .xlsx/.csv/.parquet")
+    parser.add_argument("--partitions", default="", help="grava cada bairro no WAL da base particionada (analytics.store)")
+    parser.add_argument("--changes-only", action="store_true",
+                        help="com --partitions, grava só imóveis novos ou com Preço/Condomínio/Área/Título alterados")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    bairros = [b.strip() for b in args.bairros.split(",") if b.strip()] or list(BAIRRO_COORDINATES)
+    sink = PartitionSink(args.partitions, changes_only=args.changes_only) if args.partitions else None
+    df, stats = asyncio.run(crawl(
+        args.cidade, bairros, concurrency=args.concurrency, rate=args.rate,
+        max_pages=args.max_pages, base_url=args.base_url, sink=sink, retries=args.retries,
+    ))
+    print(f"{len(df)} imóveis de {stats.bairros} bairros: {stats.pages} páginas, "
+          f"{stats.requests} requisições, {len(stats.failures)} falhas em {stats.elapsed:.1f}s "
+          f"({stats.pages_per_sec:.1f} páginas/s)")
+
+    if args.output:
+        if args.output.endswith(".csv"):
+            df.to_csv(args.output, index=False)
+        elif args.output.endswith(".parquet"):
+            df.to_parquet(args.output, index=False)
+        else:
+            df.to_excel(args.output, index=False)
+    if sink is not None:
+        manifest = sink.close()
+        print(f"{sink.written} linhas gravadas ({sink.skipped} sem mudança), manifesto v{manifest['version']}")
+    return 1 if stats.failures and df.empty else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Extração dos cards de imóveis das páginas de busca.
+
+As páginas do QuintoAndar embutem o estado da busca em
+``<script id="__NEXT_DATA__" type="application/json">``. Percorremos esse JSON
+procurando objetos com cara de anúncio (``id`` + preço de venda) e mapeamos
+os campos para as colunas da planilha (``analytics.schema.COLUMNS``).
+Quando o site renomear um campo, basta ajustar ``FIELD_ALIASES``.
+"""
+
+import json
+import re
+
+from analytics.schema import COLUMNS
+from scraper.urls import BASE_URL
+
+_NEXT_DATA_RE = re.compile(
+    r'<script[^>]*id="__NEXT_DATA__"[^>]*>(?P<payload>.*?)</script>', re.DOTALL
+)
+
+# Coluna da planilha -> chaves aceitas no JSON (a primeira presente vence)
+FIELD_ALIASES = {
+    'ID Imóvel': ("id", "houseId"),
+    'Bairro': ("neighbourhood", "neighborhood", "regionName"),
+    'Tipo': ("type", "houseType"),
+    'Título/Descrição': ("shortDescription", "title", "description"),
+    'Preço': ("salePrice", "price"),
+    'Condomínio': ("condoFee", "condominium", "iptuPlusCondominium"),
+    'Área (m²)': ("area", "usableArea"),
+    'Quartos': ("bedrooms", "bedroomCount"),
+    'Endereço': ("address", "street"),
+}
+PRICE_KEYS = ("salePrice", "price")
+
+
+def next_data(html):
+    """JSON do ``__NEXT_DATA__`` da página (None se ausente ou inválido)."""
+    match = _NEXT_DATA_RE.search(html or "")
+    if not match:
+        return None
+    try:
+        return json.loads(match.group("payload"))
+    except ValueError:
+        return None
+
+
+def _iter_listing_objects(node):
+    if isinstance(node, dict):
+        if any(k in node for k in FIELD_ALIASES['ID Imóvel']) and any(k in node for k in PRICE_KEYS):
+            yield node
+            return
+        for value in node.values():
+            yield from _iter_listing_objects(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _iter_listing_objects(value)
+
+
+def _first(obj, keys):
+    for key in keys:
+        if obj.get(key) not in (None, ""):
+            value = obj[key]
+            if isinstance(value, dict):
+                # Endereço costuma vir como {"street": ..., "neighborhood": ...}
+                return ", ".join(str(v) for v in value.values() if v)
+            return value
+    return None
+
+
+def parse_listings(html, cidade, bairro_busca="", extracted_at=""):
+    """Linhas (dicts com ``COLUMNS``) dos anúncios de uma página de busca.
+
+    Preço/m² fica vazio: é recalculado por ``analytics.ingest.coerce_types``.
+    """
+    data = next_data(html)
+    if data is None:
+        return []
+    rows, seen = [], set()
+    for obj in _iter_listing_objects(data):
+        row = {col: _first(obj, keys) for col, keys in FIELD_ALIASES.items()}
+        listing_id = str(row['ID Imóvel'])
+        if listing_id in seen:
+            continue
+        seen.add(listing_id)
+        row['ID Imóvel'] = listing_id
+        row['Cidade'] = cidade
+        row['Bairro'] = row['Bairro'] or bairro_busca
+        row['Link'] = f"{BASE_URL}/imovel/{listing_id}/comprar"
+        row['Data e Hora da Extração'] = extracted_at
+        row['Preço/m²'] = None
+        rows.append({col: row.get(col) for col in COLUMNS})
+    return rows
@@ -0,0 +1,26 @@
+"""URLs de busca do QuintoAndar (``comprar/imovel/{bairro}-{cidade}-br``)."""
+
+from utils.text import slugify
+
+BASE_URL = "https://www.quintoandar.com.br"
+
+# Sufixo de UF que o site exige no slug da cidade
+CITY_SUFFIX = {
+    "sao-paulo": "-sp",
+    "rio-de-janeiro": "-rj",
+}
+
+
+def city_slug(cidade):
+    """'São Paulo' -> 'sao-paulo-sp'."""
+    slug = slugify(cidade)
+    return slug + CITY_SUFFIX.get(slug, "")
+
+
+def search_url(cidade, bairro="", page=1, base_url=BASE_URL):
+    """URL da busca de venda para a cidade (ou um bairro dela), na página ``page``."""
+    if bairro:
+        url = f"{base_url}/comprar/imovel/{slugify(bairro)}-{city_slug(cidade)}-br"
+    else:
+        url = f"{base_url}/comprar/imovel/{city_slug(cidade)}"
+    return url if page <= 1 else f"{url}?pagina={page}"
@@ -1,37 +1,26 @@
-import pandas as pd
-from bairros_zonas import BAIRROS_ZONAS_MAPPING, BAIRROS_NORMALIZATION
-
-ZONE_MAPPING = BAIRROS_ZONAS_MAPPING
-NORMALIZATION = BAIRROS_NORMALIZATION
+import os
+import sys
 
-def normalize_bairro(bairro):
-    if not bairro or pd.isna(bairro):
-        return "N/A"
-    bairro_normalized = str(bairro).strip().lower()
-    if bairro_normalized in NORMALIZATION:
-        return NORMALIZATION[bairro_normalized]
-    return str(bairro).strip()
-
-def get_zone_for_bairro(bairro):
-    normalized = normalize_bairro(bairro)
-    for zone, bairros_list in ZONE_MAPPING.items():
-        if normalized in bairros_list:
-            return zone
-    return "Sem zona"
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts', 'utils'))
+from bairros_zonas import BAIRROS_ZONAS_MAPPING, BAIRROS_NORMALIZATION
+from analytics.bairros import normalize_bairros, zones_for
+from analytics.ingest import read_listings, latest_snapshot
 
 # Load exactly like dashboard
-df_raw = pd.read_excel('base/quintoandar_database.xlsx', dtype={'ID Imóvel': str})
+df_raw = read_listings('base/quintoandar_database.xlsx')
 
 # Apply normalization
-df_raw['Bairro'] = df_raw['Bairro'].apply(normalize_bairro)
-df_raw['Zona'] = df_raw['Bairro'].apply(get_zone_for_bairro)
+df_raw['Bairro'] = normalize_bairros(df_raw['Bairro'], BAIRROS_NORMALIZATION)
+df_raw['Zona'] = zones_for(df_raw['Bairro'], BAIRROS_ZONAS_MAPPING)
 
 print("=== RAW DATA ===")
 print(f"Total in df_raw: {len(df_raw)}")
 print(f"Unique IDs in df_raw: {df_raw['ID Imóvel'].nunique()}")
 
 # Default mode (show_all = False)
-df_latest = df_raw.sort_values('Data e Hora da Extração').drop_duplicates(subset=['ID Imóvel'], keep='last')
+df_latest = latest_snapshot(df_raw)
 
 print("\n=== AFTER DEDUP (Default view) ===")
 print(f"Total in df_latest: {len(df_latest)}")
@@ -1,13 +1,17 @@
-import pandas as pd
+import os
+import sys
 
-df = pd.read_excel('base/quintoandar_database.xlsx', dtype={'ID Imóvel': str})
-df_latest = df.sort_values('Data e Hora da Extração').drop_duplicates(subset=['ID Imóvel'], keep='last')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from analytics.query import Dataset
+
+dataset = Dataset.load('base/quintoandar_database.xlsx')
+summary = dataset.summary()
 
 print('=== Dashboard Data Summary ===')
-print(f'Total records in file: {len(df)}')
-print(f'Unique properties: {df["ID Imóvel"].nunique()}')
-print(f'After dedup (default view): {len(df_latest)}')
+print(f'Total records in file: {summary["registros"]}')
+print(f'Unique properties: {summary["imoveis_unicos"]}')
+print(f'After dedup (default view): {summary["apos_dedup"]}')
 print(f'\nTop 5 Cities:')
-print(df_latest['Cidade'].value_counts().head())
+print(summary['cidades'].head())
 print(f'\nTop 10 Neighborhoods:')
-print(df_latest['Bairro'].value_counts().head(10))
+print(summary['bairros'].head(10))
@@ -1,21 +1,52 @@
+"""Bairros sem zona e sem coordenada na base (a ingestão publica o mesmo relatório de cobertura).
+
+    python scripts/utils/find_unmapped.py
+    python scripts/utils/find_unmapped.py --template base/gazetteer_bairros.csv
+
+``--template`` acrescenta ao CSV do gazetteer os bairros sem coordenada, com
+lat/lon vazios, para preencher a partir de uma fonte offline; linhas vazias
+são ignoradas na leitura.
+"""
+import argparse
+import os
+import sys
+
 import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
 from bairros_zonas import BAIRROS_ZONAS_MAPPING, BAIRROS_NORMALIZATION
+from analytics.bairros import normalize_bairros, zones_for
+from analytics.geo import GAZETTEER_FILE
+from analytics.query import Dataset
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bairros sem zona e sem coordenada")
+    parser.add_argument("--data", default="base/quintoandar_database.xlsx")
+    parser.add_argument("--template", nargs="?", const=GAZETTEER_FILE, default=None,
+                        help=f"acrescenta os bairros sem coordenada ao CSV (padrão: {GAZETTEER_FILE})")
+    args = parser.parse_args(argv)
 
-ZONE_MAPPING = BAIRROS_ZONAS_MAPPING
-NORMALIZATION = BAIRROS_NORMALIZATION
+    dataset = Dataset.load(args.data)
+    df = dataset.latest
+    zonas = zones_for(normalize_bairros(df[dataset.col_bairro], BAIRROS_NORMALIZATION), BAIRROS_ZONAS_MAPPING)
+    print('Bairros SEM zona mapeada:')
+    print(df.loc[zonas == 'Sem zona', dataset.col_bairro].value_counts())
 
-def normalize_bairro(b):
-    bn = str(b).strip().lower()
-    return NORMALIZATION.get(bn, str(b).strip())
+    print('\nCobertura do mapa:')
+    print(dataset.map_coverage().to_string(index=False))
+    sem_coordenada = dataset.unmapped_bairros()
+    print('\nBairros SEM coordenada:')
+    print(sem_coordenada.to_string(index=False))
 
-def get_zone(b):
-    n = normalize_bairro(b)
-    return next((z for z, bl in ZONE_MAPPING.items() if n in bl), 'Sem zona')
+    if args.template:
+        existing = pd.read_csv(args.template) if os.path.exists(args.template) else pd.DataFrame(columns=['bairro', 'lat', 'lon'])
+        novos = sem_coordenada[~sem_coordenada['Bairro'].isin(existing['bairro'])]
+        rows = pd.DataFrame({'bairro': novos['Bairro'], 'lat': pd.NA, 'lon': pd.NA})
+        pd.concat([existing, rows], ignore_index=True).to_csv(args.template, index=False)
+        print(f'\n{len(rows)} bairros acrescentados a {args.template} (preencha lat/lon)')
 
-df = pd.read_excel('base/quintoandar_database.xlsx')
-df['Bairro_norm'] = df['Bairro'].apply(normalize_bairro)
-df['Zona'] = df['Bairro'].apply(get_zone)
 
-sem_zona = df[df['Zona'] == 'Sem zona']
-print('Bairros SEM zona mapeada:')
-print(sem_zona['Bairro_norm'].value_counts())
+if __name__ == "__main__":
+    main()
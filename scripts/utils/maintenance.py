@@ -0,0 +1,48 @@
+"""Manutenção da base particionada (base/partitions), um processo por partição.
+
+    python scripts/utils/maintenance.py merge base/quintoandar_database.xlsx outra_base.xlsx
+    python scripts/utils/maintenance.py migrate --cidade "São Paulo"
+    python scripts/utils/maintenance.py normalize
+    python scripts/utils/maintenance.py dedup --jobs 4
+    python scripts/utils/maintenance.py compact
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from bairros_zonas import BAIRROS_NORMALIZATION
+from analytics.maintenance import merge_sources, rewrite_partitions
+from analytics.partitions import PARTITIONS_DIR
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção da base particionada")
+    parser.add_argument("--root", default=PARTITIONS_DIR)
+    parser.add_argument("--jobs", type=int, default=None, help="processos (padrão: núcleos da máquina)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    merge = sub.add_parser("merge", help="importa planilhas/CSV/Parquet/outras bases e remove capturas repetidas")
+    merge.add_argument("sources", nargs="+")
+    merge.add_argument("--no-dedup", action="store_true")
+    migrate = sub.add_parser("migrate", help="atualiza o schema ('Bairro/Cidade de Busca', Cidade vazia, ordem das colunas)")
+    migrate.add_argument("--cidade", default="São Paulo", help="cidade usada quando a coluna está vazia")
+    sub.add_parser("normalize", help="normaliza bairros (bairros_zonas.py) e recalcula tipos e Preço/m²")
+    sub.add_parser("dedup", help="remove capturas repetidas (mesmo ID e data/hora)")
+    sub.add_parser("compact", help="compacta o WAL e junta os arquivos de cada partição")
+    args = parser.parse_args(argv)
+
+    if args.command == "merge":
+        report = merge_sources(args.root, args.sources, args.jobs, dedup=not args.no_dedup)
+    elif args.command == "migrate":
+        report = rewrite_partitions(args.root, "migrate", args.jobs, cidade=args.cidade)
+    elif args.command == "normalize":
+        report = rewrite_partitions(args.root, "normalize", args.jobs, normalization=BAIRROS_NORMALIZATION)
+    else:
+        report = rewrite_partitions(args.root, args.command, args.jobs)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
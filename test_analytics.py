@@ -0,0 +1,387 @@
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from analytics.aggregations import compute_ibairro, bairro_pm2_reference, extract_street
+from analytics.derived import DERIVED_COLUMNS, add_derived, derived, derived_names
+from analytics.distributions import BairroDistributions
+from analytics.export import export_bytes, iter_export, positions_of, to_arrow
+from analytics.events import price_events, recent_drops
+from analytics import hedonic, similar
+from analytics.filters import default_filter_state
+from analytics import geo as geo_module
+from analytics.geo import BairroResolver, load_gazetteer
+from analytics.ingest import coerce_types, latest_snapshot
+from analytics.instrumentation import PERF_ENV_VAR, StageProfiler
+from analytics import quality
+from analytics.query import Dataset, run_query
+from analytics.result_cache import ResultCache
+from analytics.timeseries import bairro_pm2_index, repeat_sales_index, rolling_median
+from benchmarks.synthetic import UNMAPPED_BAIRROS, generate_history
+
+
+def sample_raw():
+    return pd.DataFrame({
+        'ID Imóvel': ['1', '1', '2', '3'],
+        'Cidade': ['São Paulo'] * 4,
+        'Bairro': ['Centro', 'Centro', 'Pari', 'Pari'],
+        'Tipo': ['Apartamento', 'Apartamento', 'Casa', 'Apartamento'],
+        'Preço': ['R$ 500.000', '450000', '300000', 'abc'],
+        'Condomínio': [500, 500, 0, 200],
+        'Área (m²)': [50, 50, 100, 0],
+        'Quartos': [2, 2, 3, 'x'],
+        'Endereço': ['Rua A, 10', 'Rua A, 10', 'Rua B - fundos', None],
+        'Data e Hora da Extração': ['2026-01-01 10:00', '2026-02-01 10:00', '2026-01-15 09:00', '2026-01-20 08:00'],
+    })
+
+
+class TestIngest(unittest.TestCase):
+    def test_coerce_types(self):
+        df = coerce_types(sample_raw())
+        self.assertEqual(df['Preço'].tolist(), [500000, 450000, 300000, 0])
+        self.assertEqual(df['Quartos'].tolist(), [2, 2, 3, 0])
+        self.assertEqual(df['Preço/m²'].tolist(), [10000.0, 9000.0, 3000.0, 0.0])
+
+    def test_latest_snapshot_keeps_last_capture(self):
+        latest = latest_snapshot(coerce_types(sample_raw()))
+        self.assertEqual(sorted(latest['ID Imóvel']), ['1', '2', '3'])
+        self.assertEqual(latest.set_index('ID Imóvel').loc['1', 'Preço'], 450000)
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.dataset = Dataset.from_frame(sample_raw(), typed=False)
+
+    def test_default_filters_select_everything(self):
+        result = run_query(self.dataset)
+        self.assertEqual(len(result.rows), 3)
+        self.assertEqual(result.kpis['imoveis_unicos'], 3)
+
+    def test_filter_by_tipo(self):
+        state = self.dataset.default_filters().with_selection(tipos=['Casa'])
+        result = run_query(self.dataset, state)
+        self.assertEqual(result.rows['ID Imóvel'].tolist(), ['2'])
+        self.assertEqual(result.kpis['preco_medio'], 300000)
+
+    def test_show_all_uses_full_history(self):
+        state = self.dataset.default_filters(show_all=True)
+        self.assertEqual(len(run_query(self.dataset, state, show_all=True).rows), 4)
+
+    def test_ibairro(self):
+        df = self.dataset.latest
+        ibairro = compute_ibairro(df, bairro_pm2_reference(self.dataset.raw), 'Bairro')
+        self.assertAlmostEqual(ibairro[df['ID Imóvel'] == '1'].iloc[0], 9000 / 9500)
+
+    def test_derived_columns_at_ingest(self):
+        latest = self.dataset.latest.set_index('ID Imóvel')
+        # Mesmo valor que o cálculo inline antigo do IBairro
+        self.assertAlmostEqual(latest.loc['1', 'IBairro'], 9000 / 9500)
+        self.assertEqual(latest.loc['1', 'Preço/Quarto'], 225000)
+        self.assertEqual(latest.loc['1', 'Condomínio/m²'], 10)
+        self.assertEqual(latest.loc['1', 'Faixa de Área'], '40–60 m²')
+        self.assertTrue(np.isnan(latest.loc['3', 'Preço/Quarto']))
+        # A referência do Pari ignora o anúncio '3' (preço ilegível, sinalizado): só o '2' conta
+        self.assertAlmostEqual(latest.loc['2', 'IBairro'], 1.0)
+        self.assertTrue(pd.isna(latest.loc['3', 'Faixa de Área']))
+        self.assertIsInstance(latest['Faixa de Área'].dtype, pd.CategoricalDtype)
+        self.assertNotIn('Custo Mensal (R$)', latest.columns)
+        self.assertIn('Custo Mensal (R$)', add_derived(self.dataset.latest.assign(IPTU=100)).columns)
+
+    def test_registering_a_derived_column(self):
+        @derived('Área/Quarto', 'float64', requires=('Área (m²)', 'Quartos'))
+        def _area_quarto(df, history, col_bairro):
+            return df['Área (m²)'] / df['Quartos'].where(df['Quartos'] > 0)
+        try:
+            dataset = Dataset.from_frame(sample_raw(), typed=False)
+            self.assertEqual(derived_names(dataset.latest)[-1], 'Área/Quarto')
+            self.assertEqual(dataset.latest.set_index('ID Imóvel').loc['2', 'Área/Quarto'], 100 / 3)
+        finally:
+            del DERIVED_COLUMNS['Área/Quarto']
+
+    def test_extract_street(self):
+        ruas = extract_street(pd.Series(['Rua A, 10', 'Rua B - fundos', None]))
+        self.assertEqual(ruas.tolist(), ['Rua A', 'Rua B', 'N/A'])
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.dataset = Dataset.from_frame(coerce_types(generate_history(2000, seed=4)))
+        self.state = self.dataset.default_filters()
+
+    def test_cached_query_matches_uncached(self):
+        cache = ResultCache()
+        plain = run_query(self.dataset, self.state)
+        first = run_query(self.dataset, self.state, cache=cache, data_version="v1")
+        first.bairro_stats
+        # A seleção em outra ordem é a mesma consulta
+        shuffled = self.state.with_selection(bairros=list(reversed(self.state.bairros)))
+        second = run_query(self.dataset, shuffled, cache=cache, data_version="v1")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        pd.testing.assert_frame_equal(second.rows, plain.rows)
+        self.assertIs(second.bairro_stats, first.bairro_stats)
+        self.assertEqual(second.kpis, plain.kpis)
+
+        run_query(self.dataset, self.state, cache=cache, data_version="v2")
+        self.assertEqual(cache.misses, 2)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        tipos = self.state.tipos
+        for tipo in tipos[:3]:
+            run_query(self.dataset, self.state.with_selection(tipos=[tipo]), cache=cache, data_version="v1")
+        stats = cache.stats()
+        self.assertEqual((stats["entradas"], stats["evictions"]), (2, 1))
+        # O mais antigo saiu; o mais recente continua
+        run_query(self.dataset, self.state.with_selection(tipos=[tipos[2]]), cache=cache, data_version="v1")
+        self.assertEqual(cache.hits, 1)
+
+
+class TestPriceEvents(unittest.TestCase):
+    def test_drop_detected_and_indexed(self):
+        raw = sample_raw()
+        raw.loc[4] = ['3', 'São Paulo', 'Pari', 'Apartamento', '250000', 200, 0, 1, None, '2026-01-25 08:00']
+        events = price_events(coerce_types(raw))
+        self.assertEqual(events.index.names, ['Data', 'Bairro'])
+        # ID 3 sem preço na primeira captura: sem evento; ID 1 caiu de 500k para 450k
+        self.assertEqual(events['ID Imóvel'].tolist(), ['1'])
+        self.assertEqual(events['Variação (%)'].iloc[0], -10.0)
+        self.assertEqual(len(recent_drops(events, days=7, until='2026-02-01')), 1)
+        self.assertTrue(recent_drops(events, bairros=['Pari']).empty)
+
+
+class TestTimeSeries(unittest.TestCase):
+    def test_bairro_index_counts_each_listing_once_per_period(self):
+        idx = bairro_pm2_index(coerce_types(sample_raw()), freq="M")
+        centro = idx[idx['Bairro'] == 'Centro'].reset_index(drop=True)
+        self.assertEqual(centro['Anúncios'].tolist(), [1, 1])
+        self.assertEqual(centro['Índice'].tolist(), [100.0, 90.0])
+        rolled = rolling_median(idx, window=2)
+        self.assertEqual(rolled.loc[rolled['Bairro'] == 'Centro', 'Mediana Móvel'].tolist(), [10000.0, 9500.0])
+
+    def test_repeat_sales_recovers_growth(self):
+        rows = []
+        for week in range(6):
+            for i in range(40):
+                if (i + week) % 3:
+                    rows.append({
+                        'ID Imóvel': str(i), 'Bairro': f'B{i % 4}', 'Preço': 100000 * (1 + i % 5) * 1.01 ** week,
+                        'Preço/m²': 1000.0,
+                        'Data e Hora da Extração': str(pd.Timestamp('2026-01-05') + pd.Timedelta(weeks=week)),
+                    })
+        index = repeat_sales_index(pd.DataFrame(rows), freq="W")
+        expected = [round(100 * 1.01 ** w, 2) for w in range(6)]
+        self.assertEqual(index['Índice'].tolist(), expected)
+
+
+class TestBairroDistributions(unittest.TestCase):
+    def test_precomputed_stats_match_rows(self):
+        df = coerce_types(generate_history(3000, seed=5))
+        dist = BairroDistributions.build(df)
+        bairros = list(dist.box.index[:3])
+        box = dist.box_stats(bairros + ['Inexistente'])
+        self.assertEqual(list(box.index), bairros)
+        for bairro in bairros:
+            pm2 = df.loc[(df['Bairro'] == bairro) & (df['Preço/m²'] > 0), 'Preço/m²']
+            self.assertEqual(box.loc[bairro, 'Anúncios'], len(pm2))
+            self.assertAlmostEqual(box.loc[bairro, 'Mediana'], pm2.median())
+            self.assertLessEqual(box.loc[bairro, 'Cerca Sup'], box.loc[bairro, 'Máx'])
+        dens = dist.density(bairros)
+        self.assertTrue(np.allclose(dens.groupby('Bairro')['Fração'].sum(), 1.0))
+
+
+class TestHedonicModel(unittest.TestCase):
+    def test_recovers_known_coefficients(self):
+        rng = np.random.default_rng(1)
+        n = 2000
+        df = pd.DataFrame({
+            'Bairro': rng.choice(['Pari', 'Moema', 'Centro'], n),
+            'Tipo': rng.choice(['Apartamento', 'Casa'], n),
+            'Área (m²)': rng.uniform(30, 200, n),
+            'Quartos': rng.integers(1, 4, n),
+            'Condomínio': rng.choice([0, 500, 1000], n),
+        })
+        efeito = df['Bairro'].map({'Pari': 0.0, 'Moema': 0.5, 'Centro': 0.2}) + (df['Tipo'] == 'Casa') * 0.1
+        df['Preço'] = np.exp(10 + 0.9 * np.log(df['Área (m²)']) + 0.05 * df['Quartos'] + efeito).round()
+        model = hedonic.HedonicModel.fit(df)
+        self.assertGreater(model.r2, 0.999)
+        scored = model.score(df)
+        self.assertLess(scored['Resíduo (%)'].abs().max(), 0.5)
+        # Bairro desconhecido cai no efeito base em vez de falhar
+        novo = df.head(1).assign(Bairro='Inexistente')
+        self.assertTrue(np.isfinite(model.predict(novo)).all())
+
+        # Linhas sinalizadas não entram no ajuste, mas são pontuadas
+        sujo = df.assign(**{quality.QUALITY_COLUMN: 0})
+        sujo.loc[sujo.index[:50], ['Preço', quality.QUALITY_COLUMN]] = [1e9, quality.FORA_DA_FAIXA]
+        limpo = hedonic.HedonicModel.fit(sujo)
+        self.assertEqual(limpo.n_obs, n - 50)
+        self.assertGreater(limpo.r2, 0.999)
+        self.assertTrue(limpo.score(sujo)['Resíduo (%)'].head(50).gt(1000).all())
+
+
+class TestSimilarIndex(unittest.TestCase):
+    def setUp(self):
+        self.df = latest_snapshot(coerce_types(generate_history(4000, seed=9)))
+
+    def test_kdtree_matches_brute_force(self):
+        index = similar.SimilarIndex.build(self.df)
+        ids = index.listings['ID Imóvel'].iloc[[0, 10, 50]]
+        tree = [index.query(i, k=8) for i in ids]
+        index.tree = None
+        brute = [index.query(i, k=8) for i in ids]
+        for a, b, i in zip(tree, brute, ids):
+            self.assertNotIn(i, a['ID Imóvel'].tolist())
+            np.testing.assert_allclose(a['Distância'], b['Distância'])
+            self.assertTrue(a['Distância'].is_monotonic_increasing)
+
+    def test_unmapped_bairro_only_matches_same_bairro(self):
+        index = similar.SimilarIndex.build(self.df)
+        unmapped = index.listings[~index.mapped]
+        self.assertFalse(unmapped.empty)
+        row = unmapped.iloc[0]
+        result = index.query(row['ID Imóvel'], k=5)
+        self.assertTrue((result['Bairro'] == row['Bairro']).all())
+        self.assertTrue(index.query('nao-existe').empty)
+
+
+class TestExport(unittest.TestCase):
+    def test_chunked_export_matches_selection(self):
+        df = coerce_types(generate_history(500, seed=21))
+        table = to_arrow(df)
+        rows = df[df['Preço'] > df['Preço'].median()].sort_values('Área (m²)')
+        positions = positions_of(df, rows)
+        chunks = list(iter_export(table, positions, "parquet", chunk_rows=64))
+        self.assertGreater(len(chunks), 1)
+        back = pq.read_table(io.BytesIO(b"".join(chunks))).to_pandas()
+        pd.testing.assert_frame_equal(back, rows.reset_index(drop=True))
+
+        csv = pd.read_csv(io.BytesIO(export_bytes(table, positions[:10], "csv")))
+        self.assertEqual(csv['ID Imóvel'].astype(str).tolist(), rows['ID Imóvel'].head(10).tolist())
+        self.assertEqual(len(pq.read_table(io.BytesIO(export_bytes(table, [], "parquet")))), 0)
+        with self.assertRaises(ValueError):
+            export_bytes(table, None, "xlsx")
+
+
+class TestQuality(unittest.TestCase):
+    def test_flags_and_exclusion(self):
+        dataset = Dataset.from_frame(sample_raw(), typed=False)
+        flags = dataset.latest.set_index('ID Imóvel')['Qualidade']
+        # '3': preço ilegível e área 0 viram sinalizações, não zeros silenciosos
+        self.assertEqual(quality.describe_flags(flags['3']), ['preco_invalido', 'area_invalida'])
+        self.assertEqual(int(flags['1']), 0)
+
+        state = dataset.default_filters().with_selection(price=(0, 10**9), area=(0, 10**6))
+        self.assertEqual(len(run_query(dataset, state).rows), 3)
+        excluded = run_query(dataset, state.with_selection(exclude_flags=quality.ALL_FLAGS))
+        self.assertEqual(sorted(excluded.rows['ID Imóvel']), ['1', '2'])
+        report = dataset.quality_report().set_index('Sinalização')
+        self.assertEqual(report.loc['sinalizados', 'Anúncios'], 1)
+
+    def test_mad_outlier_per_bairro_and_tipo(self):
+        df = coerce_types(generate_history(2000, seed=5))
+        bairro, tipo = df.groupby(['Bairro', 'Tipo']).size().idxmax()
+        target = df.index[(df['Bairro'] == bairro) & (df['Tipo'] == tipo)][0]
+        df.loc[target, 'Preço'] = df.loc[target, 'Preço'] * 20
+        flags = quality.quality_flags(df)
+        self.assertTrue(flags[df.index.get_loc(target)] & quality.OUTLIER_PM2)
+        self.assertLess((flags & quality.OUTLIER_PM2 != 0).mean(), 0.05)
+
+
+class TestGeo(unittest.TestCase):
+    def test_resolution_steps(self):
+        coordinates = {"Consolacao": (-23.55, -46.66), "Vila Mariana": (-23.58, -46.63), "Aclimacao": (-23.57, -46.63)}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gazetteer.csv")
+            pd.DataFrame({"bairro": ["Vila Prudente", "Copacabana"], "lat": [-23.58, None], "lon": [-46.58, None]}).to_csv(path, index=False)
+            gazetteer = load_gazetteer(path)
+        self.assertEqual(list(gazetteer), ["vila prudente"])
+        resolver = BairroResolver(coordinates, {"aclimaacao": "Aclimaçao"}, gazetteer)
+        geo = resolver.resolve(["Consolacao", "aclimaacao", "Consolação ", "Consolaçao", "Vila Marianna",
+                                "Vila Maria", "Vila Prudente", "Copacabana", None])
+        self.assertEqual(geo["metodo"].to_dict(), {
+            "Consolacao": "exato", "aclimaacao": "normalizacao", "Consolação ": "acentos", "Consolaçao": "acentos",
+            "Vila Marianna": "aproximado", "Vila Maria": "sem_coordenada", "Vila Prudente": "gazetteer",
+            "Copacabana": "sem_coordenada",
+        })
+        self.assertEqual(geo.loc["Vila Marianna", "referencia"], "Vila Mariana")
+        self.assertTrue(np.isnan(geo.loc["Vila Maria", "lat"]))
+
+    def test_default_resolver_follows_gazetteer_edits(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gazetteer.csv")
+            original, geo_module.GAZETTEER_FILE = geo_module.GAZETTEER_FILE, path
+            try:
+                self.assertEqual(geo_module.default_resolver().resolve_one("Paraiso")[2], "sem_coordenada")
+                pd.DataFrame({"bairro": ["Paraiso"], "lat": [-23.57], "lon": [-46.64]}).to_csv(path, index=False)
+                os.utime(path, (1, 1))
+                self.assertEqual(geo_module.default_resolver().resolve_one("Paraiso")[2], "gazetteer")
+            finally:
+                geo_module.GAZETTEER_FILE = original
+
+    def test_coverage_at_ingest(self):
+        dataset = Dataset.from_frame(generate_history(400, seed=9), typed=False)
+        report = dataset.map_coverage().set_index("Método")
+        self.assertEqual(report.loc["com_coordenada", "Anúncios"] + report.loc["sem_coordenada", "Anúncios"],
+                         len(dataset.latest))
+        self.assertEqual(set(dataset.unmapped_bairros()["Bairro"]), set(UNMAPPED_BAIRROS) & set(dataset.latest["Bairro"]))
+        self.assertNotIn(UNMAPPED_BAIRROS[0], dataset.bairro_coordinates)
+        # Mais uma coordenada resolvida muda a impressão digital (chave do índice de similares)
+        geo = dataset.geo.copy()
+        geo.loc[UNMAPPED_BAIRROS[0], ["lat", "lon"]] = (-23.6, -46.6)
+        self.assertNotEqual(geo_module.geo_fingerprint(geo), dataset.geo_version)
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        perf = StageProfiler()
+        with perf.stage("filtros") as stage:
+            stage.rows = 10
+        self.assertEqual(perf.records, [])
+
+    def test_records_time_rows_extra_and_errors(self):
+        perf = StageProfiler(enabled=True)
+        with perf.stage("filtros", rows=5) as stage:
+            stage.extra["result_cache"] = "hit"
+        with self.assertRaises(KeyError):
+            with perf.stage("mapa"):
+                raise KeyError("x")
+        first, second = perf.records
+        self.assertEqual((first["stage"], first["rows"], first["result_cache"]), ("filtros", 5, "hit"))
+        self.assertGreaterEqual(first["ms"], 0)
+        self.assertEqual(second["error"], "KeyError")
+        self.assertEqual([r["stage"] for r in perf.summary()["stages"]], ["filtros", "mapa"])
+
+    def test_allocation_tracing_is_env_only_and_stops(self):
+        with mock.patch.dict(os.environ, {PERF_ENV_VAR: ""}):
+            self.assertFalse(StageProfiler.from_env("alloc").track_allocations)
+        with mock.patch.dict(os.environ, {PERF_ENV_VAR: "alloc"}):
+            a, b = StageProfiler.from_env(), StageProfiler.from_env()
+        self.assertTrue(tracemalloc.is_tracing())
+        with a.stage("dois ao mesmo tempo"):
+            bytearray(1 << 16)
+        self.assertNotIn("alloc_peak_kb", a.records[0])
+        b.close()
+        with a.stage("sozinho"):
+            bytearray(1 << 16)
+        self.assertIn("alloc_peak_kb", a.records[1])
+        a.log()
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class TestSyntheticHistory(unittest.TestCase):
+    def test_schema_and_defaults(self):
+        df = coerce_types(generate_history(600, seed=1))
+        self.assertEqual(len(df), 600)
+        state = default_filter_state(latest_snapshot(df))
+        self.assertEqual(len(run_query(Dataset.from_frame(df), state).rows), df['ID Imóvel'].nunique())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from analytics.aggregations import daily_mean_price, daily_mean_price_ffill
+from analytics.changes import ChangeTracker, state_dir
+from analytics.lifecycle import ATIVO, LifecycleTable
+from analytics.query import Dataset
+from analytics.store import ListingStore
+
+
+def dense_runs(n_ids=60, n_runs=6, seed=3):
+    """Cada coleta recaptura todos os imóveis ativos; poucos preços mudam entre coletas."""
+    rng = np.random.default_rng(seed)
+    listed = rng.integers(0, n_runs // 2, size=n_ids)
+    delisted = rng.integers(n_runs // 2, n_runs + 1, size=n_ids)
+    price = rng.integers(300, 900, size=n_ids) * 1000
+    runs = []
+    for r in range(n_runs):
+        change = rng.random(n_ids) < 0.15
+        price = np.where(change, price + rng.integers(-50, 50, size=n_ids) * 1000, price)
+        active = (listed <= r) & (r < delisted)
+        runs.append(pd.DataFrame({
+            'ID Imóvel': np.arange(n_ids)[active].astype(str),
+            'Bairro': 'Pari',
+            'Título/Descrição': 'Apartamento',
+            'Preço': price[active],
+            'Condomínio': 500,
+            'Área (m²)': 60,
+            'Data e Hora da Extração': f"2026-03-{r + 1:02d} 10:00",
+        }))
+    return runs
+
+
+class TestChangeLog(unittest.TestCase):
+    def setUp(self):
+        self.runs = dense_runs()
+        self.dense = pd.concat(self.runs, ignore_index=True)
+        self.tracker = ChangeTracker()
+        self.sparse = pd.concat([self.tracker.diff(run) for run in self.runs], ignore_index=True)
+
+    def test_only_changes_are_kept(self):
+        self.assertLess(len(self.sparse), len(self.dense))
+        self.assertTrue(self.tracker.diff(self.runs[-1].assign(**{'Data e Hora da Extração': '2026-03-09 10:00'})).empty)
+
+    def test_sparse_log_reproduces_dense_daily_mean(self):
+        expected = daily_mean_price(self.dense)
+        pd.testing.assert_frame_equal(daily_mean_price_ffill(self.dense), expected)
+        got = daily_mean_price_ffill(self.sparse, self.tracker.last_seen, self.tracker.capture_days)
+        pd.testing.assert_frame_equal(got, expected)
+
+        dataset = Dataset.from_frame(self.sparse).use_change_log(self.tracker)
+        pd.testing.assert_frame_equal(dataset.daily_mean_price(), expected)
+
+    def test_state_roundtrip_and_rebuild(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.tracker.save(tmp)
+            loaded = ChangeTracker.load(tmp)
+        pd.testing.assert_series_equal(loaded.last_seen.sort_index(), self.tracker.last_seen.sort_index(), check_index_type=False, check_dtype=False)
+        rebuilt = ChangeTracker.from_history(self.dense)
+        pd.testing.assert_series_equal(rebuilt.state['hash'].sort_index(), self.tracker.state['hash'].sort_index(), check_index_type=False)
+        self.assertEqual(rebuilt.runs, self.tracker.runs)
+
+
+
+class TestLifecycle(unittest.TestCase):
+    def setUp(self):
+        self.runs = dense_runs()
+        self.dense = pd.concat(self.runs, ignore_index=True)
+
+    def test_incremental_matches_full_history(self):
+        incremental = LifecycleTable()
+        for run in self.runs:
+            incremental.update(run)
+        full = LifecycleTable.from_history(self.dense)
+        a = incremental.frame().sort_values('ID Imóvel', ignore_index=True)
+        b = full.frame().sort_values('ID Imóvel', ignore_index=True)
+        pd.testing.assert_frame_equal(a, b, check_dtype=False)
+
+    def test_status_and_counts(self):
+        frame = LifecycleTable.from_history(self.dense).frame().set_index('ID Imóvel')
+        last_run = self.runs[-1]['ID Imóvel']
+        self.assertEqual(set(frame.index[frame['status'] == ATIVO]), set(last_run))
+        counts = self.dense['ID Imóvel'].value_counts()
+        self.assertTrue((frame['n_captures'] == counts.reindex(frame.index)).all())
+        self.assertTrue((frame['dias_no_mercado'] == frame['n_captures'] - 1).all())
+
+    def test_store_keeps_lifecycle(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = ListingStore(root)
+            for run in self.runs[:3]:
+                store.append(run)
+            # Reabre: o estado salvo continua de onde parou
+            store = ListingStore(root)
+            for run in self.runs[3:]:
+                store.append(run.iloc[:0], sightings=run)
+            saved = LifecycleTable.load(state_dir(root)).frame().sort_values('ID Imóvel', ignore_index=True)
+        expected = LifecycleTable.from_history(self.dense).frame().sort_values('ID Imóvel', ignore_index=True)
+        pd.testing.assert_frame_equal(saved, expected, check_dtype=False)
+
+    def test_failed_append_does_not_count_sightings(self):
+        with tempfile.TemporaryDirectory() as root:
+            store = ListingStore(root)
+            with mock.patch("analytics.store.write_frame_atomic", side_effect=OSError("disco cheio")):
+                with self.assertRaises(OSError):
+                    store.append(self.runs[0])
+            for run in self.runs:
+                store.append(run)
+            saved = LifecycleTable.load(state_dir(root)).frame().sort_values('ID Imóvel', ignore_index=True)
+        expected = LifecycleTable.from_history(self.dense).frame().sort_values('ID Imóvel', ignore_index=True)
+        pd.testing.assert_frame_equal(saved, expected, check_dtype=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
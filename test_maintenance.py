@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from analytics.ingest import coerce_types
+from analytics.maintenance import merge_sources, rewrite_partitions
+from analytics.partitions import list_partitions, read_partitions
+from analytics.store import ListingStore
+from benchmarks.synthetic import generate_history
+
+
+class TestMaintenance(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "partitions")
+        self.df = coerce_types(generate_history(1200, seed=11))
+        store = ListingStore(self.root)
+        store.append(self.df.iloc[:800])
+        store.compact()
+        store.append(self.df.iloc[400:])  # 400 capturas repetidas, em outros arquivos
+        store.compact()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dedup_and_compact(self):
+        before = len(list_partitions(self.root))
+        report = rewrite_partitions(self.root, "dedup", jobs=2)
+        self.assertEqual(report.rows_in, 1600)
+        self.assertEqual(report.rows_out, len(self.df.drop_duplicates(['ID Imóvel', 'Data e Hora da Extração'])))
+        self.assertGreater(report.rows_per_sec, 0)
+        self.assertLess(len(list_partitions(self.root)), before)
+        self.assertEqual(rewrite_partitions(self.root, "compact", jobs=2).partitions, 0)
+        self.assertEqual(len(read_partitions(self.root)), report.rows_out)
+
+    def test_migrate_legacy_columns(self):
+        legacy = os.path.join(self.tmp.name, "legacy.csv")
+        old = self.df.head(50).rename(columns={'Bairro': 'Bairro de Busca'}).drop(columns=['Cidade'])
+        old.to_csv(legacy, index=False)
+        merge_sources(self.root, [legacy], jobs=1)
+        merged = read_partitions(self.root)
+        self.assertNotIn('Bairro de Busca', merged.columns)
+        self.assertEqual(merged['Cidade'].unique().tolist(), ['São Paulo'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from analytics import aggregations
+from analytics.chunked import process_partitions
+from analytics.ingest import coerce_types, latest_snapshot
+from analytics.partitions import city_slug, list_partitions, read_partitions, write_partitions
+from benchmarks.synthetic import generate_history
+
+
+def multi_city_history():
+    df = coerce_types(generate_history(3000, n_days=75, seed=7))
+    rj = df['ID Imóvel'].astype(int) % 4 == 0
+    df.loc[rj, 'Cidade'] = 'Rio de Janeiro'
+    return df
+
+
+class TestPartitions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "partitions")
+        self.df = multi_city_history()
+        write_partitions(self.df, self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_layout_by_city_and_month(self):
+        parts = list_partitions(self.root)
+        self.assertEqual({c for c, _, _ in parts}, {'sao-paulo', 'rio-de-janeiro'})
+        self.assertGreater(len({m for _, m, _ in parts}), 1)
+        self.assertEqual(len(list_partitions(self.root, cidades=['Rio de Janeiro'])),
+                         len([p for p in parts if p[0] == 'rio-de-janeiro']))
+        self.assertEqual(len(read_partitions(self.root)), len(self.df))
+        self.assertEqual(city_slug('São Caetano do Sul'), 'sao-caetano-do-sul')
+
+    def test_streaming_matches_in_memory(self):
+        result = process_partitions(self.root)
+        latest = latest_snapshot(self.df)
+        self.assertEqual(result.registros, len(self.df))
+
+        key = ['ID Imóvel']
+        pd.testing.assert_frame_equal(
+            result.latest.sort_values(key).reset_index(drop=True),
+            latest.sort_values(key).reset_index(drop=True),
+        )
+        pd.testing.assert_frame_equal(
+            result.bairro_stats.reset_index(drop=True),
+            aggregations.bairro_stats(latest).reset_index(drop=True),
+            check_dtype=False, atol=0.02,
+        )
+        pd.testing.assert_frame_equal(
+            result.map_aggregates,
+            aggregations.map_aggregates(latest),
+            check_dtype=False,
+        )
+        pd.testing.assert_frame_equal(
+            result.daily_mean_price,
+            aggregations.daily_mean_price(self.df),
+            check_dtype=False,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
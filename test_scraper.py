@@ -0,0 +1,129 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+
+from scraper.client import HAS_AIOHTTP
+from analytics.store import StoreReader
+from scraper.ratelimit import TokenBucket
+from scraper.urls import search_url
+
+if HAS_AIOHTTP:
+    from aiohttp import web
+
+    from scraper.client import ScraperClient
+    from scraper.engine import PartitionSink, crawl
+
+
+def listing_page(listings):
+    payload = json.dumps({"props": {"pageProps": {"initialState": {"houses": listings}}}})
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{payload}</script></html>'
+
+
+class StubServer:
+    """Servidor local que imita as páginas de busca (2 páginas por bairro)."""
+
+    def __init__(self, fail_first=0, delay=0.0):
+        self.fail_first = fail_first
+        self.delay = delay
+        self.hits = {}
+        self.in_flight = self.max_in_flight = 0
+
+    async def handle(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            key = request.path_qs
+            self.hits[key] = self.hits.get(key, 0) + 1
+            if self.hits[key] <= self.fail_first:
+                return web.Response(status=503, headers={"Retry-After": "0"})
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            slug = request.match_info["slug"]
+            page = int(request.query.get("pagina", 1))
+            if page > 2:
+                return web.Response(text=listing_page([]), content_type="text/html")
+            listings = [
+                {"id": f"{slug}-{page}-{i}", "salePrice": 500000 + i, "area": 50, "bedrooms": 2,
+                 "type": "Apartamento", "condoFee": 400, "address": "Rua A, 10"}
+                for i in range(3)
+            ]
+            return web.Response(text=listing_page(listings), content_type="text/html")
+        finally:
+            self.in_flight -= 1
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/comprar/imovel/{slug}", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+class TestUrls(unittest.TestCase):
+    def test_search_url(self):
+        self.assertEqual(search_url("São Paulo"), "https://www.quintoandar.com.br/comprar/imovel/sao-paulo-sp")
+        self.assertEqual(search_url("Rio de Janeiro", "Copacabana"),
+                         "https://www.quintoandar.com.br/comprar/imovel/copacabana-rio-de-janeiro-rj-br")
+        self.assertTrue(search_url("São Paulo", "Pari", page=3).endswith("pari-sao-paulo-sp-br?pagina=3"))
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    async def test_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+@unittest.skipUnless(HAS_AIOHTTP, "aiohttp não instalado")
+class TestCrawl(unittest.IsolatedAsyncioTestCase):
+    async def test_crawl_paginates_and_retries(self):
+        async with StubServer(fail_first=1) as server:
+            df, stats = await crawl("São Paulo", ["Pari", "Bras"], concurrency=4, rate=1000,
+                                    base_url=server.base_url, backoff=0.01)
+        self.assertEqual(len(df), 12)
+        self.assertEqual(stats.pages, 6)
+        self.assertEqual(stats.failures, [])
+        self.assertEqual(stats.requests, 12)
+        self.assertEqual(set(df['Bairro']), {"Pari", "Bras"})
+        self.assertEqual(df['Cidade'].unique().tolist(), ["São Paulo"])
+
+    async def test_sink_streams_each_bairro_to_wal(self):
+        with tempfile.TemporaryDirectory() as root:
+            sink = PartitionSink(root)
+            async with StubServer() as server:
+                await crawl("São Paulo", ["Pari", "Bras"], rate=1000, base_url=server.base_url, sink=sink)
+            self.assertEqual(len(sink.store.pending_segments()), 2)
+            manifest = sink.close()
+            self.assertEqual(sum(f["rows"] for f in manifest["files"]), 12)
+            self.assertEqual(len(StoreReader(root).refresh()), 12)
+
+    async def test_concurrency_is_bounded(self):
+        async with StubServer(delay=0.02) as server:
+            async with ScraperClient(concurrency=3, rate=1000) as client:
+                urls = [search_url("São Paulo", f"Bairro {i}", base_url=server.base_url) for i in range(12)]
+                results = await client.fetch_many(urls)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertLessEqual(server.max_in_flight, 3)
+
+    async def test_gives_up_after_retries(self):
+        async with StubServer(fail_first=10) as server:
+            async with ScraperClient(retries=2, backoff=0.01, rate=1000) as client:
+                result = await client.fetch(search_url("São Paulo", "Pari", base_url=server.base_url))
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 3)
+        self.assertEqual(result.status, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
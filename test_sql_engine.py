@@ -0,0 +1,105 @@
+import unittest
+from dataclasses import replace
+
+import pandas as pd
+
+from analytics import aggregations
+from analytics.ingest import coerce_types
+from analytics.quality import ALL_FLAGS
+from analytics.query import Dataset, run_query
+from analytics.sql_engine import HAS_DUCKDB, SqlEngine
+from benchmarks.synthetic import generate_history
+
+
+class SqlEngineMixin:
+    backend = "sqlite"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dataset = Dataset.from_frame(coerce_types(generate_history(3000, seed=7)))
+        cls.engine = SqlEngine(cls.backend).ingest(cls.dataset.raw)
+        state = cls.dataset.default_filters()
+        cls.state = state.with_selection(tipos=["Apartamento", "Casa"], price=(300_000, 2_000_000))
+
+    def test_latest_table_matches_dedup(self):
+        self.assertEqual(self.engine.sql("SELECT COUNT(*) AS n FROM latest")['n'].iloc[0], len(self.dataset.latest))
+
+    def test_kpis_match_pandas(self):
+        expected = run_query(self.dataset, self.state).kpis
+        got = self.engine.kpis(self.state)
+        for key, value in expected.items():
+            self.assertAlmostEqual(got[key], value, places=4, msg=key)
+
+    def test_bairro_stats_match_pandas(self):
+        pandas_result = run_query(self.dataset, self.state)
+        expected = pandas_result.bairro_stats.set_index('Bairro').sort_index()
+        got = self.engine.bairro_stats(self.state).set_index('Bairro').sort_index()
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False, atol=0.02)
+
+    def test_rua_stats_counts(self):
+        expected = run_query(self.dataset, self.state).rua_stats
+        got = self.engine.rua_stats(self.state)
+        self.assertEqual(got['Imóveis'].tolist(), expected['Imóveis'].tolist())
+
+    def test_daily_mean_from_rollup(self):
+        expected = aggregations.daily_mean_price(self.dataset.raw)
+        got = self.engine.daily_mean_price()
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+    def test_slice_tipo_quartos_mes(self):
+        sliced = self.engine.slice(("mes", "tipo", "quartos"))
+        self.assertEqual(sliced['registros'].sum(), len(self.dataset.raw))
+
+    def test_rows_pushdown(self):
+        rows = self.engine.rows(self.state)
+        self.assertEqual(len(rows), len(run_query(self.dataset, self.state).rows))
+
+    def test_run_query_rows_from_engine(self):
+        with_engine = replace(self.dataset)
+        with_engine.attach_engine(self.engine)
+        for show_all in (False, True):
+            expected = run_query(self.dataset, self.state, show_all=show_all)
+            got = run_query(with_engine, self.state, show_all=show_all)
+            pd.testing.assert_frame_equal(got.rows, expected.rows)
+            pd.testing.assert_frame_equal(got.map_rows, expected.map_rows)
+
+    def test_same_minute_captures_match_latest_snapshot(self):
+        raw = coerce_types(generate_history(400, seed=3))
+        first = raw.iloc[[0]].assign(**{'Preço': raw['Preço'].iloc[0] * 3})
+        stamp = raw['Data e Hora da Extração'].iloc[0]
+        # Duas capturas no mesmo minuto, a mais recente antes na base
+        first['Data e Hora da Extração'] = f"{stamp}:59"
+        raw['Data e Hora da Extração'] = raw['Data e Hora da Extração'].where(raw.index != 0, f"{stamp}:01")
+        dataset = Dataset.from_frame(pd.concat([first, raw], ignore_index=True))
+        with_engine = replace(dataset).attach_engine(SqlEngine(self.backend).ingest(dataset.raw))
+        self.assertTrue(with_engine.engine_in_sync)
+        state = dataset.default_filters()
+        expected, got = run_query(dataset, state), run_query(with_engine, state)
+        pd.testing.assert_frame_equal(got.rows, expected.rows)
+        self.assertAlmostEqual(got.kpis['preco_medio'], expected.kpis['preco_medio'], places=4)
+        self.assertAlmostEqual(got.kpis['preco_medio'], got.rows['Preço'].mean(), places=4)
+
+    def test_engine_out_of_sync_stays_in_pandas(self):
+        other = Dataset.from_frame(coerce_types(generate_history(500, seed=8)))
+        stale = replace(other).attach_engine(self.engine)
+        self.assertFalse(stale.engine_in_sync)
+        result = run_query(stale, other.default_filters())
+        self.assertIsNone(result.engine)
+        self.assertAlmostEqual(result.kpis['preco_medio'], result.rows['Preço'].mean(), places=4)
+
+    def test_exclude_flags_pushdown(self):
+        state = self.state.with_selection(exclude_flags=ALL_FLAGS)
+        self.assertEqual(self.engine.kpis(state)['imoveis'], run_query(self.dataset, state).kpis['imoveis'])
+
+
+class TestSqliteEngine(SqlEngineMixin, unittest.TestCase):
+    backend = "sqlite"
+
+
+@unittest.skipUnless(HAS_DUCKDB, "duckdb não instalado")
+class TestDuckDbEngine(SqlEngineMixin, unittest.TestCase):
+    backend = "duckdb"
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,386 @@
+import fnmatch
+import glob
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest import mock
+from urllib.parse import quote
+
+import pandas as pd
+
+from analytics.aggregations import bairro_stats
+from analytics.diskcache import CODE_INPUTS, DiskCache, code_version, persist
+from analytics.ingest import coerce_types
+from analytics.partitions import list_partitions, read_manifest, read_partitions, write_manifest, write_partitions
+from analytics.maintenance import rewrite_partitions
+from analytics.query import run_query
+from analytics.refresher import DataRefresher
+from analytics.remote import DatasetClient, VersionChanged
+from analytics.server import DatasetService, arrow_to_frame, make_server
+from analytics.store import ListingStore, StoreReader
+from analytics.version import file_version
+from benchmarks.synthetic import generate_history
+
+
+class TestListingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.store = ListingStore(self.root)
+        self.df = coerce_types(generate_history(900, seed=5))
+        self.batches = [self.df.iloc[:300], self.df.iloc[300:600], self.df.iloc[600:]]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_wal_then_compact(self):
+        for batch in self.batches:
+            self.store.append(batch)
+        reader = StoreReader(self.root)
+        self.assertEqual(len(reader.refresh()), 900)
+        self.assertEqual(len(self.store.pending_segments()), 3)
+
+        manifest = self.store.compact()
+        self.assertEqual(manifest["version"], 1)
+        self.assertEqual(self.store.pending_segments(), [])
+        self.assertEqual(sum(f["rows"] for f in manifest["files"]), 900)
+        self.assertEqual(len(read_partitions(self.root)), 900)
+        self.assertEqual(len(reader.refresh()), 900)
+
+    def test_crash_before_manifest_leaves_no_duplicates(self):
+        self.store.append(self.batches[0])
+        self.store.compact()
+        self.store.append(self.batches[1])
+        # Simula crash: partições gravadas, manifesto não publicado
+        write_partitions(self.batches[1], self.root, tag="crash")
+        self.assertEqual(len(read_partitions(self.root)), 300)
+
+        self.store.compact()
+        self.assertEqual(len(read_partitions(self.root)), 600)
+        self.assertFalse(any("crash" in p for _, _, p in list_partitions(self.root)))
+
+    def test_crash_in_first_compaction_leaves_no_duplicates(self):
+        self.store.append(self.batches[0])
+        # Simula crash na primeira compactação: partições gravadas, manifesto v1 não publicado
+        calls = []
+
+        def fail_after_v0(root, manifest):
+            calls.append(manifest["version"])
+            if manifest["version"] > 0:
+                raise OSError("disco cheio")
+            return write_manifest(root, manifest)
+
+        with mock.patch("analytics.store.write_manifest", side_effect=fail_after_v0):
+            with self.assertRaises(OSError):
+                self.store.compact()
+        self.assertEqual(calls, [0, 1])
+        self.assertEqual(len(StoreReader(self.root).refresh()), 300)
+
+        manifest = self.store.compact()
+        self.assertEqual(sum(f["rows"] for f in manifest["files"]), 300)
+        self.assertEqual(len(read_partitions(self.root)), 300)
+        self.assertEqual(len(StoreReader(self.root).refresh()), 300)
+
+    def test_crash_after_manifest_does_not_recompact(self):
+        self.store.append(self.batches[0])
+        segment = self.store.append(self.batches[1])
+        manifest = self.store.compact()
+        # Simula crash antes de apagar o segmento: ele volta ao WAL
+        self.batches[1].to_parquet(segment, index=False)
+        self.assertEqual(read_manifest(self.root)["compacted_segments"], manifest["compacted_segments"])
+        self.assertEqual(len(StoreReader(self.root).refresh()), 600)
+        self.store.compact()
+        self.assertFalse(os.path.exists(segment))
+        self.assertEqual(len(read_partitions(self.root)), 600)
+
+    def test_crash_after_manifest_then_new_segments(self):
+        segment = self.store.append(self.batches[0])
+        self.store.compact()
+        # Crash depois da troca do manifesto: o segmento de A continua no WAL
+        self.batches[0].to_parquet(segment, index=False)
+        self.store.append(self.batches[1])
+        self.store.compact()
+        self.store.compact()
+        self.assertFalse(os.path.exists(segment))
+        self.assertEqual(len(read_partitions(self.root)), 600)
+        self.assertEqual(len(StoreReader(self.root).refresh()), 600)
+
+    def test_reader_retries_when_segment_disappears(self):
+        self.store.append(self.batches[0])
+        reader = StoreReader(self.root)
+        stale_pending = self.store.pending_segments()
+        self.store.compact()
+        # Primeira leitura com a visão de antes da compactação (segmento já apagado)
+        calls = []
+        original = reader.store.pending_segments
+
+        def pending(manifest=None):
+            calls.append(1)
+            return stale_pending if len(calls) == 1 else original(manifest)
+        reader.store.pending_segments = pending
+        self.assertEqual(len(reader.refresh()), 300)
+        self.assertGreater(len(calls), 1)
+
+    def test_reader_only_reads_new_files(self):
+        reader = StoreReader(self.root)
+        self.store.append(self.batches[0])
+        self.store.compact()
+        first = reader.refresh()
+        self.assertIs(reader.refresh(), first)
+        self.assertEqual(reader.last_read, 0)
+
+        self.store.append(self.batches[1])
+        self.assertEqual(len(reader.refresh()), 600)
+        self.assertEqual(reader.last_read, 1)
+        pd.testing.assert_frame_equal(
+            reader.refresh().sort_values('ID Imóvel', kind='stable').reset_index(drop=True),
+            pd.concat(self.batches[:2]).sort_values('ID Imóvel', kind='stable').reset_index(drop=True),
+            check_dtype=False,
+        )
+
+    def test_data_version_follows_content_not_files(self):
+        self.store.append(self.batches[0])
+        self.store.compact()
+        self.store.append(self.batches[1])
+        pending = self.store.data_version()
+        reader = StoreReader(self.root)
+        reader.refresh()
+        self.assertEqual(reader.version, pending)
+
+        # Compactar e reescrever partições não muda as linhas visíveis
+        self.store.compact()
+        self.assertEqual(self.store.data_version(), pending)
+        report = rewrite_partitions(self.root, "compact", jobs=1)
+        self.assertGreater(report.partitions, 0)
+        self.assertEqual(self.store.data_version(), pending)
+
+        self.store.append(self.batches[2])
+        self.assertNotEqual(self.store.data_version(), pending)
+        reader.refresh()
+        self.assertEqual(reader.version, self.store.data_version())
+
+    def test_file_version_ignores_touch(self):
+        path = os.path.join(self.root, "base.xlsx")
+        with open(path, "wb") as f:
+            f.write(b"conteudo")
+        before = file_version(path)
+        os.utime(path, (0, 0))
+        self.assertEqual(file_version(path), before)
+        with open(path, "wb") as f:
+            f.write(b"outro conteudo")
+        self.assertNotEqual(file_version(path), before)
+
+
+
+class TestDataRefresher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "partitions")
+        self.df = coerce_types(generate_history(600, seed=8))
+        self.warmed = []
+        self.refresher = DataRefresher(os.path.join(self.tmp.name, "nao-existe.xlsx"), self.root,
+                                       interval=60, warm=lambda ds, v: self.warmed.append(v))
+
+    def tearDown(self):
+        self.refresher.stop()
+        self.tmp.cleanup()
+
+    def test_swaps_only_on_new_version(self):
+        self.assertFalse(self.refresher.poll_once())
+        self.assertIsNone(self.refresher.current)
+
+        store = ListingStore(self.root)
+        store.append(self.df.iloc[:300])
+        self.assertTrue(self.refresher.poll_once())
+        first = self.refresher.current
+        self.assertEqual(len(first.raw), 300)
+        self.assertEqual(self.warmed, [first.version])
+
+        store.compact()
+        self.assertFalse(self.refresher.poll_once())
+        self.assertIs(self.refresher.current, first)
+
+        store.append(self.df.iloc[300:])
+        self.assertTrue(self.refresher.poll_once())
+        self.assertEqual(len(self.refresher.current.raw), 600)
+        # O snapshot antigo continua íntegro para quem ainda o usa
+        self.assertEqual(len(first.raw), 300)
+
+    def test_background_thread_and_warm_errors(self):
+        def broken(dataset, version):
+            raise RuntimeError("cache")
+        self.refresher.warm = broken
+        ListingStore(self.root).append(self.df)
+        snapshot = self.refresher.start().wait_ready(timeout=30)
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(len(snapshot.raw), 600)
+        self.assertIsInstance(self.refresher.last_error, RuntimeError)
+
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.tmp.name, keep=2)
+        self.calls = []
+
+        @persist("dobro", cache=self.cache)
+        def dobro(_df, data_version):
+            self.calls.append(data_version)
+            return _df * 2
+
+        self.dobro = dobro
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_keyed_by_version_not_by_underscore_args(self):
+        self.assertEqual(self.dobro(1, "v1"), 2)
+        # Um novo processo veria o mesmo arquivo: o argumento com "_" não entra na chave
+        self.assertEqual(self.dobro(5, "v1"), 2)
+        self.assertEqual(self.dobro(5, "v2"), 10)
+        self.assertEqual(self.calls, ["v1", "v2"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_code_version_covers_tables_outside_analytics(self):
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "scripts", "utils"))
+        with open(os.path.join(root, "bairro_coordinates.py"), "w") as f:
+            f.write("BAIRRO_COORDINATES = {}\n")
+        before = code_version(root)
+        for rel in ("bairro_coordinates.py", "scripts/utils/bairros_zonas.py", "base/gazetteer_bairros.csv"):
+            self.assertTrue(any(fnmatch.fnmatch(rel, p) for p in CODE_INPUTS), rel)
+        with open(os.path.join(root, "scripts", "utils", "bairros_zonas.py"), "w") as f:
+            f.write("BAIRROS_NORMALIZATION = {}\n")
+        code_version.cache_clear()
+        self.assertNotEqual(code_version(root), before)
+
+    def test_corrupt_entry_is_recomputed_and_old_ones_pruned(self):
+        self.dobro(1, "v1")
+        path = glob.glob(os.path.join(self.tmp.name, "dobro", "*.pkl"))[0]
+        with open(path, "wb") as f:
+            f.write(b"lixo")
+        self.assertEqual(self.dobro(1, "v1"), 2)
+        self.dobro(1, "v2")
+        self.dobro(1, "v3")
+        self.assertEqual(len(glob.glob(os.path.join(self.tmp.name, "dobro", "*.pkl"))), 2)
+
+
+
+class TestDatasetServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "partitions")
+        self.store = ListingStore(self.root)
+        self.store.append(coerce_types(generate_history(400, seed=12)))
+        self.refresher = DataRefresher(os.path.join(self.tmp.name, "nao-existe.xlsx"), self.root, interval=60)
+        self.refresher.poll_once()
+        self.service = DatasetService(self.refresher)
+        self.server = make_server(self.service, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = DatasetClient("http://%s:%d" % self.server.server_address[:2])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_remote_query_matches_local(self):
+        version = self.client.version()
+        self.assertEqual(version, self.refresher.current.version)
+        local_ds = self.refresher.current.dataset
+        with mock.patch("analytics.query.validate") as validate, mock.patch("analytics.query.default_resolver") as resolver:
+            dataset = self.client.dataset(version)
+        validate.assert_not_called()
+        resolver.assert_not_called()
+        pd.testing.assert_frame_equal(dataset.raw, local_ds.raw)
+        pd.testing.assert_frame_equal(dataset.latest, local_ds.latest)
+        pd.testing.assert_frame_equal(dataset.geo, local_ds.geo, check_index_type=False)
+        self.assertEqual(dataset.geo_version, local_ds.geo_version)
+
+        state = local_ds.default_filters().with_selection(tipos=["Casa"], price=(0, 900000))
+        local = run_query(local_ds, state)
+        remote = self.client.query(state, version=version)
+        pd.testing.assert_frame_equal(remote.rows, local.rows)
+        pd.testing.assert_frame_equal(remote.bairro_stats, local.bairro_stats)
+        self.assertEqual(remote.kpis, local.kpis)
+
+        # Outro worker com a mesma seleção reaproveita o cache do servidor
+        self.client.query(state).rows
+        self.assertGreaterEqual(self.service.cache.stats()["hits"], 1)
+
+    def test_version_change_and_errors(self):
+        old = self.client.version()
+        self.store.append(coerce_types(generate_history(50, seed=13)))
+        self.assertTrue(self.refresher.poll_once())
+        with self.assertRaises(VersionChanged) as ctx:
+            self.client.dataset(old)
+        self.assertEqual(ctx.exception.version, self.client.version())
+        state = self.refresher.current.dataset.default_filters()
+        # Consulta presa à versão antiga: não mistura linhas da nova com o dataset do worker
+        with self.assertRaises(VersionChanged):
+            self.client.query(state, version=old).prefetch()
+        self.assertEqual(len(self.client.query(state, version=self.client.version()).rows),
+                         len(run_query(self.refresher.current.dataset, state).rows))
+        with self.assertRaises(RuntimeError):
+            self.client.fetch(self.refresher.current.dataset.default_filters(), False, "nao_existe")
+
+    def _get(self, path, **headers):
+        request = urllib.request.Request(self.client.base_url + path, headers=headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers, exc.read()
+
+    def test_public_api(self):
+        dataset = self.refresher.current.dataset
+        # Como no dashboard, linhas sinalizadas ficam de fora salvo sinalizados=incluir
+        latest = dataset.latest[dataset.latest['Qualidade'] == 0]
+        tipo = latest['Tipo'].iloc[0]
+        status, headers, body = self._get(f"/api/v1/bairros?tipo={quote(tipo)}&preco_max=800000")
+        self.assertEqual(status, 200)
+        # Como no dashboard, a tabela de bairros segue os filtros do mapa (sem preço/área)
+        expected = bairro_stats(latest[latest['Tipo'] == tipo])
+        data = pd.DataFrame(json.loads(body)["data"])
+        self.assertEqual(data['Bairro'].tolist(), expected['Bairro'].tolist())
+        self.assertEqual(data['Imóveis'].tolist(), expected['Imóveis'].tolist())
+        kpis = json.loads(self._get(f"/api/v1/kpis?tipo={quote(tipo)}&preco_max=800000")[2])["data"]
+        self.assertEqual(kpis["imoveis"], int(((latest['Tipo'] == tipo) & (latest['Preço'] <= 800000)).sum()))
+
+        # Mesma versão + mesma URL: 304 sem corpo
+        status, _, body = self._get(f"/api/v1/bairros?preco_max=800000&tipo={quote(tipo)}", **{"If-None-Match": headers["ETag"]})
+        self.assertEqual((status, body), (304, b""))
+
+        status, headers, body = self._get("/api/v1/ruas?format=arrow", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        ruas = arrow_to_frame(gzip.decompress(body))
+        self.assertIn("Rua", ruas.columns)
+
+        status, _, body = self._get("/api/v1/temporal/pm2?freq=M")
+        self.assertEqual(status, 200)
+        self.assertGreater(json.loads(body)["rows"], 0)
+        status, headers, body = self._get(f"/api/v1/export?tipo={quote(tipo)}&format=arrow")
+        self.assertEqual(headers["Transfer-Encoding"], "chunked")
+        self.assertIn("attachment", headers["Content-Disposition"])
+        self.assertEqual(len(arrow_to_frame(body)), int((latest['Tipo'] == tipo).sum()))
+        todos = json.loads(self._get("/api/v1/kpis?sinalizados=incluir")[2])["data"]
+        self.assertEqual(todos["imoveis"], len(dataset.latest))
+        qualidade = pd.DataFrame(json.loads(self._get("/api/v1/qualidade")[2])["data"])
+        self.assertEqual(qualidade['Anúncios'].iloc[-1], len(dataset.latest) - len(latest))
+        cobertura = pd.DataFrame(json.loads(self._get("/api/v1/cobertura")[2])["data"]).set_index("Método")
+        self.assertEqual(cobertura.loc["com_coordenada", "Anúncios"] + cobertura.loc["sem_coordenada", "Anúncios"],
+                         len(dataset.latest))
+        self.assertEqual(self._get("/api/v1/kpis?quartos=dois")[0], 400)
+        for value in ("inf", "-inf", "nan", "1e400"):
+            self.assertEqual(self._get(f"/api/v1/kpis?preco_max={value}")[0], 400, value)
+        self.assertEqual(self._get("/api/v1/nada")[0], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -35,3 +35,57 @@ def fmt_br_area(x):
         return f"{int(x):,}".replace(",", ".") + " m²"
     except:
         return str(x)
+
+# Formatos usados nas tabelas do dashboard (compartilhados com os benchmarks)
+LISTING_TABLE_FORMATS = {
+    "Preço (R$)": fmt_br_currency,
+    "Condomínio (R$)": fmt_br_currency,
+    "Preço/m² (R$)": fmt_br_pm2,
+    "Área (m²)": fmt_br_area,
+    "IBairro": "{:.2f}",
+    "Preço/Quarto (R$)": fmt_br_currency,
+    "Condomínio/m² (R$)": fmt_br_pm2,
+    "Preço justo (R$)": fmt_br_currency,
+    "Resíduo (%)": "{:+.1f}%",
+}
+
+BAIRRO_TABLE_FORMATS = {
+    "Preço Min": fmt_br_currency,
+    "Preço Max": fmt_br_currency,
+    "Preço Médio": fmt_br_currency,
+    "Preço/m² Médio": fmt_br_pm2,
+    "Área Média": fmt_br_area,
+}
+
+RUA_TABLE_FORMATS = {
+    "Preço Médio": fmt_br_currency,
+    "Preço/m² Médio": fmt_br_pm2,
+    "Área Média": fmt_br_area,
+}
+
+DROPS_TABLE_FORMATS = {
+    "Preço Anterior": fmt_br_currency,
+    "Preço": fmt_br_currency,
+    "Variação (R$)": fmt_br_currency,
+    "Variação (%)": "{:.2f}%",
+}
+
+def highlight_ibairro(val):
+    """Verde abaixo da média do bairro, laranja acima."""
+    if pd.isna(val) or val == 0: return ''
+    return 'background-color: rgba(6, 214, 160, 0.3); color: #06D6A0' if val < 1 else 'background-color: rgba(255, 107, 53, 0.3); color: #FF6B35'
+
+def highlight_residuo(val):
+    """Verde abaixo do preço justo do modelo hedônico, laranja acima."""
+    if pd.isna(val): return ''
+    return highlight_ibairro(1 + val / 100)
+
+def style_listing_table(display_df):
+    """Styler da listagem de imóveis (formatação BR + destaque do IBairro)."""
+    formats = {col: fmt for col, fmt in LISTING_TABLE_FORMATS.items() if col in display_df.columns}
+    styler = display_df.style.format(formats, na_rep="—")
+    if 'IBairro' in display_df.columns:
+        styler = styler.map(highlight_ibairro, subset=['IBairro'])
+    if 'Resíduo (%)' in display_df.columns:
+        styler = styler.map(highlight_residuo, subset=['Resíduo (%)'])
+    return styler
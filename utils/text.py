@@ -0,0 +1,10 @@
+import re
+import unicodedata
+
+
+def slugify(text):
+    """Converte texto em slug de URL.
+    Ex: 'São Paulo' -> 'sao-paulo'
+    """
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")